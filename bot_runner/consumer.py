@@ -2,20 +2,23 @@ import asyncio
 import json
 import logging
 import os
-import uuid
-from datetime import datetime
+import time
+from typing import Optional
 from pydantic_settings import BaseSettings
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.future import select
 
 # Shared Utils
+from shared.utils.ids import uuid7
 from shared.utils.redis_utils import RedisStreamUtils
 from shared.libs.chatwoot_client import ChatwootClient
+from shared.utils.tracing import span, record_span, start_run_trace
+from shared.utils.metrics import observe_crew_run, observe_stream_group, ROUTER_DEAD_LETTERED
 
 # Models
-from app.models.bot_run import BotRun, BotRunEvent
 from app.models.bot_studio import BotCrewVersion
+from bot_runner.run_writer import RunBatchWriter, RunRecorder
 
 logger = logging.getLogger("BotConsumer")
 logging.basicConfig(level=logging.INFO)
@@ -35,20 +38,55 @@ class Settings(BaseSettings):
     # Default Crew
     DEFAULT_CREW_VERSION_ID: int = int(os.getenv("DEFAULT_CREW_VERSION_ID", "1")) # MVP: Hardcoded version to run
 
+    # Metrics: how often stream length/lag/pending are sampled
+    STREAM_STATS_INTERVAL_SECONDS: int = int(os.getenv("STREAM_STATS_INTERVAL_SECONDS", "15"))
+    # How often this consumer re-reads its own pending entries (restarts, router claims)
+    PENDING_RECHECK_SECONDS: int = int(os.getenv("PENDING_RECHECK_SECONDS", "30"))
+    # Same variables as the router: own pending entries delivered this many times are dead-lettered, not re-read
+    ROUTER_MAX_DELIVERIES: int = int(os.getenv("ROUTER_MAX_DELIVERIES", "5"))
+    ROUTER_DEAD_LETTER_STREAM: str = os.getenv("ROUTER_DEAD_LETTER_STREAM", "events:chatwoot:dead")
+
+    # Commit the end of runs from a shared writer, many runs per transaction (see bot_runner/run_writer.py)
+    BOT_RUN_WRITE_BATCHING: bool = os.getenv("BOT_RUN_WRITE_BATCHING", "false").lower() == "true"
+    BOT_RUN_WRITE_BATCH_SIZE: int = int(os.getenv("BOT_RUN_WRITE_BATCH_SIZE", "50"))
+    BOT_RUN_WRITE_FLUSH_MS: int = int(os.getenv("BOT_RUN_WRITE_FLUSH_MS", "200"))
+
 settings = Settings()
 
 # DB Setup
 engine = create_async_engine(settings.DATABASE_URL, echo=False)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
-async def _save_event(session: AsyncSession, run_id: str, event_type: str, payload: dict):
-    event = BotRunEvent(
-        run_id=run_id,
-        event_type=event_type,
-        payload_json=payload
-    )
-    session.add(event)
-    await session.commit()
+# One pooled Chatwoot client per runner process (keep-alive, retries, circuit breaker)
+_chatwoot_client: Optional[ChatwootClient] = None
+
+def get_chatwoot_client() -> ChatwootClient:
+    global _chatwoot_client
+    if _chatwoot_client is None:
+        _chatwoot_client = ChatwootClient(
+            settings.CHATWOOT_BASE_URL,
+            settings.CHATWOOT_API_TOKEN,
+            settings.CHATWOOT_ACCOUNT_ID
+        )
+    return _chatwoot_client
+
+# Shared writer of finished runs, only with BOT_RUN_WRITE_BATCHING
+_run_writer: Optional[RunBatchWriter] = None
+
+def _stream_entry_ms(message_id: str):
+    """Stream entry ids are '<ms since epoch>-<seq>', i.e. the enqueue time."""
+    try:
+        return int(str(message_id).split("-")[0])
+    except (ValueError, IndexError):
+        return None
+
+def _record_latency_breakdown(recorder: RunRecorder, run_trace, payload: dict, message_id: str, version_tag: str):
+    """Adds the per-run span summary, aggregated per crew version by /bi/bot-latency."""
+    started_ms = payload.get("received_at_ms") or _stream_entry_ms(message_id)
+    breakdown = run_trace.summary()
+    breakdown["version_tag"] = version_tag
+    breakdown["total_ms"] = int(time.time() * 1000) - int(started_ms) if started_ms else None
+    recorder.event("latency_breakdown", breakdown)
 
 async def execute_crew_logic(snapshot: dict, inputs: dict) -> str:
     """
@@ -71,8 +109,18 @@ async def execute_crew_logic(snapshot: dict, inputs: dict) -> str:
     return f"Processed by {crew_name}. I analyzed your request: '{inputs.get('content')}'."
 
 async def process_message(message_id: str, payload: dict, redis_utils: RedisStreamUtils):
+    # Continue the trace started in chatwoot_webhook
+    run_trace = start_run_trace(payload.get("traceparent") or None)
+    enqueued_ms = _stream_entry_ms(message_id)
+    if enqueued_ms:
+        record_span("stream.queue_wait", enqueued_ms * 1_000_000, time.time_ns(), category="queue_wait")
+
+    with span("bot_runner.process_message", attributes={"stream.message_id": str(message_id)}):
+        return await _process_message(message_id, payload, run_trace)
+
+async def _process_message(message_id: str, payload: dict, run_trace):
     async with AsyncSessionLocal() as db:
-        run_id = str(uuid.uuid4())
+        run_id = str(uuid7())
         conversation_id = None
         
         try:
@@ -99,39 +147,25 @@ async def process_message(message_id: str, payload: dict, redis_utils: RedisStre
                 
             content = payload.get("content")
             conversation_id = payload.get("conversation_id")
-            sender_type = payload.get("sender", {}).get("name") # Or Parse properly if sender is JSON string
-            
-            # Handle potential double-serialization if Redis implementation did that
-            if isinstance(payload.get("sender"), str):
-                 import json
-                 try:
-                     payload["sender"] = json.loads(payload["sender"])
-                 except: pass
 
             logger.info(f"Processing Event for Conv {conversation_id}")
             
             # 2. Get Crew Version (Snapshot)
             stmt = select(BotCrewVersion).where(BotCrewVersion.id == settings.DEFAULT_CREW_VERSION_ID)
-            res = await db.execute(stmt)
-            version = res.scalar_one_or_none()
+            with span("db.load_crew_version", category="db"):
+                res = await db.execute(stmt)
+                version = res.scalar_one_or_none()
             
             if not version:
                 logger.error(f"Default Crew Version {settings.DEFAULT_CREW_VERSION_ID} not found.")
                 # We can't run.
                 return True # Ack to avoid loop
             
-            # 3. Create BotRun
-            bot_run = BotRun(
-                id=run_id,
-                crew_version_id=version.id,
-                source="chatwoot",
-                conversation_id=str(conversation_id),
-                status="running"
-            )
-            db.add(bot_run)
-            await db.commit()
-            
-            await _save_event(db, run_id, "run_start", {"input": content})
+            # 3. Create BotRun: run row and run_start in one transaction, the other events wait for the end
+            recorder = RunRecorder(run_id)
+            recorder.event("run_start", {"input": content})
+            with span("db.create_run", category="db"):
+                await recorder.start(db, crew_version_id=version.id, source="chatwoot", conversation_id=str(conversation_id))
 
             # 4. Run CrewAI
             try:
@@ -145,30 +179,24 @@ async def process_message(message_id: str, payload: dict, redis_utils: RedisStre
                 # The snapshot might need to have defaults filled if they were created before the fix
                 # But our shared lib handles .get() safely.
                 
-                exec_result = await execute_crew_from_snapshot(
-                    snapshot, 
-                    {"content": content},
-                    version_tag=version.version_tag
-                )
+                crew_started = time.perf_counter()
+                with span("crew.kickoff", category="crew", attributes={"crew.version_tag": version.version_tag}):
+                    exec_result = await execute_crew_from_snapshot(
+                        snapshot, 
+                        {"content": content},
+                        version_tag=version.version_tag
+                    )
+                # The shared lib reports its own failures as agent "System" instead of raising
+                outcome = "failed" if exec_result.get("agent_name") == "System" else "success"
+                observe_crew_run(version.version_tag, outcome, time.perf_counter() - crew_started)
                 
                 final_answer = exec_result.get("response", "No response")
-                
-                # Update Run Success
-                bot_run.status = "success"
-                bot_run.finished_at = datetime.utcnow()
-                bot_run.result_output = final_answer
-                await db.commit()
-                
-                await _save_event(db, run_id, "run_success", {"output": final_answer})
+                status, result_output = "success", final_answer
+                recorder.event("run_success", {"output": final_answer})
                 
                 # 5. Reply to Chatwoot
                 if settings.CHATWOOT_API_TOKEN:
-                    chatwoot = ChatwootClient(
-                        settings.CHATWOOT_BASE_URL,
-                        settings.CHATWOOT_API_TOKEN,
-                        settings.CHATWOOT_ACCOUNT_ID
-                    )
-                    await chatwoot.create_message(
+                    await get_chatwoot_client().create_message(
                         conversation_id=int(conversation_id),
                         content=final_answer
                     )
@@ -177,38 +205,88 @@ async def process_message(message_id: str, payload: dict, redis_utils: RedisStre
                     
             except Exception as e:
                 logger.error(f"Crew Execution Failed: {e}")
-                bot_run.status = "failed"
-                bot_run.finished_at = datetime.utcnow()
-                bot_run.result_output = str(e)
-                await db.commit()
-                await _save_event(db, run_id, "run_failed", {"error": str(e)})
+                status, result_output = "failed", str(e)
+                recorder.event("run_failed", {"error": str(e)})
 
+            _record_latency_breakdown(recorder, run_trace, payload, message_id, version.version_tag)
+            # Status and the remaining events in one transaction (or queued to the shared writer)
+            with span("db.update_run", category="db"):
+                await recorder.finish(db, status, result_output, writer=_run_writer)
             return True
 
         except Exception as e:
             logger.error(f"Fatal processing error: {e}")
             return False
 
+async def sample_stream_stats(redis: RedisStreamUtils):
+    """Periodically exports stream length, consumer lag and pending count as metrics."""
+    while True:
+        try:
+            stats = await redis.get_stream_stats(settings.REDIS_STREAM_NAME, settings.REDIS_CONSUMER_GROUP)
+            observe_stream_group(settings.REDIS_STREAM_NAME, settings.REDIS_CONSUMER_GROUP, stats)
+        except Exception as e:
+            logger.warning(f"Could not sample stream stats: {e}")
+        await asyncio.sleep(settings.STREAM_STATS_INTERVAL_SECONDS)
+
+async def dead_letter_exhausted(redis: RedisStreamUtils) -> int:
+    """
+    Dead-letters this consumer's pending entries already delivered
+    ROUTER_MAX_DELIVERIES times. Each re-read counts as a delivery and resets
+    the entry's idle time, so the router would never see them as stalled.
+    """
+    entries = await redis.get_pending_entries(
+        settings.REDIS_STREAM_NAME, settings.REDIS_CONSUMER_GROUP, count=100, consumer_name=settings.REDIS_CONSUMER_NAME
+    )
+    dead = 0
+    for entry in entries:
+        if entry.get("times_delivered", 0) >= settings.ROUTER_MAX_DELIVERIES:
+            await redis.dead_letter(
+                settings.REDIS_STREAM_NAME, settings.REDIS_CONSUMER_GROUP, settings.ROUTER_DEAD_LETTER_STREAM, entry
+            )
+            ROUTER_DEAD_LETTERED.inc()
+            logger.warning(f"Dead-lettered {entry['message_id']} after {entry.get('times_delivered')} deliveries")
+            dead += 1
+    return dead
+
+async def consume_batch(redis: RedisStreamUtils, start_id: str):
+    """One read: new entries ('>') or this consumer's pending ones ('0'). Processed entries are acked."""
+    if start_id == "0":
+        await dead_letter_exhausted(redis)
+    # consume_messages yields (message_id, payload)
+    async for message_id, payload in redis.consume_messages(
+        settings.REDIS_STREAM_NAME,
+        settings.REDIS_CONSUMER_GROUP,
+        settings.REDIS_CONSUMER_NAME,
+        batch_size=1 if start_id == ">" else 100,
+        block_ms=2000,
+        start_id=start_id
+    ):
+        logger.info(f"Got message {message_id}")
+        success = await process_message(message_id, payload, redis)
+        if success:
+            await redis.ack_message(settings.REDIS_STREAM_NAME, settings.REDIS_CONSUMER_GROUP, message_id)
+
 async def start_consumer():
+    global _run_writer
     redis = RedisStreamUtils(settings.REDIS_URL)
+    if settings.BOT_RUN_WRITE_BATCHING:
+        _run_writer = RunBatchWriter(
+            AsyncSessionLocal, settings.BOT_RUN_WRITE_BATCH_SIZE, settings.BOT_RUN_WRITE_FLUSH_MS / 1000
+        ).start()
     logger.info(f"Starting Consumer Group {settings.REDIS_CONSUMER_GROUP}")
     
     await redis.ensure_consumer_group(settings.REDIS_STREAM_NAME, settings.REDIS_CONSUMER_GROUP)
+    stats_task = asyncio.create_task(sample_stream_stats(redis))
     
+    last_pending_check = 0.0
     while True:
         try:
-            # consume_messages yields (message_id, payload)
-            async for message_id, payload in redis.consume_messages(
-                settings.REDIS_STREAM_NAME,
-                settings.REDIS_CONSUMER_GROUP,
-                settings.REDIS_CONSUMER_NAME,
-                count=1,
-                block=2000
-            ):
-                logger.info(f"Got message {message_id}")
-                success = await process_message(message_id, payload, redis)
-                if success:
-                    await redis.ack_message(settings.REDIS_STREAM_NAME, settings.REDIS_CONSUMER_GROUP, message_id)
+            # Own pending entries first: left over from a restart or claimed by the router
+            start_id = ">"
+            if time.monotonic() - last_pending_check >= settings.PENDING_RECHECK_SECONDS:
+                start_id = "0"
+                last_pending_check = time.monotonic()
+            await consume_batch(redis, start_id)
                     
         except Exception as e:
             logger.error(f"Consumer Loop Error: {e}")
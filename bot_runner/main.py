@@ -3,6 +3,9 @@ import os
 import logging
 import sys
 from bot_runner.consumer import start_consumer
+from bot_runner.router import start_router
+from shared.utils.tracing import init_tracing
+from shared.utils.metrics import start_metrics_server
 
 # Configure logging
 logging.basicConfig(
@@ -11,18 +14,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger("BotRunner")
 
-async def start_router():
-    """
-    Router mode: Could be used for dispatching tasks or load balancing.
-    Placeholder for now.
-    """
-    logger.info("Starting in ROUTER mode...")
-    while True:
-        logger.info("Router heartbeat...")
-        await asyncio.sleep(60)
-
 async def main():
     mode = os.getenv("WORKER_MODE", "runner").lower()
+    init_tracing(f"bot_runner.{mode}")
+    start_metrics_server()
     
     if mode == "router":
         await start_router()
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from pydantic_settings import BaseSettings
+
+from shared.utils.redis_utils import RedisStreamUtils
+from shared.utils.metrics import observe_stream_group, ROUTER_DESIRED_REPLICAS, ROUTER_CLAIMED, ROUTER_DEAD_LETTERED
+
+logger = logging.getLogger("BotRouter")
+
+
+class RouterSettings(BaseSettings):
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://redis:6379")
+    REDIS_STREAM_NAME: str = os.getenv("REDIS_STREAM_NAME", "events:chatwoot")
+    REDIS_CONSUMER_GROUP: str = os.getenv("REDIS_CONSUMER_GROUP", "cg:bot_runner")
+
+    ROUTER_INTERVAL_SECONDS: int = 10
+    # Autoscaling signal: backlog one runner is expected to clear within the target wait
+    ROUTER_TARGET_BACKLOG_PER_RUNNER: int = 5
+    ROUTER_MIN_REPLICAS: int = 1
+    ROUTER_MAX_REPLICAS: int = 20
+    # Scale down only when the lower value held for this long (avoids flapping)
+    ROUTER_SCALE_DOWN_WINDOW_SECONDS: int = 300
+    ROUTER_SIGNAL_KEY: str = "bot_runner:router:signal"
+
+    # Rebalancing: entries pending longer than a normal crew run are moved to an idle consumer
+    ROUTER_CLAIM_MIN_IDLE_MS: int = 600_000
+    # A consumer that polled within this window is considered alive and free
+    ROUTER_ACTIVE_IDLE_MS: int = 30_000
+    ROUTER_CLAIM_BATCH: int = 100
+    # Entries delivered this many times are moved to the dead-letter stream
+    ROUTER_MAX_DELIVERIES: int = 5
+    ROUTER_DEAD_LETTER_STREAM: str = "events:chatwoot:dead"
+
+
+settings = RouterSettings()
+
+
+def compute_desired_replicas(backlog: int, target_per_runner: int, min_replicas: int, max_replicas: int) -> int:
+    """Replicas needed so each runner holds at most `target_per_runner` entries of backlog."""
+    desired = math.ceil(backlog / max(target_per_runner, 1)) if backlog > 0 else 0
+    return max(min_replicas, min(max_replicas, desired))
+
+
+class ReplicaSignal:
+    """Scales up immediately, scales down to the max seen over the last window."""
+
+    def __init__(self, scale_down_window_seconds: int):
+        self.window = scale_down_window_seconds
+        self.history: deque = deque()
+
+    def update(self, desired: int, now: Optional[float] = None) -> int:
+        now = time.monotonic() if now is None else now
+        self.history.append((now, desired))
+        while self.history and self.history[0][0] < now - self.window:
+            self.history.popleft()
+        return max(value for _, value in self.history)
+
+
+def pick_claim_target(consumers: List[Dict[str, Any]], owner: str, active_idle_ms: int) -> Optional[str]:
+    """Least loaded consumer (fewest pending) among the ones that polled recently, excluding `owner`."""
+    candidates = [
+        c for c in consumers
+        if c.get("name") != owner and (c.get("idle") or 0) <= active_idle_ms
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda c: (c.get("pending") or 0, c.get("idle") or 0))["name"]
+
+
+async def dead_letter(redis: RedisStreamUtils, entry: Dict[str, Any]):
+    """Copies a poison entry to the dead-letter stream and acks it in the main group."""
+    await redis.dead_letter(
+        settings.REDIS_STREAM_NAME, settings.REDIS_CONSUMER_GROUP, settings.ROUTER_DEAD_LETTER_STREAM, entry
+    )
+    ROUTER_DEAD_LETTERED.inc()
+    logger.warning(f"Dead-lettered {entry['message_id']} after {entry.get('times_delivered')} deliveries")
+
+
+async def rebalance(redis: RedisStreamUtils, consumers: List[Dict[str, Any]]) -> int:
+    """Moves long-pending entries away from stalled consumers. Returns the number claimed."""
+    stalled = await redis.get_pending_entries(
+        settings.REDIS_STREAM_NAME,
+        settings.REDIS_CONSUMER_GROUP,
+        min_idle_ms=settings.ROUTER_CLAIM_MIN_IDLE_MS,
+        count=settings.ROUTER_CLAIM_BATCH,
+    )
+    claimed = 0
+    by_target: Dict[str, List[str]] = {}
+    for entry in stalled:
+        if entry.get("times_delivered", 0) >= settings.ROUTER_MAX_DELIVERIES:
+            await dead_letter(redis, entry)
+            continue
+        target = pick_claim_target(consumers, entry.get("consumer"), settings.ROUTER_ACTIVE_IDLE_MS)
+        if target:
+            by_target.setdefault(target, []).append(entry["message_id"])
+
+    for target, message_ids in by_target.items():
+        moved = await redis.claim_messages(
+            settings.REDIS_STREAM_NAME,
+            settings.REDIS_CONSUMER_GROUP,
+            target,
+            settings.ROUTER_CLAIM_MIN_IDLE_MS,
+            message_ids,
+        )
+        claimed += len(moved)
+        ROUTER_CLAIMED.inc(len(moved))
+        logger.info(f"Claimed {len(moved)} stalled entries for {target}")
+    return claimed
+
+
+async def router_tick(redis: RedisStreamUtils, signal: ReplicaSignal) -> Dict[str, Any]:
+    stats = await redis.get_stream_stats(settings.REDIS_STREAM_NAME, settings.REDIS_CONSUMER_GROUP)
+    observe_stream_group(settings.REDIS_STREAM_NAME, settings.REDIS_CONSUMER_GROUP, stats)
+    consumers = await redis.get_consumers(settings.REDIS_STREAM_NAME, settings.REDIS_CONSUMER_GROUP)
+
+    # lag is None on Redis < 7 (or after XDEL), the backlog then only counts pending entries
+    backlog = (stats.get("lag") or 0) + (stats.get("pending") or 0)
+    desired = compute_desired_replicas(
+        backlog,
+        settings.ROUTER_TARGET_BACKLOG_PER_RUNNER,
+        settings.ROUTER_MIN_REPLICAS,
+        settings.ROUTER_MAX_REPLICAS,
+    )
+    smoothed = signal.update(desired)
+    claimed = await rebalance(redis, consumers)
+
+    active = [c["name"] for c in consumers if (c.get("idle") or 0) <= settings.ROUTER_ACTIVE_IDLE_MS]
+    payload = {
+        "desired_replicas": smoothed,
+        "instant_desired_replicas": desired,
+        "backlog": backlog,
+        "lag": stats.get("lag"),
+        "pending": stats.get("pending"),
+        "stream_length": stats.get("length"),
+        "consumers": len(consumers),
+        "active_consumers": len(active),
+        "consumer_idle_ms": {c["name"]: c.get("idle") for c in consumers},
+        "claimed": claimed,
+        "ts": int(time.time()),
+    }
+    # Published for external autoscalers (KEDA redis scaler / scripts) and as a metric
+    await redis.client.set(settings.ROUTER_SIGNAL_KEY, json.dumps(payload))
+    ROUTER_DESIRED_REPLICAS.set(smoothed)
+    return payload
+
+
+async def start_router():
+    """
+    Router mode: watches the stream and the consumer group, publishes the
+    desired number of runner replicas and reclaims entries stuck on stalled runners.
+    """
+    redis = RedisStreamUtils(settings.REDIS_URL)
+    await redis.ensure_consumer_group(settings.REDIS_STREAM_NAME, settings.REDIS_CONSUMER_GROUP)
+    signal = ReplicaSignal(settings.ROUTER_SCALE_DOWN_WINDOW_SECONDS)
+    logger.info(f"Starting in ROUTER mode (interval {settings.ROUTER_INTERVAL_SECONDS}s)...")
+
+    while True:
+        try:
+            payload = await router_tick(redis, signal)
+            logger.info(
+                f"Router: backlog={payload['backlog']} desired_replicas={payload['desired_replicas']} "
+                f"active={payload['active_consumers']}/{payload['consumers']} claimed={payload['claimed']}"
+            )
+        except Exception as e:
+            logger.error(f"Router tick failed: {e}")
+        await asyncio.sleep(settings.ROUTER_INTERVAL_SECONDS)
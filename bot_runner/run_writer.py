@@ -0,0 +1,167 @@
+"""
+Lifecycle writes of bot runs.
+
+`RunRecorder` accumulates a run's events in memory and writes them with
+the run row in two transactions instead of one per event:
+- start(): the run row (status 'running') plus the events so far
+  (run_start), so the run is visible while the crew works;
+- finish(): the final status plus every event recorded since.
+
+With BOT_RUN_WRITE_BATCHING, finish() hands its writes to the process-wide
+`RunBatchWriter`, which commits the finished runs of many messages in one
+transaction. The consumer then no longer waits for that commit; a crash
+before it leaves the run 'running' with its run_start event.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, insert, update
+
+import app.models.bot_studio  # noqa: F401  (BotCrewVersion, target of BotRun.crew_version)
+from app.models.bot_run import BotRun, BotRunEvent
+from shared.utils.ids import uuid7
+
+logger = logging.getLogger("BotRunWriter")
+
+# Queue sentinel: the oldest buffered run reached its flush deadline
+_DUE = object()
+
+
+@dataclass
+class FinishedRun:
+    run_id: str
+    status: str
+    finished_at: datetime
+    result_output: Optional[str]
+    events: List[Dict[str, Any]]
+
+
+async def insert_events(session, events: List[Dict[str, Any]]):
+    if events:
+        await session.execute(insert(BotRunEvent), events)
+
+
+async def write_finished(session, runs: List[FinishedRun]):
+    """Final status of the runs and their pending events, two executemany statements. Does not commit."""
+    if not runs:
+        return
+    await session.execute(
+        update(BotRun.__table__)
+        .where(BotRun.__table__.c.id == bindparam("b_id"))
+        .values(status=bindparam("b_status"), finished_at=bindparam("b_finished_at"), result_output=bindparam("b_result_output")),
+        [{"b_id": r.run_id, "b_status": r.status, "b_finished_at": r.finished_at, "b_result_output": r.result_output} for r in runs],
+    )
+    await insert_events(session, [event for r in runs for event in r.events])
+
+
+@dataclass
+class RunRecorder:
+    run_id: str
+    events: List[Dict[str, Any]] = field(default_factory=list)
+
+    def event(self, event_type: str, payload: dict):
+        # Id and timestamp are taken now: a batched write must not reorder the run's events
+        self.events.append({
+            "id": str(uuid7()),
+            "run_id": self.run_id,
+            "timestamp": datetime.utcnow(),
+            "event_type": event_type,
+            "payload_json": payload,
+        })
+
+    def _take_events(self) -> List[Dict[str, Any]]:
+        events, self.events = self.events, []
+        return events
+
+    async def start(self, session, **run_fields):
+        """Inserts the run (status 'running') with the events recorded so far, one commit."""
+        await session.execute(insert(BotRun).values(id=self.run_id, status="running", created_at=datetime.utcnow(), **run_fields))
+        await insert_events(session, self._take_events())
+        await session.commit()
+
+    async def finish(self, session, status: str, result_output: Optional[str], writer: Optional["RunBatchWriter"] = None):
+        """Final status and the remaining events: one commit, or queued to `writer`."""
+        finished = FinishedRun(self.run_id, status, datetime.utcnow(), result_output, self._take_events())
+        if writer:
+            await writer.submit(finished)
+            return
+        await write_finished(session, [finished])
+        await session.commit()
+
+
+class RunBatchWriter:
+    """
+    Commits finished runs from a bounded queue, up to `batch_size` runs per
+    transaction, at least every `flush_interval` seconds. A full queue blocks
+    the consumer, so writes never fall unboundedly behind.
+    """
+
+    def __init__(self, session_factory, batch_size: int = 50, flush_interval: float = 0.2, queue_size: int = 1000):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.runs_written = 0
+        self.failed_runs = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def submit(self, run: FinishedRun):
+        await self.queue.put(run)
+
+    async def close(self):
+        """Flushes everything queued so far and stops the writer task."""
+        await self.queue.put(None)
+        if self._task:
+            await self._task
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch: List[FinishedRun] = []
+        deadline = 0.0
+        while True:
+            # Idle: wait for the next run; otherwise only until the oldest queued run is due
+            timeout = max(0.0, deadline - loop.time()) if batch else None
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                item = _DUE
+            if item is None:
+                await self.flush(batch)
+                return
+            if item is not _DUE:
+                if not batch:
+                    deadline = loop.time() + self.flush_interval
+                batch.append(item)
+                if len(batch) < self.batch_size and loop.time() < deadline:
+                    continue
+            await self.flush(batch)
+            batch = []
+
+    async def flush(self, runs: List[FinishedRun]):
+        if not runs:
+            return
+        try:
+            async with self.session_factory() as session:
+                await write_finished(session, runs)
+                await session.commit()
+            self.runs_written += len(runs)
+            return
+        except Exception as e:
+            logger.warning(f"Batched write of {len(runs)} runs failed, retrying one by one: {e}")
+        # One bad run must not lose the others
+        for run in runs:
+            try:
+                async with self.session_factory() as session:
+                    await write_finished(session, [run])
+                    await session.commit()
+                self.runs_written += 1
+            except Exception as e:
+                self.failed_runs += 1
+                logger.error(f"Failed to write the end of run {run.run_id}: {e}")
@@ -0,0 +1,167 @@
+"""
+Data hub command line.
+
+    python -m data_hub_runner run                     # periodic sync loop (same as worker.py)
+    python -m data_hub_runner realtime                # only the webhook -> raw tables processor
+    python -m data_hub_runner backfill --since 2024-01-01 --until 2024-03-31 --inbox 3 --parallel 8
+    python -m data_hub_runner backfill --resume 12    # continue job 12 from its checkpoints
+    python -m data_hub_runner jobs                    # recent jobs and shard progress
+    python -m data_hub_runner reconcile --since 2024-01-01 --until 2024-02-01 [--dry-run]
+    python -m data_hub_runner migrate                 # apply pending analytics migrations and exit
+    python -m data_hub_runner partitions [--convert]  # raw table partitions (convert plain tables)
+
+`backfill` resumes an unfinished job with the same --since/--until/--inbox
+instead of creating a new one, so re-running an interrupted command picks
+up exactly where it stopped. `reconcile` compares per-day, per-inbox message
+counts with Chatwoot's reports and re-syncs only the days that differ.
+`partitions --convert` rewrites raw tables created before monthly
+partitioning; it locks them while copying, run it with the worker stopped.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from data_hub_runner import partitions, worker
+
+
+def _date(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def _end_date(value: str) -> datetime:
+    """Like _date, but a date alone means the end of that day: --until 2024-03-31 includes March 31st."""
+    try:
+        return datetime.combine(date.fromisoformat(value), time.max)
+    except ValueError:
+        return _date(value)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m data_hub_runner", description="Data hub runner")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("run", help="Periodic incremental sync loop")
+    sub.add_parser("realtime", help="Apply webhook events to the raw tables continuously")
+
+    backfill = sub.add_parser("backfill", help="Checkpointed backfill of a date range")
+    backfill.add_argument("--since", type=_date, help="Conversations active since (ISO date/datetime)")
+    backfill.add_argument("--until", type=_end_date, help="Conversations created until, inclusive (default: now)")
+    backfill.add_argument("--inbox", type=int, help="Only this inbox")
+    backfill.add_argument("--parallel", type=int, default=worker.settings.DATA_HUB_BACKFILL_PARALLEL, help="Conversation shards run concurrently")
+    backfill.add_argument("--resume", type=int, metavar="JOB_ID", help="Resume this job (ignores the other options)")
+    backfill.add_argument("--new", action="store_true", help="Always create a new job")
+
+    jobs = sub.add_parser("jobs", help="List recent backfill jobs")
+    jobs.add_argument("--limit", type=int, default=10)
+
+    sub.add_parser("migrate", help="Create worker tables and apply pending analytics migrations")
+
+    parts = sub.add_parser("partitions", help="List raw table partitions, run their maintenance")
+    parts.add_argument("--convert", action="store_true", help="Convert raw tables created before partitioning (locks them while copying)")
+
+    reconcile = sub.add_parser("reconcile", help="Compare per-day message buckets with Chatwoot, re-sync the ones that differ")
+    reconcile.add_argument("--since", type=lambda v: _date(v).date(), help=f"First day (default: {worker.settings.DATA_HUB_RECONCILE_DAYS} days ago)")
+    reconcile.add_argument("--until", type=lambda v: _date(v).date(), help="Day after the last one (default: today)")
+    reconcile.add_argument("--dry-run", action="store_true", help="Only report differing buckets")
+    return parser.parse_args(argv)
+
+
+async def backfill(args) -> bool:
+    await worker.prepare_schema()
+    job_id = args.resume
+    if job_id is None and not args.new:
+        job_id = await worker.find_resumable_job(since=args.since, until=args.until, inbox_id=args.inbox)
+        if job_id:
+            worker.logger.info(f"Resuming unfinished job {job_id}")
+    if job_id is None:
+        job_id = await worker.create_backfill_job(
+            since=args.since, until=args.until, inbox_id=args.inbox, parallel=args.parallel
+        )
+
+    async with worker.ChatwootClient(
+        base_url=worker.settings.CHATWOOT_BASE_URL,
+        api_access_token=worker.settings.CHATWOOT_API_TOKEN,
+        account_id=worker.settings.CHATWOOT_ACCOUNT_ID,
+        max_connections=worker.settings.DATA_HUB_MAX_CONCURRENCY + 2,
+    ) as client:
+        ok = await worker.run_backfill_job(client, job_id)
+
+    if ok:
+        await worker.refresh_marts(worker.AsyncSessionLocal)
+    worker.logger.info(f"Backfill job {job_id} {'done' if ok else 'incomplete, run again to resume'}")
+    return ok
+
+
+async def list_jobs(limit: int):
+    await worker.ensure_tables()
+    async with worker.AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(worker.DataHubBackfillJob)
+            .options(selectinload(worker.DataHubBackfillJob.shards))
+            .order_by(worker.DataHubBackfillJob.id.desc())
+            .limit(limit)
+        )
+        for job in result.scalars():
+            print(f"#{job.id} {job.status:<8} {job.trigger:<8} {job.since} -> {job.until} inbox={job.inbox_id} created={job.created_at}")
+            for shard in job.shards:
+                print(f"    shard {shard.id} {shard.kind:<16} {shard.status:<8} next_page={shard.next_page} items={shard.items_done} {shard.error or ''}")
+
+
+async def reconcile(args) -> bool:
+    await worker.prepare_schema()
+    until = args.until or date.today()
+    since = args.since or until - timedelta(days=worker.settings.DATA_HUB_RECONCILE_DAYS)
+    async with worker.ChatwootClient(
+        base_url=worker.settings.CHATWOOT_BASE_URL,
+        api_access_token=worker.settings.CHATWOOT_API_TOKEN,
+        account_id=worker.settings.CHATWOOT_ACCOUNT_ID,
+        max_connections=worker.settings.DATA_HUB_MAX_CONCURRENCY + 2,
+    ) as client:
+        summary = await worker.run_reconciliation(client, since, until, dry_run=args.dry_run)
+
+    if summary.get("resynced"):
+        await worker.refresh_marts(worker.AsyncSessionLocal)
+    print(" ".join(f"{status}={count}" for status, count in sorted(summary.items())))
+    return not summary.get("mismatch")
+
+
+async def list_partitions(convert: bool):
+    if convert:
+        for spec in partitions.PARTITIONED_TABLES:
+            async with worker.AsyncSessionLocal() as session:
+                await partitions.convert_to_partitioned(
+                    session, spec, date.today(), worker.settings.DATA_HUB_PARTITION_MONTHS_AHEAD
+                )
+    await worker.run_partition_maintenance()
+    async with worker.AsyncSessionLocal() as session:
+        for spec in partitions.PARTITIONED_TABLES:
+            rows = await partitions.partition_summary(session, spec)
+            print(f"{spec.table}: {len(rows)} partitions")
+            for name, bounds, size in rows:
+                print(f"    {name:<44} {size / 1024 / 1024:>10.1f} MB  {bounds}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "run":
+        asyncio.run(worker.main())
+    elif args.command == "realtime":
+        asyncio.run(worker.start_realtime())
+    elif args.command == "backfill":
+        sys.exit(0 if asyncio.run(backfill(args)) else 1)
+    elif args.command == "jobs":
+        asyncio.run(list_jobs(args.limit))
+    elif args.command == "migrate":
+        sys.exit(0 if asyncio.run(worker.prepare_schema()) else 1)
+    elif args.command == "partitions":
+        asyncio.run(list_partitions(args.convert))
+    elif args.command == "reconcile":
+        sys.exit(0 if asyncio.run(reconcile(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,371 @@
+import asyncio
 import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
 from sqlalchemy import text
-from datetime import datetime
+from app.models.data_hub import DataHubRun
+from shared.utils.metrics import MART_REFRESH_DURATION
+from shared.utils.sketch import LN_GAMMA
 
 logger = logging.getLogger("Analytics")
 
-INIT_SQL_PATH = "platform_api/app/db/analytics.sql"
+# Ordered NNNN_name.sql files, each applied once (recorded in analytics_schema_version)
+MIGRATIONS_DIR = "platform_api/app/db/analytics_migrations"
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+MIGRATIONS_LOCK_KEY = 7260431
 
-async def init_analytics_schema(session):
-    """Reads SQL file and executes it to create Views/Tables if not exist"""
-    try:
-        with open(INIT_SQL_PATH, "r") as f:
+# Rows are stamped with their transaction's start time: re-read a margin before the
+# watermark for transactions that were still open when the last refresh started
+MART_WATERMARK_OVERLAP_SECONDS = 300
+# Keys recomputed per DELETE/INSERT pair
+MART_KEYS_PER_STATEMENT = 5000
+
+BACKLOG_SNAPSHOT = "mart_backlog_snapshot"
+BACKLOG_SOURCES = ("raw_chatwoot_conversations",)
+
+# Rows inserted, updated or deleted so far in the given tables (and their partitions).
+# No-op upserts (unchanged content hash) do not count, so an unchanged value means nothing to refresh.
+SOURCE_CHANGES_SQL = """
+    SELECT COALESCE(SUM(s.n_tup_ins + s.n_tup_upd + s.n_tup_del), 0)
+    FROM pg_stat_user_tables s
+    WHERE s.relid IN (
+        SELECT c.oid FROM pg_class c WHERE c.relname = ANY(CAST(:tables AS text[]))
+        UNION ALL
+        SELECT i.inhrelid FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhparent
+        WHERE c.relname = ANY(CAST(:tables AS text[]))
+    )
+"""
+
+
+@dataclass(frozen=True)
+class Mart:
+    """
+    Aggregate table maintained incrementally. `changed_sql` lists the keys
+    (days or conversation ids) of source rows synced after :since;
+    `delete_sql` and `insert_sql` recompute the rows of :keys. `insert_sql`
+    has a `{keys}` placeholder for the join restricting it to those keys,
+    left empty to rebuild the whole mart.
+    """
+    name: str
+    sources: Sequence[str]
+    changed_sql: str
+    delete_sql: str
+    insert_sql: str
+    keys_join: str
+
+
+MARTS = [
+    Mart(
+        name="mart_inbox_daily_volume",
+        sources=("raw_chatwoot_messages",),
+        changed_sql="SELECT DISTINCT created_at_ts::date FROM raw_chatwoot_messages WHERE synced_at > :since AND created_at_ts IS NOT NULL",
+        delete_sql="DELETE FROM mart_inbox_daily_volume WHERE day = ANY(CAST(:keys AS date[]))",
+        insert_sql="""
+            INSERT INTO mart_inbox_daily_volume (day, inbox_id, conversations_count, messages_count)
+            SELECT DATE(m.created_at), m.inbox_id, COUNT(DISTINCT m.conversation_id), COUNT(m.message_id)
+            FROM stg_messages m {keys}
+            WHERE m.created_at IS NOT NULL
+            GROUP BY 1, 2
+        """,
+        keys_join="JOIN unnest(CAST(:keys AS date[])) AS k(day) ON m.created_at >= k.day AND m.created_at < k.day + 1",
+    ),
+    Mart(
+        name="mart_agent_daily_volume",
+        sources=("raw_chatwoot_messages",),
+        changed_sql="SELECT DISTINCT created_at_ts::date FROM raw_chatwoot_messages WHERE synced_at > :since AND created_at_ts IS NOT NULL",
+        delete_sql="DELETE FROM mart_agent_daily_volume WHERE day = ANY(CAST(:keys AS date[]))",
+        insert_sql="""
+            INSERT INTO mart_agent_daily_volume (day, user_id, messages_count, conversations_touched)
+            SELECT DATE(m.created_at), m.sender_id, COUNT(m.message_id), COUNT(DISTINCT m.conversation_id)
+            FROM stg_messages m {keys}
+            WHERE m.sender_type = 'User' AND m.created_at IS NOT NULL
+            GROUP BY 1, 2
+        """,
+        keys_join="JOIN unnest(CAST(:keys AS date[])) AS k(day) ON m.created_at >= k.day AND m.created_at < k.day + 1",
+    ),
+    Mart(
+        name="mart_conversation_time_metrics",
+        sources=("raw_chatwoot_reporting_events", "raw_chatwoot_conversations"),
+        # Plus conversations whose creation day differs from the mart's (e.g. synced after their events)
+        changed_sql="""
+            SELECT DISTINCT conversation_id FROM raw_chatwoot_reporting_events WHERE synced_at > :since AND conversation_id IS NOT NULL
+            UNION
+            SELECT m.conversation_id FROM mart_conversation_time_metrics m
+            JOIN raw_chatwoot_conversations c ON c.conversation_id = m.conversation_id
+            WHERE c.synced_at > :since AND m.created_day IS DISTINCT FROM c.created_at_ts::date
+        """,
+        delete_sql="DELETE FROM mart_conversation_time_metrics WHERE conversation_id = ANY(CAST(:keys AS int[]))",
+        insert_sql="""
+            INSERT INTO mart_conversation_time_metrics (
+                conversation_id, created_day, inbox_id, first_response_seconds, resolution_seconds, reply_time_seconds,
+                first_response_bh_seconds, resolution_bh_seconds
+            )
+            SELECT
+                e.conversation_id,
+                MAX(DATE(c.created_at)),
+                MAX(e.inbox_id),
+                MAX(CASE WHEN e.name = 'first_response' THEN e.value_seconds END),
+                MAX(CASE WHEN e.name = 'conversion_resolution' OR e.name = 'resolution' THEN e.value_seconds END),
+                AVG(CASE WHEN e.name = 'reply_time' THEN e.value_seconds END),
+                MAX(CASE WHEN e.name = 'first_response' THEN e.value_business_hours_seconds END),
+                MAX(CASE WHEN e.name = 'conversion_resolution' OR e.name = 'resolution' THEN e.value_business_hours_seconds END)
+            FROM stg_reporting_events e {keys}
+            LEFT JOIN stg_conversations c ON c.conversation_id = e.conversation_id
+            GROUP BY 1
+        """,
+        keys_join="JOIN unnest(CAST(:keys AS int[])) AS k(conversation_id) ON e.conversation_id = k.conversation_id",
+    ),
+    # Quantile sketches (shared/utils/sketch.py) of the per-conversation time metrics,
+    # per conversation creation day, inbox and metric. Built from the staging views
+    # rather than mart_conversation_time_metrics, which may refresh concurrently.
+    Mart(
+        name="mart_time_metric_sketches",
+        sources=("raw_chatwoot_conversations", "raw_chatwoot_reporting_events"),
+        changed_sql="""
+            SELECT DISTINCT c.created_at_ts::date FROM raw_chatwoot_conversations c
+            WHERE c.created_at_ts IS NOT NULL AND (
+                c.synced_at > :since
+                OR c.conversation_id IN (SELECT conversation_id FROM raw_chatwoot_reporting_events WHERE synced_at > :since)
+            )
+        """,
+        delete_sql="DELETE FROM mart_time_metric_sketches WHERE day = ANY(CAST(:keys AS date[]))",
+        insert_sql="""
+            INSERT INTO mart_time_metric_sketches (day, inbox_id, metric, count, total, zero_count, buckets, counts)
+            WITH conversations AS (
+                SELECT
+                    DATE(c.created_at) AS day,
+                    MAX(e.inbox_id) AS inbox_id,
+                    MAX(CASE WHEN e.name = 'first_response' THEN e.value_seconds END)::float8 AS first_response,
+                    MAX(CASE WHEN e.name = 'conversion_resolution' OR e.name = 'resolution' THEN e.value_seconds END)::float8 AS resolution,
+                    AVG(CASE WHEN e.name = 'reply_time' THEN e.value_seconds END)::float8 AS reply_time
+                FROM stg_conversations c {keys}
+                JOIN stg_reporting_events e ON e.conversation_id = c.conversation_id
+                WHERE c.created_at IS NOT NULL
+                GROUP BY c.conversation_id, DATE(c.created_at)
+            ),
+            bucketed AS (
+                SELECT
+                    c.day, c.inbox_id, v.metric,
+                    CASE WHEN v.value > 0 THEN CEIL(LN(v.value) / """ + repr(LN_GAMMA) + """)::int END AS bucket,
+                    COUNT(*) AS n,
+                    SUM(v.value) AS total
+                FROM conversations c
+                CROSS JOIN LATERAL (VALUES
+                    ('first_response', c.first_response), ('resolution', c.resolution), ('reply_time', c.reply_time)
+                ) AS v(metric, value)
+                WHERE v.value IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+            )
+            SELECT
+                day, inbox_id, metric, SUM(n)::bigint, SUM(total),
+                COALESCE(SUM(n) FILTER (WHERE bucket IS NULL), 0)::bigint,
+                COALESCE(array_agg(bucket ORDER BY bucket) FILTER (WHERE bucket IS NOT NULL), '{{}}'),
+                COALESCE(array_agg(n ORDER BY bucket) FILTER (WHERE bucket IS NOT NULL), '{{}}')
+            FROM bucketed
+            GROUP BY 1, 2, 3
+        """,
+        keys_join="JOIN unnest(CAST(:keys AS date[])) AS k(day) ON c.created_at >= k.day AND c.created_at < k.day + 1",
+    ),
+]
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: str
+
+
+def list_migrations(directory: str = MIGRATIONS_DIR) -> List[Migration]:
+    """NNNN_name.sql files of `directory`, ordered by version."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Duplicate analytics migration versions in {directory}")
+    return migrations
+
+
+async def _schema_version(session) -> int:
+    exists = (await session.execute(text("SELECT to_regclass('analytics_schema_version')"))).scalar()
+    if not exists:
+        return 0
+    return (await session.execute(text("SELECT COALESCE(MAX(version), 0) FROM analytics_schema_version"))).scalar()
+
+
+async def init_analytics_schema(session, directory: str = MIGRATIONS_DIR) -> int:
+    """
+    Applies the analytics migrations newer than the recorded schema version,
+    each in its own transaction together with its version row. When the
+    schema is current this is two catalog reads and no DDL, so nothing locks
+    the marts against BI reads. Meant for startup only. Returns the number
+    of migrations applied.
+    """
+    migrations = list_migrations(directory)
+    if not migrations or await _schema_version(session) >= migrations[-1].version:
+        await session.rollback()
+        return 0
+
+    await session.execute(text(
+        "CREATE TABLE IF NOT EXISTS analytics_schema_version ("
+        "version INT PRIMARY KEY, name VARCHAR NOT NULL, applied_at TIMESTAMP NOT NULL DEFAULT NOW())"
+    ))
+    await session.commit()
+
+    applied = 0
+    for migration in migrations:
+        # Serializes concurrent starters; the version is re-read under the lock
+        await session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+        if await _schema_version(session) >= migration.version:
+            await session.rollback()
+            continue
+        with open(migration.path, "r") as f:
             sql_script = f.read()
-        
-        # Split by command if necessary or execute block
-        # SQLAlchemy execute text handles basic blocks usually
-        await session.execute(text(sql_script))
+        # Multi-statement scripts (and DO blocks) need the simple query protocol
+        conn = await session.connection()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.execute(sql_script)
+        await session.execute(
+            text("INSERT INTO analytics_schema_version (version, name) VALUES (:version, :name)"),
+            {"version": migration.version, "name": migration.name},
+        )
         await session.commit()
-        logger.info("Analytics Schema Initialized.")
-    except Exception as e:
-        logger.error(f"Failed to init analytics schema: {e}")
-        # Not raising, as it might be 'already exists' or syntax error we want to log but not crash worker loop
-        # Ideally we handle specific errors.
-
-async def refresh_marts(session):
-    """Refreshes Materialized Views and Takes Snapshots"""
+        applied += 1
+        logger.info(f"Applied analytics migration {migration.version:04d}_{migration.name}")
+    return applied
+
+
+@dataclass
+class RefreshResult:
+    status: str = "done"  # done, skipped, failed
+    keys_recomputed: Optional[int] = None  # None for a full rebuild
+    rows_deleted: int = 0
+    rows_inserted: int = 0
+    error: Optional[str] = None
+
+
+async def _refresh_state(session, name: str):
+    result = await session.execute(
+        text("SELECT watermark, source_changes FROM mart_refresh_state WHERE mart = :mart"), {"mart": name}
+    )
+    return result.first()
+
+
+async def _source_changes(session, tables: Sequence[str]) -> int:
+    return (await session.execute(text(SOURCE_CHANGES_SQL), {"tables": list(tables)})).scalar()
+
+
+async def _save_refresh_state(session, name: str, watermark: datetime, source_changes: int):
+    await session.execute(text("""
+        INSERT INTO mart_refresh_state (mart, watermark, source_changes, refreshed_at)
+        VALUES (:mart, :watermark, :source_changes, NOW())
+        ON CONFLICT (mart) DO UPDATE SET
+            watermark = EXCLUDED.watermark,
+            source_changes = EXCLUDED.source_changes,
+            refreshed_at = EXCLUDED.refreshed_at
+    """), {"mart": name, "watermark": watermark, "source_changes": source_changes})
+
+
+async def refresh_mart(session, mart: Mart) -> RefreshResult:
+    """
+    Recomputes only the mart rows of the keys whose source rows were synced
+    since the last refresh, in one transaction with the mart's new watermark,
+    so the cost follows the change volume rather than the history.
+    Skipped without writing when the source tables saw no change since the
+    last refresh; rebuilt when the mart has no watermark yet (first run).
+    """
+    started = (await session.execute(text("SELECT localtimestamp"))).scalar()
+    changes = await _source_changes(session, mart.sources)
+    state = await _refresh_state(session, mart.name)
+    if state is not None and state.source_changes == changes:
+        await session.rollback()
+        return RefreshResult(status="skipped", keys_recomputed=0)
+
+    result = RefreshResult()
+    if state is None:
+        result.rows_deleted = (await session.execute(text(f"DELETE FROM {mart.name}"))).rowcount
+        result.rows_inserted = (await session.execute(text(mart.insert_sql.format(keys="")))).rowcount
+    else:
+        since = state.watermark - timedelta(seconds=MART_WATERMARK_OVERLAP_SECONDS)
+        keys = [row[0] for row in await session.execute(text(mart.changed_sql), {"since": since})]
+        for i in range(0, len(keys), MART_KEYS_PER_STATEMENT):
+            chunk = {"keys": keys[i:i + MART_KEYS_PER_STATEMENT]}
+            result.rows_deleted += (await session.execute(text(mart.delete_sql), chunk)).rowcount
+            result.rows_inserted += (await session.execute(text(mart.insert_sql.format(keys=mart.keys_join)), chunk)).rowcount
+        result.keys_recomputed = len(keys)
+
+    await _save_refresh_state(session, mart.name, started, changes)
+    await session.commit()
+    return result
+
+
+async def snapshot_backlog(session) -> RefreshResult:
+    """Appends a backlog snapshot, unless conversations did not change since the last one."""
+    started = (await session.execute(text("SELECT localtimestamp"))).scalar()
+    changes = await _source_changes(session, BACKLOG_SOURCES)
+    state = await _refresh_state(session, BACKLOG_SNAPSHOT)
+    if state is not None and state.source_changes == changes:
+        # The latest snapshot still describes the current backlog
+        await session.rollback()
+        return RefreshResult(status="skipped")
+
+    # We group by inbox and status from STG_CONVERSATIONS
+    snapshot_sql = """
+    INSERT INTO mart_backlog_snapshot (snapshot_ts, inbox_id, status, count)
+    SELECT NOW(), inbox_id, status, COUNT(*)
+    FROM stg_conversations
+    WHERE status IN ('open', 'pending', 'snoozed', 'resolved')
+    GROUP BY inbox_id, status;
+    """
+    inserted = (await session.execute(text(snapshot_sql))).rowcount
+    await _save_refresh_state(session, BACKLOG_SNAPSHOT, started, changes)
+    await session.commit()
+    return RefreshResult(rows_inserted=inserted)
+
+
+async def _run_recorded(session_factory, kind: str, name: str, refresh) -> RefreshResult:
+    """Runs one refresh on its own connection and records it in data_hub_runs."""
+    started_at = datetime.utcnow()
+    started = time.perf_counter()
+    async with session_factory() as session:
+        try:
+            result = await refresh(session)
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error refreshing {name}: {e}")
+            result = RefreshResult(status="failed", error=str(e))
+        duration = time.perf_counter() - started
+        if result.status == "done":
+            MART_REFRESH_DURATION.labels(mart=name).observe(duration)
+        try:
+            session.add(DataHubRun(
+                kind=kind, name=name, status=result.status, started_at=started_at, duration_seconds=duration,
+                keys_recomputed=result.keys_recomputed, rows_deleted=result.rows_deleted,
+                rows_inserted=result.rows_inserted, error=result.error,
+            ))
+            await session.commit()
+        except Exception as e:
+            logger.warning(f"Could not record run of {name}: {e}")
+    logger.info(f"{name}: {result.status} in {duration:.2f}s (-{result.rows_deleted} +{result.rows_inserted} rows)")
+    return result
+
+
+async def refresh_marts(session_factory):
+    """
+    Refreshes the marts and the backlog snapshot concurrently, each on its
+    own connection (they write disjoint tables). Units whose sources did not
+    change are skipped. Every unit is recorded in data_hub_runs.
+    """
     logger.info("Refreshing Analytics Marts...")
-    
-    try:
-        # Refresh Materialized Views
-        await session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mart_inbox_daily_volume"))
-        await session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mart_agent_daily_volume"))
-        await session.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mart_conversation_time_metrics"))
-        
-        # Snapshot Backlog
-        # We group by inbox and status from STG_CONVERSATIONS
-        snapshot_sql = """
-        INSERT INTO mart_backlog_snapshot (snapshot_ts, inbox_id, status, count)
-        SELECT NOW(), inbox_id, status, COUNT(*)
-        FROM stg_conversations
-        WHERE status IN ('open', 'pending', 'snoozed', 'resolved')
-        GROUP BY inbox_id, status;
-        """
-        await session.execute(text(snapshot_sql))
-        
-        await session.commit()
-        logger.info("Analytics Marts Refreshed.")
-        
-    except Exception as e:
-        logger.error(f"Error refreshing marts: {e}")
-        # Note: XML/Concurrent refresh might fail if not populated first.
-        # If 'concurrently' fails (first run), try without.
-        if "without data" in str(e).lower() or "concurrently" in str(e).lower():
-            try:
-                await session.execute(text("REFRESH MATERIALIZED VIEW mart_inbox_daily_volume"))
-                await session.execute(text("REFRESH MATERIALIZED VIEW mart_agent_daily_volume"))
-                await session.execute(text("REFRESH MATERIALIZED VIEW mart_conversation_time_metrics"))
-                await session.commit()
-                logger.info("Analytics Marts Refreshed (Non-Concurrent).")
-            except Exception as e2:
-                 logger.error(f"Retry refresh failed: {e2}")
+    units = [("mart_refresh", mart.name, lambda session, mart=mart: refresh_mart(session, mart)) for mart in MARTS]
+    units.append(("backlog_snapshot", BACKLOG_SNAPSHOT, snapshot_backlog))
+    results = await asyncio.gather(*(_run_recorded(session_factory, *unit) for unit in units))
+    logger.info(f"Analytics Marts Refreshed: {sum(r.status == 'skipped' for r in results)} of {len(results)} unchanged.")
+    return results
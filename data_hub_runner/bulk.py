@@ -0,0 +1,253 @@
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Sequence
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+
+from app.models.data_hub import (
+    RawChatwootConversation, RawChatwootHeaderSet, RawChatwootMessage, RawChatwootPayload, RawChatwootReportingEvent,
+    content_hash,
+)
+
+logger = logging.getLogger("DataHubBulk")
+
+# asyncpg binds at most 32767 parameters per statement
+MAX_BIND_PARAMS = 32767
+# Set by the database on insert and on every real change (not on no-op upserts)
+SYNCED_AT = "synced_at"
+# Row key carrying the full payload, written to raw_chatwoot_payloads instead of the mirror
+PAYLOAD = "payload_json"
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    model: Any
+    key: str
+    # Columns overwritten when the row already exists
+    update_columns: Sequence[str]
+
+    @property
+    def table(self) -> str:
+        return self.model.__tablename__
+
+    @property
+    def columns(self) -> List[str]:
+        return [c.name for c in self.model.__table__.columns if c.name != SYNCED_AT]
+
+    @property
+    def conflict_columns(self) -> List[str]:
+        # Primary key: the id plus the partition column (partitioned tables cannot have a unique id alone)
+        return [c.name for c in self.model.__table__.primary_key.columns]
+
+    @property
+    def json_columns(self) -> List[str]:
+        return [c.name for c in self.model.__table__.columns if isinstance(c.type, JSONB)]
+
+
+CONVERSATIONS = TableSpec(RawChatwootConversation, "conversation_id", ("status", "assignee_id", "updated_at_ts", "last_activity_at", "unread_count", "content_hash"))
+MESSAGES = TableSpec(RawChatwootMessage, "message_id", ("content", "has_attachment", "updated_at_ts", "content_hash"))
+REPORTING_EVENTS = TableSpec(RawChatwootReportingEvent, "reporting_event_id", ("updated_at_ts", "content_hash"))
+
+
+# --- Row builders (Chatwoot payload -> column values) ---
+
+def _unix_datetime(value: Any):
+    return datetime.fromtimestamp(value) if isinstance(value, (int, float)) else None
+
+
+def _with_hash(row: Dict[str, Any], volatile: Sequence[str] = ("updated_at_ts",)) -> Dict[str, Any]:
+    """
+    Sets the row's content_hash from its typed column values, not the raw
+    payload: a webhook and the API describe the same message with differently
+    shaped payloads, and must not rewrite each other's rows. `volatile`
+    columns (ingest times) are left out.
+    """
+    row['content_hash'] = content_hash({k: v for k, v in row.items() if k != PAYLOAD and k not in volatile})
+    return row
+
+
+def conversation_row(conv_data: Dict[str, Any]) -> Dict[str, Any]:
+    meta = conv_data.get('meta') or {}
+    return _with_hash({
+        'conversation_id': conv_data['id'],
+        'account_id': conv_data['account_id'],
+        'inbox_id': conv_data['inbox_id'],
+        'status': conv_data['status'],
+        'assignee_id': meta['assignee']['id'] if meta.get('assignee') else None,
+        'contact_id': meta['sender']['id'] if meta.get('sender') else None,
+        'created_at_ts': datetime.fromtimestamp(conv_data['timestamp']),  # Timestamp is unix
+        'updated_at_ts': datetime.now(),
+        'last_activity_at': _unix_datetime(conv_data.get('last_activity_at')),
+        'unread_count': conv_data.get('unread_count'),
+        'payload_json': conv_data,
+    })
+
+
+def message_row(msg_data: Dict[str, Any]) -> Dict[str, Any]:
+    return _with_hash({
+        'message_id': msg_data['id'],
+        'conversation_id': msg_data['conversation_id'],
+        'account_id': msg_data['account_id'],
+        'inbox_id': msg_data['inbox_id'],
+        'message_type': msg_data['message_type'],
+        'content': msg_data.get('content'),
+        'private': msg_data.get('private', False),
+        'sender_type': msg_data.get('sender_type'),  # User/Contact
+        'sender_id': msg_data.get('sender_id'),
+        'has_attachment': bool(msg_data.get('attachments')),
+        'created_at_ts': datetime.fromtimestamp(msg_data['created_at']),
+        'updated_at_ts': datetime.now(),
+        'payload_json': msg_data,
+    })
+
+
+def reporting_event_row(evt: Dict[str, Any]) -> Dict[str, Any]:
+    return _with_hash({
+        'reporting_event_id': evt['id'],
+        'account_id': evt['account_id'],
+        'conversation_id': evt['conversation_id'],
+        'inbox_id': evt['inbox_id'],
+        'user_id': evt['user_id'],
+        'name': evt['name'],
+        'value_seconds': evt.get('value'),  # 'value' often holds seconds
+        'value_business_hours_seconds': None,
+        'event_start_time': datetime.fromtimestamp(evt['created_at']),
+        'event_end_time': datetime.fromtimestamp(evt['updated_at']),
+        'created_at_ts': datetime.now(),
+        'updated_at_ts': datetime.now(),
+        'payload_json': evt,
+    }, volatile=('created_at_ts', 'updated_at_ts'))
+
+
+def dedupe(spec: TableSpec, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Last row wins per key: ON CONFLICT cannot touch the same row twice in one statement."""
+    by_key = {row[spec.key]: row for row in rows}
+    return list(by_key.values())
+
+
+# --- Upsert paths ---
+
+async def upsert_rows(session, spec: TableSpec, rows: List[Dict[str, Any]], copy_threshold: int = 2000) -> int:
+    """
+    Upserts a batch in as few statements as possible: multi-row
+    INSERT ... ON CONFLICT below `copy_threshold` rows, COPY into a staging
+    table plus a single merge above it. Payloads of inserted or changed rows
+    go to raw_chatwoot_payloads in the same transaction. Does not commit.
+    Returns the number of rows inserted or changed.
+    """
+    rows = dedupe(spec, rows)
+    if not rows:
+        return 0
+    if copy_threshold and len(rows) >= copy_threshold:
+        return await upsert_rows_copy(session, spec, rows)
+    return await upsert_rows_values(session, spec, rows)
+
+
+async def upsert_rows_values(session, spec: TableSpec, rows: List[Dict[str, Any]]) -> int:
+    """
+    Multi-row INSERT ... ON CONFLICT DO UPDATE, chunked to the bind parameter
+    limit. Existing rows are only rewritten when their content hash changed.
+    """
+    chunk_size = max(1, MAX_BIND_PARAMS // len(spec.columns))
+    values = [{k: v for k, v in row.items() if k != PAYLOAD} for row in rows]
+    changed = []
+    for i in range(0, len(values), chunk_size):
+        stmt = pg_insert(spec.model).values(values[i:i + chunk_size])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=spec.conflict_columns,
+            set_={**{col: stmt.excluded[col] for col in spec.update_columns}, SYNCED_AT: func.now()},
+            where=spec.model.content_hash.is_distinct_from(stmt.excluded.content_hash),
+        ).returning(spec.model.content_hash)
+        result = await session.execute(stmt)
+        changed.extend(result.scalars().all())
+    await store_payloads(session, rows, changed)
+    return len(changed)
+
+
+async def upsert_rows_copy(session, spec: TableSpec, rows: List[Dict[str, Any]]) -> int:
+    """
+    COPY (binary) into a temp staging table, then one INSERT ... SELECT ...
+    ON CONFLICT into the target. Temp tables skip WAL like unlogged tables and
+    are private to the connection, so concurrent writers never share one.
+    """
+    staging = f"_stage_{spec.table}"
+    columns = spec.columns
+    json_columns = set(spec.json_columns)
+
+    await session.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {spec.table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    ))
+    # Staged rows are already deduplicated, the merge must not see leftovers of an earlier batch
+    await session.execute(text(f"TRUNCATE {staging}"))
+
+    records = [
+        tuple(json.dumps(row.get(col)) if col in json_columns and row.get(col) is not None else row.get(col) for col in columns)
+        for row in rows
+    ]
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(staging, records=records, columns=columns)
+
+    column_list = ", ".join(columns)
+    updates = ", ".join([f"{col} = EXCLUDED.{col}" for col in spec.update_columns] + [f"{SYNCED_AT} = now()"])
+    result = await session.execute(text(
+        f"INSERT INTO {spec.table} ({column_list}) SELECT {column_list} FROM {staging} "
+        f"ON CONFLICT ({', '.join(spec.conflict_columns)}) DO UPDATE SET {updates} "
+        f"WHERE {spec.table}.content_hash IS DISTINCT FROM EXCLUDED.content_hash "
+        f"RETURNING {spec.table}.content_hash"
+    ))
+    changed = result.scalars().all()
+    await store_payloads(session, rows, changed)
+    return len(changed)
+
+
+async def store_payloads(session, rows: List[Dict[str, Any]], changed_hashes: Iterable[str]) -> int:
+    """
+    Writes the payloads of the inserted or changed rows, keyed by content
+    hash. Unchanged rows already have theirs, identical payloads are stored once.
+    """
+    changed_hashes = set(changed_hashes)
+    payloads = {
+        row["content_hash"]: row[PAYLOAD] for row in rows
+        if row["content_hash"] in changed_hashes and row.get(PAYLOAD) is not None
+    }
+    values = [{"content_hash": h, "payload_json": p} for h, p in payloads.items()]
+    chunk_size = MAX_BIND_PARAMS // 2
+    for i in range(0, len(values), chunk_size):
+        stmt = pg_insert(RawChatwootPayload).values(values[i:i + chunk_size])
+        await session.execute(stmt.on_conflict_do_nothing(index_elements=["content_hash"]))
+    return len(values)
+
+
+async def rekey_header_sets(session) -> int:
+    """
+    Re-keys webhook header sets whose key is not `content_hash` of their
+    headers, as left by migrations/extract_raw_payloads.sql (SQL has md5, not
+    blake2b): the set moves to its live key, which the API computes for every
+    new delivery, and its events follow. A few rows read and nothing written
+    once converged. Commits. Returns the number of sets re-keyed.
+    """
+    table = RawChatwootHeaderSet.__tablename__
+    rows = (await session.execute(text(f"SELECT headers_hash, headers_json FROM {table}"))).all()
+    rekeyed = 0
+    for old_hash, headers in rows:
+        new_hash = content_hash(headers)
+        if new_hash == old_hash:
+            continue
+        await session.execute(
+            pg_insert(RawChatwootHeaderSet).values(headers_hash=new_hash, headers_json=headers)
+            .on_conflict_do_nothing(index_elements=["headers_hash"])
+        )
+        await session.execute(
+            text("UPDATE raw_chatwoot_events SET header_set_hash = :new WHERE header_set_hash = :old"),
+            {"new": new_hash, "old": old_hash},
+        )
+        await session.execute(text(f"DELETE FROM {table} WHERE headers_hash = :old"), {"old": old_hash})
+        rekeyed += 1
+    await session.commit()
+    if rekeyed:
+        logger.info(f"Re-keyed {rekeyed} webhook header sets")
+    return rekeyed
@@ -0,0 +1,257 @@
+"""
+Monthly range partitions of the raw tables.
+
+Each raw table is partitioned by month on its event/created timestamp
+(see `partitioned_by_month` in app/models/data_hub.py) and has a DEFAULT
+partition, so inserts never fail. Maintenance, run at worker startup and
+after every cycle, is a few catalog reads when there is nothing to do:
+- creates the partitions of the current month and DATA_HUB_PARTITION_MONTHS_AHEAD
+  months ahead, plus those of any month found in the default partition
+  (e.g. a backfill of old history), moving those rows in;
+- with a retention, detaches partitions older than it and moves them to the
+  archive schema, where they stay queryable until dropped or dumped.
+
+Tables created before partitioning are converted with
+`python -m data_hub_runner partitions --convert` (rewrites the table, run it
+in a maintenance window).
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.models.data_hub import RawChatwootEvent, RawChatwootMessage, RawChatwootReportingEvent
+
+logger = logging.getLogger("DataHubPartitions")
+
+# Serializes maintenance between the worker and the CLI
+PARTITIONS_LOCK_KEY = 7260432
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    model: object
+    column: str
+
+    @property
+    def table(self) -> str:
+        return self.model.__tablename__
+
+    @property
+    def default_partition(self) -> str:
+        return f"{self.table}_default"
+
+    def partition_name(self, month: date) -> str:
+        return f"{self.table}_p{month.year:04d}{month.month:02d}"
+
+
+EVENTS = PartitionedTable(RawChatwootEvent, "received_at")
+MESSAGES = PartitionedTable(RawChatwootMessage, "created_at_ts")
+REPORTING_EVENTS = PartitionedTable(RawChatwootReportingEvent, "event_start_time")
+PARTITIONED_TABLES = [EVENTS, MESSAGES, REPORTING_EVENTS]
+
+
+# --- Month arithmetic ---
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def months_to_create(today: date, ahead: int, pending: List[date], existing: List[date]) -> List[date]:
+    """Current month, `ahead` following months and the months of default-partition rows, minus existing ones."""
+    current = month_start(today)
+    wanted = {add_months(current, n) for n in range(ahead + 1)} | {month_start(m) for m in pending}
+    return sorted(wanted - set(existing))
+
+
+def months_to_archive(today: date, retention_months: int, existing: List[date]) -> List[date]:
+    """Partitions entirely older than the retention (0 keeps everything)."""
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(today), -retention_months)
+    return sorted(m for m in existing if m < cutoff)
+
+
+def parse_partition_month(table: str, partition: str) -> Optional[date]:
+    suffix = partition[len(table) + 2:] if partition.startswith(f"{table}_p") else ""
+    if len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return date(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+# --- Catalog ---
+
+async def is_partitioned(session, table: str) -> bool:
+    result = await session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+    ), {"table": table})
+    return result.scalar() is not None
+
+
+async def partition_months(session, spec: PartitionedTable) -> List[date]:
+    result = await session.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table"
+    ), {"table": spec.table})
+    months = [parse_partition_month(spec.table, name) for (name,) in result]
+    return sorted(m for m in months if m)
+
+
+async def pending_months(session, spec: PartitionedTable) -> List[date]:
+    """Months with rows in the default partition."""
+    result = await session.execute(text(
+        f"SELECT DISTINCT date_trunc('month', {spec.column})::date FROM {spec.default_partition} "
+        f"WHERE {spec.column} IS NOT NULL"
+    ))
+    return [m for (m,) in result]
+
+
+# --- DDL ---
+
+async def create_partition(session, spec: PartitionedTable, month: date):
+    """
+    Creates the partition of `month`, moving in any rows the default
+    partition holds for it (attaching over them would fail otherwise).
+    """
+    name, lo, hi = spec.partition_name(month), month, add_months(month, 1)
+    await session.execute(text(f"CREATE TABLE {name} (LIKE {spec.table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    await session.execute(text(
+        f"WITH moved AS (DELETE FROM {spec.default_partition} WHERE {spec.column} >= :lo AND {spec.column} < :hi RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"lo": lo, "hi": hi})
+    await session.execute(text(
+        f"ALTER TABLE {spec.table} ATTACH PARTITION {name} FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+    ))
+    logger.info(f"Created partition {name}")
+
+
+async def archive_partition(session, spec: PartitionedTable, month: date, archive_schema: str):
+    name = spec.partition_name(month)
+    await session.execute(text(f"ALTER TABLE {spec.table} DETACH PARTITION {name}"))
+    await session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+    archived = name
+    taken = await session.execute(text("SELECT to_regclass(:qualified)"), {"qualified": f"{archive_schema}.{name}"})
+    if taken.scalar() is not None:
+        # Late rows of an already archived month: keep both
+        archived = f"{name}_{int(time.time())}"
+        await session.execute(text(f"ALTER TABLE {name} RENAME TO {archived}"))
+    await session.execute(text(f"ALTER TABLE {archived} SET SCHEMA {archive_schema}"))
+    logger.info(f"Archived partition {name} to {archive_schema}.{archived}")
+
+
+async def maintain_partitions(
+    session, today: date, months_ahead: int, retention_months: Dict[str, int], archive_schema: str
+) -> Tuple[int, int]:
+    """
+    Creates missing monthly partitions and archives expired ones, one
+    transaction per table. Returns (created, archived).
+    """
+    created = archived = 0
+    for spec in PARTITIONED_TABLES:
+        try:
+            await session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITIONS_LOCK_KEY})
+            if not await is_partitioned(session, spec.table):
+                logger.warning(f"{spec.table} is not partitioned, run: python -m data_hub_runner partitions --convert")
+                await session.rollback()
+                continue
+            if (await session.execute(text("SELECT to_regclass(:name)"), {"name": spec.default_partition})).scalar() is None:
+                await session.execute(text(f"CREATE TABLE {spec.default_partition} PARTITION OF {spec.table} DEFAULT"))
+            existing = await partition_months(session, spec)
+            for month in months_to_create(today, months_ahead, await pending_months(session, spec), existing):
+                await create_partition(session, spec, month)
+                existing.append(month)
+                created += 1
+            for month in months_to_archive(today, retention_months.get(spec.table, 0), existing):
+                await archive_partition(session, spec, month, archive_schema)
+                archived += 1
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Partition maintenance of {spec.table} failed: {e}")
+    return created, archived
+
+
+async def convert_to_partitioned(session, spec: PartitionedTable, today: date, months_ahead: int):
+    """
+    Replaces a plain raw table by its partitioned version in one transaction:
+    renames it, creates the partitioned table from the model, creates the
+    partitions of every month it holds, copies the rows and drops it. Views
+    on the table are recreated from their definitions. Blocks the table
+    for the duration of the copy.
+    """
+    if await is_partitioned(session, spec.table):
+        logger.info(f"{spec.table} is already partitioned")
+        return
+    old = f"{spec.table}_unpartitioned"
+
+    # Captured before the rename: their definitions then name the new table
+    views = (await session.execute(text(
+        "SELECT DISTINCT v.relname, pg_get_viewdef(v.oid) FROM pg_depend d "
+        "JOIN pg_rewrite r ON r.oid = d.objid JOIN pg_class v ON v.oid = r.ev_class "
+        "WHERE d.refobjid = CAST(:table AS regclass) AND v.oid <> d.refobjid AND v.relkind = 'v'"
+    ), {"table": spec.table})).all()
+
+    await session.execute(text(f"ALTER TABLE {spec.table} RENAME TO {old}"))
+    # Free the index and sequence names for the new table
+    indexes = await session.execute(text(
+        "SELECT i.relname FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid WHERE x.indrelid = CAST(:old AS regclass)"
+    ), {"old": old})
+    for (index,) in indexes.all():
+        await session.execute(text(f"ALTER INDEX {index} RENAME TO {index}_old"))
+    sequences = (await session.execute(text(
+        "SELECT a.attname, pg_get_serial_sequence(:old, a.attname) FROM pg_attribute a "
+        "WHERE a.attrelid = CAST(:old AS regclass) AND a.attnum > 0 AND pg_get_serial_sequence(:old, a.attname) IS NOT NULL"
+    ), {"old": old})).all()
+    for _, sequence in sequences:
+        await session.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO {sequence.split('.')[-1]}_old"))
+
+    conn = await session.connection()
+    await conn.run_sync(lambda sync_conn: spec.model.__table__.create(sync_conn))
+
+    months = [m for (m,) in await session.execute(text(
+        f"SELECT DISTINCT date_trunc('month', {spec.column})::date FROM {old} WHERE {spec.column} IS NOT NULL"
+    ))]
+    for month in months_to_create(today, months_ahead, months, []):
+        await create_partition(session, spec, month)
+
+    columns = [c.name for c in spec.model.__table__.columns]
+    old_columns = {name for (name,) in await session.execute(text(
+        "SELECT attname FROM pg_attribute WHERE attrelid = CAST(:old AS regclass) AND attnum > 0 AND NOT attisdropped"
+    ), {"old": old})}
+    copied = [c for c in columns if c in old_columns]
+    # The partition column is now part of the primary key
+    select = [f"COALESCE({c}, '1970-01-01')" if c == spec.column else c for c in copied]
+    result = await session.execute(text(
+        f"INSERT INTO {spec.table} ({', '.join(copied)}) SELECT {', '.join(select)} FROM {old}"
+    ))
+    for column, _ in sequences:
+        await session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{spec.table}', '{column}'), "
+            f"(SELECT COALESCE(MAX({column}), 0) + 1 FROM {spec.table}), false)"
+        ))
+
+    await session.execute(text(f"DROP TABLE {old} CASCADE"))
+    for name, definition in views:
+        await session.execute(text(f"CREATE OR REPLACE VIEW {name} AS {definition.strip().rstrip(';')}"))
+    await session.commit()
+    logger.info(f"Converted {spec.table} to monthly partitions: {result.rowcount} rows, {len(months)} months")
+
+
+async def partition_summary(session, spec: PartitionedTable) -> List[Tuple[str, str, int]]:
+    """(partition, bounds, total size in bytes) of every partition of the table."""
+    result = await session.execute(text(
+        "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid), pg_total_relation_size(child.oid) "
+        "FROM pg_inherits i JOIN pg_class parent ON parent.oid = i.inhparent JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table ORDER BY child.relname"
+    ), {"table": spec.table})
+    return [tuple(row) for row in result]
@@ -0,0 +1,144 @@
+"""
+Real-time maintenance of the raw Chatwoot mirrors from webhooks.
+
+Every webhook is already persisted in `raw_chatwoot_events` by the API.
+This processor tails that table by id and upserts the conversations and
+messages it describes within seconds, in the same transaction as its id
+cursor (`data_hub_sync_state`, resource 'raw_events'). The periodic API
+sync then only has to reconcile what webhooks missed.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.models.data_hub import RawChatwootEvent
+from data_hub_runner.bulk import CONVERSATIONS, MESSAGES, conversation_row, message_row, upsert_rows
+from data_hub_runner.sync_state import load_position, save_position
+from shared.utils.metrics import REALTIME_EVENTS_APPLIED, REALTIME_LAG_SECONDS
+
+logger = logging.getLogger("DataHubRealtime")
+
+RESOURCE = "raw_events"
+MESSAGE_EVENTS = {"message_created", "message_updated"}
+CONVERSATION_EVENTS = {"conversation_created", "conversation_updated", "conversation_status_changed", "conversation_opened", "conversation_resolved"}
+# Webhooks carry enum names where the API returns integers
+MESSAGE_TYPES = {"incoming": 0, "outgoing": 1, "activity": 2, "template": 3}
+
+
+def _unix(value: Any) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(float(value))
+    except ValueError:
+        return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp())
+
+
+def _body(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Chatwoot sends the object at the top level; older relays wrap it in 'data'
+    return payload.get("data") or {k: v for k, v in payload.items() if k != "event"}
+
+
+def normalize_message(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Webhook message -> API-shaped message (the shape `message_row` expects)."""
+    msg = dict(_body(payload))
+    conversation = msg.get("conversation") or {}
+    if not msg.get("id") or not conversation.get("id"):
+        return None
+    sender = msg.get("sender") or {}
+    message_type = msg.get("message_type")
+    msg.update({
+        "conversation_id": conversation["id"],
+        "account_id": (payload.get("account") or {}).get("id") or msg.get("account_id"),
+        "inbox_id": (msg.get("inbox") or {}).get("id") or conversation.get("inbox_id"),
+        "message_type": MESSAGE_TYPES.get(message_type, message_type),
+        "sender_type": msg.get("sender_type") or (sender.get("type") or "").capitalize() or None,
+        "sender_id": msg.get("sender_id") or sender.get("id"),
+        "created_at": _unix(msg.get("created_at")),
+    })
+    return msg if msg["account_id"] and msg["inbox_id"] and msg["created_at"] else None
+
+
+def normalize_conversation(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Webhook conversation -> API-shaped conversation (the shape `conversation_row` expects)."""
+    conv = dict(_body(payload))
+    if not conv.get("id") or not conv.get("inbox_id"):
+        return None
+    conv["account_id"] = conv.get("account_id") or (payload.get("account") or {}).get("id")
+    created = _unix(conv.get("created_at")) or _unix(conv.get("timestamp"))
+    conv["timestamp"] = _unix(conv.get("timestamp")) or created
+    if created:
+        conv["created_at"] = created
+    return conv if conv["account_id"] and conv["timestamp"] else None
+
+
+def rows_from_events(events: List[RawChatwootEvent]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Conversation and message rows from a batch of raw events (later events win)."""
+    conversations, messages = [], []
+    for event in events:
+        try:
+            if event.event_name in MESSAGE_EVENTS:
+                msg = normalize_message(event.payload_json)
+                if msg:
+                    messages.append(message_row(msg))
+            elif event.event_name in CONVERSATION_EVENTS:
+                conv = normalize_conversation(event.payload_json)
+                if conv:
+                    conversations.append(conversation_row(conv))
+        except Exception as e:
+            # A malformed payload must not block the cursor, the reconciliation sync covers it
+            logger.warning(f"Skipping raw event {event.id} ({event.event_name}): {e}")
+    return conversations, messages
+
+
+async def apply_raw_events(session, account_id: int, batch_size: int = 500, settle_seconds: float = 2.0) -> int:
+    """
+    Applies the next batch of raw events after the cursor and commits rows
+    and cursor together. Events younger than `settle_seconds` wait for the
+    next poll, so inserts that commit out of id order are not skipped.
+    Returns the number of events consumed.
+    """
+    position = await load_position(session, account_id, RESOURCE)
+    result = await session.execute(
+        select(RawChatwootEvent)
+        .where(
+            RawChatwootEvent.id > position,
+            RawChatwootEvent.received_at <= datetime.utcnow() - timedelta(seconds=settle_seconds),
+        )
+        .order_by(RawChatwootEvent.id)
+        .limit(batch_size)
+    )
+    events = [e for e in result.scalars()]
+    if not events:
+        return 0
+
+    own = [e for e in events if e.account_id in (None, account_id)]
+    conversations, messages = rows_from_events(own)
+    await upsert_rows(session, CONVERSATIONS, conversations)
+    await upsert_rows(session, MESSAGES, messages)
+    await save_position(session, account_id, RESOURCE, events[-1].id)
+    await session.commit()
+
+    REALTIME_EVENTS_APPLIED.inc(len(events))
+    REALTIME_LAG_SECONDS.set((datetime.utcnow() - events[-1].received_at).total_seconds())
+    logger.debug(f"Applied raw events up to {events[-1].id}: {len(conversations)} conversations, {len(messages)} messages")
+    return len(events)
+
+
+async def run_realtime_loop(session_factory, account_id: int, interval_seconds: float = 2.0, batch_size: int = 500):
+    """Polls raw_chatwoot_events; drains the backlog in batches, then sleeps."""
+    logger.info(f"Real-time raw processor started (every {interval_seconds}s)")
+    while True:
+        try:
+            async with session_factory() as session:
+                applied = await apply_raw_events(session, account_id, batch_size)
+        except Exception as e:
+            logger.error(f"Real-time raw processing failed: {e}")
+            applied = 0
+        if applied < batch_size:
+            await asyncio.sleep(interval_seconds)
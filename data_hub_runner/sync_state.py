@@ -0,0 +1,89 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models.data_hub import DataHubSyncState
+
+logger = logging.getLogger("DataHubSyncState")
+
+
+async def load_watermark(session, account_id: int, resource: str) -> Optional[datetime]:
+    result = await session.execute(
+        select(DataHubSyncState.watermark).where(
+            DataHubSyncState.account_id == account_id,
+            DataHubSyncState.resource == resource,
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def save_watermark(session, account_id: int, resource: str, watermark: datetime):
+    stmt = pg_insert(DataHubSyncState).values(
+        account_id=account_id,
+        resource=resource,
+        watermark=watermark,
+        updated_at=datetime.utcnow(),
+    ).on_conflict_do_update(
+        index_elements=['account_id', 'resource'],
+        set_={'watermark': watermark, 'updated_at': datetime.utcnow()},
+    )
+    await session.execute(stmt)
+    await session.commit()
+    logger.info(f"Watermark for {resource} (account {account_id}) moved to {watermark}")
+
+
+async def load_position(session, account_id: int, resource: str) -> int:
+    result = await session.execute(
+        select(DataHubSyncState.position).where(
+            DataHubSyncState.account_id == account_id,
+            DataHubSyncState.resource == resource,
+        )
+    )
+    return result.scalar_one_or_none() or 0
+
+
+async def save_position(session, account_id: int, resource: str, position: int):
+    """Does not commit: meant to be saved in the same transaction as the rows it covers."""
+    stmt = pg_insert(DataHubSyncState).values(
+        account_id=account_id,
+        resource=resource,
+        position=position,
+        updated_at=datetime.utcnow(),
+    ).on_conflict_do_update(
+        index_elements=['account_id', 'resource'],
+        set_={'position': position, 'updated_at': datetime.utcnow()},
+    )
+    await session.execute(stmt)
+
+
+def sync_since_ts(watermark: Optional[datetime], now_ts: float, days_window: int, overlap_seconds: int) -> Optional[float]:
+    """
+    Lower bound (unix ts) of the activity to sync this cycle.
+
+    With a watermark: the watermark minus a small overlap, for activity
+    recorded while the previous cycle was paging. Without one (first run):
+    the last `days_window` days, or the full history when the window is 0.
+    """
+    if watermark is not None:
+        return watermark.timestamp() - overlap_seconds
+    if days_window > 0:
+        return now_ts - days_window * 86400
+    return None
+
+
+def conversation_activity_ts(conv: Dict[str, Any]) -> int:
+    return conv.get('last_activity_at') or conv.get('timestamp') or 0
+
+
+def select_changed(conversations: List[Dict[str, Any]], since_ts: Optional[float]) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Splits a page sorted by last activity (newest first) at `since_ts`.
+    Returns the conversations active since then and whether paging can stop.
+    """
+    if since_ts is None:
+        return conversations, False
+    changed = [c for c in conversations if conversation_activity_ts(c) >= since_ts]
+    return changed, len(changed) < len(conversations)
@@ -2,101 +2,38 @@ import asyncio
 import logging
 import os
 import sys
-from datetime import datetime
+import time
+from collections import Counter
+from contextlib import aclosing
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 
 # Ensure we can import from platform_api and shared
 sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "platform_api"))
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import select, update
+from sqlalchemy.orm import sessionmaker, selectinload
 
+from app.models.data_hub import DataHubSyncState, DataHubBackfillJob, DataHubBackfillShard, DataHubReconcileBucket, DataHubRun, RawChatwootHeaderSet, RawChatwootPayload
 from data_hub_runner.analytics import init_analytics_schema, refresh_marts
+from data_hub_runner.bulk import (
+    CONVERSATIONS, MESSAGES, REPORTING_EVENTS,
+    conversation_row, message_row, rekey_header_sets, reporting_event_row, upsert_rows,
+)
+from data_hub_runner.partitions import maintain_partitions
+from data_hub_runner.realtime import run_realtime_loop
+from data_hub_runner.reconcile import (
+    Bucket, diff_buckets, inboxes_of, is_known_persistent, load_bucket_states,
+    local_buckets, merge_ranges, remote_buckets, save_bucket_states,
+)
+from data_hub_runner.writer import BatchWriter
+from data_hub_runner.sync_state import load_watermark, save_watermark, sync_since_ts, select_changed, conversation_activity_ts
+from shared.libs.chatwoot_client import ChatwootClient
+from shared.utils.metrics import BACKFILL_ROWS, BACKFILL_ROWS_UNCHANGED, BACKFILL_ROWS_PER_SECOND, BACKFILL_DURATION, RECONCILE_BUCKETS, start_metrics_server
 
-# ... (Previous Code)
-
-async def process_conversation(session, client, conv, processed_count):
-    """Process a single conversation: Upsert Conv, Msgs, Reports"""
-    conv_id = conv['id']
-    try:
-        # 1. Upsert Conversation
-        await upsert_conversation(session, conv)
-        
-        # 2. Fetch & Upsert Messages
-        msgs_data = await client.get_messages(conv_id)
-        messages = msgs_data.get('payload', [])
-        for msg in messages:
-            await upsert_message(session, msg)
-            
-        # 3. Fetch & Upsert Reporting Events
-        try:
-            report_data = await client.get_conversation_reporting_events(conv_id)
-            if isinstance(report_data, list):
-                await upsert_reporting_events(session, report_data)
-        except Exception as e:
-            logger.warning(f"Could not fetch reporting events for conv {conv_id}: {e}")
-
-        return True
-    
-    except Exception as e:
-        logger.error(f"Error processing conv {conv_id}: {e}")
-        return False
-
-async def run_backfill():
-    """Main Backfill Logic"""
-    logger.info("Starting Backfill...")
-    client = ChatwootClient(
-        base_url=settings.CHATWOOT_BASE_URL,
-        api_access_token=settings.CHATWOOT_API_TOKEN,
-        account_id=settings.CHATWOOT_ACCOUNT_ID
-    )
-    
-    async with AsyncSessionLocal() as session:
-        await init_analytics_schema(session)
-
-        page = 1
-        total_processed = 0
-        
-        while True:
-            logger.info(f"Fetching Conversations Page {page}...")
-            data = await client.list_conversations(page=page, status='all')
-            conversations = data.get('data', {}).get('payload', [])
-            meta = data.get('data', {}).get('meta', {})
-            
-            if not conversations:
-                break
-                
-            for conv in conversations:
-                if await process_conversation(session, client, conv, total_processed):
-                    total_processed += 1
-
-            await session.commit()
-            
-            current_page = meta.get('current_page', page)
-            total_pages = meta.get('total_pages', page)
-            if current_page >= total_pages:
-                break
-            page += 1
-            
-        logger.info(f"Backfill Complete. Processed {total_processed} conversations.")
-        
-        await refresh_marts(session)
-
-async def main():
-    logger.info(f"Data Hub Runner Started. Interval: {settings.DATA_HUB_BACKFILL_INTERVAL_SECONDS}s")
-    
-    # Run once at startup
-    async with AsyncSessionLocal() as session:
-        await init_analytics_schema(session)
-
-    while True:
-        try:
-            await run_backfill()
-        except Exception as e:
-            logger.error(f"Backfill Job Failed: {e}")
-        
-        await asyncio.sleep(settings.DATA_HUB_BACKFILL_INTERVAL_SECONDS)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("DataHubRunner")
 
@@ -105,8 +42,39 @@ class Settings(BaseSettings):
     CHATWOOT_BASE_URL: str
     CHATWOOT_API_TOKEN: str # User token for API access (not the webhook token)
     CHATWOOT_ACCOUNT_ID: int
+    # Periodic API sync; with the real-time processor it only reconciles what webhooks missed
     DATA_HUB_BACKFILL_INTERVAL_SECONDS: int = 1800
+    # Apply webhook events (raw_chatwoot_events) to the raw mirrors within seconds
+    DATA_HUB_REALTIME_ENABLED: bool = True
+    DATA_HUB_REALTIME_INTERVAL_SECONDS: float = 2.0
+    # First sync (no watermark yet) only covers this many days; 0 = full history
     DATA_HUB_BACKFILL_DAYS_WINDOW: int = 7
+    # Shards of the initial sync job (and default --parallel of the backfill CLI)
+    DATA_HUB_BACKFILL_PARALLEL: int = 4
+    # Re-read this much activity before the watermark, for changes made while the last cycle was paging
+    DATA_HUB_WATERMARK_OVERLAP_SECONDS: int = 300
+    # Max Chatwoot requests in flight at once (fetch fan-out)
+    DATA_HUB_MAX_CONCURRENCY: int = 8
+    # Rows buffered per table before the writer flushes a batch
+    DATA_HUB_WRITE_BATCH_SIZE: int = 1000
+    # Pending write items before fetch tasks block (backpressure)
+    DATA_HUB_WRITE_QUEUE_SIZE: int = 1000
+    # 'account': reporting events from the account endpoint by time window (per-conversation only as fallback)
+    # 'conversation': one request per changed conversation
+    DATA_HUB_REPORTING_EVENTS_MODE: str = "account"
+    # Batches at least this large are loaded with COPY + merge instead of multi-row INSERT
+    DATA_HUB_COPY_THRESHOLD: int = 1000
+    # Per-day bucket reconciliation against Chatwoot's reports; 0 disables it
+    DATA_HUB_RECONCILE_INTERVAL_SECONDS: int = 86400
+    # Full days (up to yesterday) covered by the periodic reconciliation
+    DATA_HUB_RECONCILE_DAYS: int = 30
+    # Monthly partitions of the raw tables created ahead of time
+    DATA_HUB_PARTITION_MONTHS_AHEAD: int = 2
+    # Months kept in the raw tables before partitions move to the archive schema; 0 = keep everything
+    DATA_HUB_RETENTION_MONTHS_EVENTS: int = 0
+    DATA_HUB_RETENTION_MONTHS_MESSAGES: int = 0
+    DATA_HUB_RETENTION_MONTHS_REPORTING_EVENTS: int = 0
+    DATA_HUB_ARCHIVE_SCHEMA: str = "raw_archive"
 
     class Config:
         env_file = ".env"
@@ -118,149 +86,560 @@ settings = Settings()
 engine = create_async_engine(settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"))
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
-async def upsert_conversation(session, conv_data):
-    """Upsert Conversation Record"""
-    stmt = pg_insert(RawChatwootConversation).values(
-        conversation_id=conv_data['id'],
-        account_id=conv_data['account_id'],
-        inbox_id=conv_data['inbox_id'],
-        status=conv_data['status'],
-        assignee_id=conv_data['meta']['assignee']['id'] if conv_data.get('meta', {}).get('assignee') else None,
-        contact_id=conv_data['meta']['sender']['id'] if conv_data.get('meta', {}).get('sender') else None,
-        created_at_ts=datetime.fromtimestamp(conv_data['timestamp']), # Timestamp is unix
-        updated_at_ts=datetime.now(), # Estimate or parse from payload if available
-        payload_json=conv_data
-    ).on_conflict_do_update(
-        index_elements=['conversation_id'],
-        set_={
-            'status': conv_data['status'],
-            'assignee_id': conv_data['meta']['assignee']['id'] if conv_data.get('meta', {}).get('assignee') else None,
-            'updated_at_ts': datetime.now(),
-            'payload_json': conv_data
-        }
+async def upsert_conversations(session, conversations):
+    return await upsert_rows(session, CONVERSATIONS, [conversation_row(c) for c in conversations], settings.DATA_HUB_COPY_THRESHOLD)
+
+async def upsert_messages(session, messages):
+    return await upsert_rows(session, MESSAGES, [message_row(m) for m in messages], settings.DATA_HUB_COPY_THRESHOLD)
+
+async def upsert_reporting_events(session, events):
+    return await upsert_rows(session, REPORTING_EVENTS, [reporting_event_row(e) for e in events], settings.DATA_HUB_COPY_THRESHOLD)
+
+
+TABLE_WRITERS = {
+    "raw_chatwoot_conversations": upsert_conversations,
+    "raw_chatwoot_messages": upsert_messages,
+    "raw_chatwoot_reporting_events": upsert_reporting_events,
+}
+
+
+def _count_rows(table, count, changed):
+    BACKFILL_ROWS.labels(table=table).inc(count)
+    BACKFILL_ROWS_UNCHANGED.labels(table=table).inc(count - changed)
+
+
+async def process_conversation(client, conv, writer, semaphore, messages_since_ts=None, fetch_reports=False):
+    """
+    Fetches one conversation's messages (and, in fallback mode, its reporting
+    events) and queues all rows for the writer.
+    Message pages are walked newest first; with `messages_since_ts` paging stops
+    once a page reaches messages older than that (already synced).
+    """
+    conv_id = conv['id']
+    try:
+        await writer.put("raw_chatwoot_conversations", [conv])
+
+        async with aclosing(client.iter_messages(conv_id)) as pages:
+            while True:
+                async with semaphore:
+                    messages = await anext(pages, None)
+                if messages is None:
+                    break
+                await writer.put("raw_chatwoot_messages", messages)
+                if messages_since_ts and min(m.get('created_at') or 0 for m in messages) < messages_since_ts:
+                    break
+
+        if fetch_reports:
+            # Endpoint is not available on every Chatwoot version, skip on error
+            try:
+                async with semaphore:
+                    report_data = await client.get_conversation_reporting_events(conv_id)
+                if isinstance(report_data, list):
+                    await writer.put("raw_chatwoot_reporting_events", report_data)
+            except Exception as e:
+                logger.warning(f"Could not fetch reporting events for conv {conv_id}: {e}")
+
+        return True
+
+    except Exception as e:
+        logger.error(f"Error processing conv {conv_id}: {e}")
+        return False
+
+
+async def sync_reporting_events(client, writer, until_ts):
+    """
+    Account-level sync of reporting events created since the watermark,
+    a few paged requests instead of one per conversation.
+    Returns (events queued, watermark to store) or raises if the endpoint fails.
+    """
+    async with AsyncSessionLocal() as session:
+        watermark = await load_watermark(session, settings.CHATWOOT_ACCOUNT_ID, "reporting_events")
+    since_ts = sync_since_ts(
+        watermark, until_ts, settings.DATA_HUB_BACKFILL_DAYS_WINDOW, settings.DATA_HUB_WATERMARK_OVERLAP_SECONDS
     )
-    await session.execute(stmt)
-
-async def upsert_message(session, msg_data):
-    """Upsert Message Record"""
-    stmt = pg_insert(RawChatwootMessage).values(
-        message_id=msg_data['id'],
-        conversation_id=msg_data['conversation_id'],
-        account_id=msg_data['account_id'],
-        inbox_id=msg_data['inbox_id'],
-        message_type=msg_data['message_type'],
-        content=msg_data.get('content'),
-        private=msg_data.get('private', False),
-        sender_type=msg_data.get('sender_type'), # User/Contact
-        sender_id=msg_data.get('sender_id'), # or sender['id']
-        created_at_ts=datetime.fromtimestamp(msg_data['created_at']),
-        updated_at_ts=datetime.now(),
-        payload_json=msg_data
-    ).on_conflict_do_update(
-        index_elements=['message_id'],
-        set_={
-            'content': msg_data.get('content'),
-            'updated_at_ts': datetime.now(),
-            'payload_json': msg_data
-        }
+    logger.info(f"Syncing reporting events since {datetime.fromtimestamp(since_ts) if since_ts else 'the beginning'}")
+
+    count = 0
+    async with aclosing(client.iter_account_reporting_event_pages(since=int(since_ts or 0), until=int(until_ts))) as pages:
+        async for events in pages:
+            await writer.put("raw_chatwoot_reporting_events", events)
+            count += len(events)
+    return count, datetime.fromtimestamp(until_ts)
+
+
+async def sync_conversations(client, writer, semaphore, fetch_reports):
+    """
+    Walks conversations by last activity, newest first, until the watermark.
+    Returns (processed, failed, watermark to store or None).
+    """
+    async with AsyncSessionLocal() as session:
+        watermark = await load_watermark(session, settings.CHATWOOT_ACCOUNT_ID, "conversations")
+    since_ts = sync_since_ts(
+        watermark, time.time(), settings.DATA_HUB_BACKFILL_DAYS_WINDOW, settings.DATA_HUB_WATERMARK_OVERLAP_SECONDS
     )
-    await session.execute(stmt)
+    logger.info(f"Syncing conversations active since {datetime.fromtimestamp(since_ts) if since_ts else 'the beginning'}")
 
-async def upsert_reporting_events(session, events):
-    """Upsert Reporting Events"""
-    for evt in events:
-        stmt = pg_insert(RawChatwootReportingEvent).values(
-            reporting_event_id=evt['id'],
-            account_id=evt['account_id'],
-            conversation_id=evt['conversation_id'],
-            inbox_id=evt['inbox_id'],
-            user_id=evt['user_id'],
-            name=evt['name'],
-            value_seconds=evt.get('value'), # 'value' often holds seconds
-            value_business_hours_seconds=None, # Need to check payload structure
-            event_start_time=datetime.fromtimestamp(evt['created_at']), # Using created_at as start?
-            event_end_time=datetime.fromtimestamp(evt['updated_at']),
-            created_at_ts=datetime.now(),
-            updated_at_ts=datetime.now(),
-            payload_json=evt
-        ).on_conflict_do_update(
-            index_elements=['reporting_event_id'],
-            set_={'payload_json': evt, 'updated_at_ts': datetime.now()}
+    # Incremental cycles only need messages newer than the watermark, the first sync takes whole threads
+    messages_since_ts = since_ts if watermark else None
+
+    page = 0
+    processed_count = 0
+    failed_count = 0
+    newest_activity = None
+
+    # The next conversations page is prefetched while this one is processed
+    async with aclosing(client.iter_conversation_pages(status='all', sort_by='latest')) as pages:
+        async for conversations in pages:
+            page += 1
+            changed, reached_watermark = select_changed(conversations, since_ts)
+            logger.info(f"Conversations Page {page}: {len(changed)}/{len(conversations)} changed")
+            if changed:
+                newest_activity = max(newest_activity or 0, max(conversation_activity_ts(c) for c in changed))
+
+            results = await asyncio.gather(*(
+                process_conversation(client, conv, writer, semaphore, messages_since_ts, fetch_reports)
+                for conv in changed
+            ))
+            processed_count += sum(1 for ok in results if ok)
+            failed_count += sum(1 for ok in results if not ok)
+
+            if reached_watermark:
+                break
+
+    new_watermark = datetime.fromtimestamp(newest_activity) if newest_activity else None
+    return processed_count, failed_count, new_watermark
+
+
+# --- Checkpointed backfill jobs ---
+
+def _ts(value: Optional[datetime]) -> Optional[float]:
+    return value.timestamp() if value else None
+
+
+async def create_backfill_job(since=None, until=None, inbox_id=None, parallel=1, trigger="cli") -> int:
+    """
+    Creates a job with `parallel` conversation shards (page stride sharding)
+    plus, for account-wide jobs, one reporting events shard.
+    `until` defaults to now so the job covers a fixed window when resumed.
+    """
+    parallel = max(1, parallel)
+    async with AsyncSessionLocal() as session:
+        job = DataHubBackfillJob(
+            account_id=settings.CHATWOOT_ACCOUNT_ID,
+            since=since,
+            until=until or datetime.now(),
+            inbox_id=inbox_id,
+            parallel=parallel,
+            trigger=trigger,
+        )
+        job.shards = [
+            DataHubBackfillShard(kind="conversations", first_page=k + 1, stride=parallel, next_page=k + 1)
+            for k in range(parallel)
+        ]
+        if inbox_id is None:
+            job.shards.append(DataHubBackfillShard(kind="reporting_events"))
+        session.add(job)
+        await session.commit()
+        logger.info(f"Created backfill job {job.id}: {since} -> {job.until}, inbox={inbox_id}, {parallel} shards")
+        return job.id
+
+
+async def find_resumable_job(since=None, until=None, inbox_id=None, trigger="cli") -> Optional[int]:
+    """Latest unfinished job with the same parameters (for `initial`, any unfinished one)."""
+    async with AsyncSessionLocal() as session:
+        stmt = select(DataHubBackfillJob.id).where(
+            DataHubBackfillJob.account_id == settings.CHATWOOT_ACCOUNT_ID,
+            DataHubBackfillJob.trigger == trigger,
+            DataHubBackfillJob.status != "done",
+        )
+        if trigger != "initial":
+            stmt = stmt.where(
+                DataHubBackfillJob.since.is_(None) if since is None else DataHubBackfillJob.since == since,
+                DataHubBackfillJob.inbox_id.is_(None) if inbox_id is None else DataHubBackfillJob.inbox_id == inbox_id,
+            )
+            if until is not None:
+                stmt = stmt.where(DataHubBackfillJob.until == until)
+        result = await session.execute(stmt.order_by(DataHubBackfillJob.id.desc()).limit(1))
+        return result.scalar_one_or_none()
+
+
+async def _checkpoint(shard_id: int, **values):
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(DataHubBackfillShard).where(DataHubBackfillShard.id == shard_id).values(updated_at=datetime.utcnow(), **values)
+        )
+        await session.commit()
+
+
+async def _run_conversation_shard(client, job, shard, writer, semaphore):
+    since_ts, until_ts = _ts(job.since), _ts(job.until)
+    page = shard.next_page
+    while True:
+        async with semaphore:
+            data = await client.list_conversations(page=page, status='all', inbox_id=job.inbox_id, sort_by='created_at_asc')
+        conversations = data.get('data', {}).get('payload', [])
+        meta = data.get('data', {}).get('meta', {})
+        if not conversations:
+            return
+
+        # Created-at ascending: once a whole page starts after `until`, so do all later pages
+        if until_ts and all((c.get('timestamp') or 0) > until_ts for c in conversations):
+            return
+        selected = [
+            c for c in conversations
+            if (not since_ts or conversation_activity_ts(c) >= since_ts)
+            and (not until_ts or (c.get('timestamp') or 0) <= until_ts)
+        ]
+        results = await asyncio.gather(*(
+            process_conversation(client, conv, writer, semaphore, fetch_reports=job.inbox_id is not None)
+            for conv in selected
+        ))
+        await writer.drain()
+        if not all(results) or writer.failed_tables:
+            raise RuntimeError(f"page {page}: {results.count(False)} conversations failed, failed tables {sorted(writer.failed_tables)}")
+
+        page += shard.stride
+        shard.items_done += len(selected)
+        await _checkpoint(shard.id, next_page=page, items_done=shard.items_done)
+        if page > meta.get('total_pages', page):
+            return
+
+
+async def _run_reporting_events_shard(client, job, shard, writer):
+    page = shard.next_page
+    while True:
+        data = await client.get_account_reporting_events(
+            page=page, since=int(_ts(job.since) or 0), until=int(_ts(job.until) or time.time())
+        )
+        events = data if isinstance(data, list) else data.get('payload', [])
+        if not events:
+            return
+        await writer.put("raw_chatwoot_reporting_events", events)
+        await writer.drain()
+        if writer.failed_tables:
+            raise RuntimeError(f"page {page}: failed to write reporting events")
+
+        page += 1
+        shard.items_done += len(events)
+        await _checkpoint(shard.id, next_page=page, items_done=shard.items_done)
+        meta = data.get('meta', {}) if isinstance(data, dict) else {}
+        if 'total_pages' in meta and page > meta['total_pages']:
+            return
+
+
+async def _run_shard(client, job, shard, semaphore) -> bool:
+    # One writer per shard: a checkpoint only waits for (and only trusts) its own rows
+    writer = BatchWriter(
+        AsyncSessionLocal,
+        TABLE_WRITERS,
+        batch_size=settings.DATA_HUB_WRITE_BATCH_SIZE,
+        queue_size=settings.DATA_HUB_WRITE_QUEUE_SIZE,
+        on_flush=_count_rows,
+    ).start()
+    await _checkpoint(shard.id, status="running", error=None)
+    try:
+        if shard.kind == "reporting_events":
+            await _run_reporting_events_shard(client, job, shard, writer)
+        else:
+            await _run_conversation_shard(client, job, shard, writer, semaphore)
+    except Exception as e:
+        logger.error(f"Backfill job {job.id} shard {shard.id} ({shard.kind}) stopped: {e}")
+        await _checkpoint(shard.id, status="failed", error=str(e))
+        return False
+    finally:
+        await writer.close()
+    await _checkpoint(shard.id, status="done", finished_at=datetime.utcnow())
+    logger.info(f"Backfill job {job.id} shard {shard.id} ({shard.kind}) done: {shard.items_done} items")
+    return True
+
+
+async def run_backfill_job(client, job_id: int) -> bool:
+    """
+    Runs (or resumes) a job: every unfinished shard continues from its
+    checkpointed page, shards run concurrently. Returns True when all are done.
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(DataHubBackfillJob).options(selectinload(DataHubBackfillJob.shards)).where(DataHubBackfillJob.id == job_id)
+        )
+        job = result.scalar_one()
+        job.status = "running"
+        await session.commit()
+        shards = [s for s in job.shards if s.status != "done"]
+
+    logger.info(f"Running backfill job {job_id}: {len(shards)} shards left of {len(job.shards)}")
+    semaphore = asyncio.Semaphore(settings.DATA_HUB_MAX_CONCURRENCY)
+    results = await asyncio.gather(*(_run_shard(client, job, shard, semaphore) for shard in shards))
+
+    ok = all(results)
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(DataHubBackfillJob).where(DataHubBackfillJob.id == job_id).values(
+                status="done" if ok else "failed",
+                finished_at=datetime.utcnow() if ok else None,
+                error=None if ok else f"{results.count(False)} shards failed",
+            )
         )
-        await session.execute(stmt)
+        await session.commit()
+    return ok
+
+
+async def run_initial_backfill(client) -> Optional[datetime]:
+    """
+    First sync of the periodic worker, as a resumable job over the last
+    DATA_HUB_BACKFILL_DAYS_WINDOW days. Returns the job's `until` once done,
+    to be used as the starting watermark.
+    """
+    job_id = await find_resumable_job(trigger="initial")
+    if job_id is None:
+        since = None
+        if settings.DATA_HUB_BACKFILL_DAYS_WINDOW > 0:
+            since = datetime.now() - timedelta(days=settings.DATA_HUB_BACKFILL_DAYS_WINDOW)
+        job_id = await create_backfill_job(
+            since=since, parallel=settings.DATA_HUB_BACKFILL_PARALLEL, trigger="initial"
+        )
+    if not await run_backfill_job(client, job_id):
+        return None
+    async with AsyncSessionLocal() as session:
+        job = await session.get(DataHubBackfillJob, job_id)
+        return job.until
+
+
+async def run_reconciliation(client, since: date, until: date, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Compares per-day, per-inbox message buckets of [since, until) with
+    Chatwoot's reports and re-syncs only the buckets that differ, as one
+    checkpointed job per inbox and run of consecutive days.
+    Returns the number of buckets per verdict.
+    """
+    account_id = settings.CHATWOOT_ACCOUNT_ID
+    async with AsyncSessionLocal() as session:
+        local = await local_buckets(session, account_id, since, until)
+        states = await load_bucket_states(session, account_id, since, until)
+    inbox_ids = {inbox["id"] for inbox in await client.list_inboxes()} | inboxes_of(local)
+    remote = await remote_buckets(client, inbox_ids, since, until)
+
+    empty = Bucket(0, 0, 0)
+    verdicts = {key: ("match", local.get(key, empty), remote.get(key, empty)) for key in local.keys() | remote.keys()}
+    differing = []
+    for key in diff_buckets(local, remote):
+        if is_known_persistent(states.get(key), local.get(key, empty), remote.get(key, empty)):
+            verdicts[key] = ("persistent",) + verdicts[key][1:]
+        else:
+            differing.append(key)
+    logger.info(f"Reconciliation {since} -> {until}: {len(verdicts)} buckets, {len(differing)} differ")
+
+    if differing and not dry_run:
+        failed_days = set()
+        for inbox_id, first_day, last_day in merge_ranges(differing):
+            job_id = await create_backfill_job(
+                since=datetime.combine(first_day, datetime.min.time()),
+                until=datetime.combine(last_day + timedelta(days=1), datetime.min.time()),
+                inbox_id=inbox_id,
+                parallel=1,
+                trigger="reconcile",
+            )
+            if not await run_backfill_job(client, job_id):
+                failed_days.update((first_day + timedelta(days=d), inbox_id) for d in range((last_day - first_day).days + 1))
+        async with AsyncSessionLocal() as session:
+            resynced = await local_buckets(session, account_id, since, until)
+        for key in differing:
+            before, after, theirs = local.get(key, empty), resynced.get(key, empty), remote.get(key, empty)
+            if key in failed_days:
+                status = "mismatch"
+            elif after[:2] == theirs[:2]:
+                status = "resynced"
+            elif after == before:
+                status = "persistent"
+            else:
+                status = "mismatch"
+            verdicts[key] = (status, after, theirs)
+    else:
+        for key in differing:
+            verdicts[key] = ("mismatch",) + verdicts[key][1:]
+
+    async with AsyncSessionLocal() as session:
+        await save_bucket_states(session, account_id, verdicts)
+    summary = Counter(status for status, _, _ in verdicts.values())
+    for status in ("match", "resynced", "mismatch", "persistent"):
+        RECONCILE_BUCKETS.labels(status).set(summary[status])
+    logger.info(f"Reconciliation done: {dict(summary)}")
+    return dict(summary)
 
 
 async def run_backfill():
-    """Main Backfill Logic"""
+    """
+    Main Backfill Logic.
+
+    Incremental: reporting events come from the account-level endpoint for
+    the window since their watermark; conversations are listed by last
+    activity, newest first, and paging stops at the first one older than
+    their watermark. Conversations of a page are fetched concurrently (at most
+    DATA_HUB_MAX_CONCURRENCY message requests in flight, plus one prefetched
+    conversations page) while a single BatchWriter upserts the rows, so
+    fetching and writing overlap.
+    """
     logger.info("Starting Backfill...")
-    client = ChatwootClient(
+    # One pooled client for the whole cycle: keep-alive, retries and 429 handling
+    async with ChatwootClient(
         base_url=settings.CHATWOOT_BASE_URL,
         api_access_token=settings.CHATWOOT_API_TOKEN,
-        account_id=settings.CHATWOOT_ACCOUNT_ID
+        account_id=settings.CHATWOOT_ACCOUNT_ID,
+        max_connections=settings.DATA_HUB_MAX_CONCURRENCY + 2,
+    ) as client:
+        await _run_backfill(client)
+
+
+async def _run_backfill(client):
+    async with AsyncSessionLocal() as session:
+        has_watermark = await load_watermark(session, settings.CHATWOOT_ACCOUNT_ID, "conversations") is not None
+    if not has_watermark:
+        # Initial sync is long: run it as a checkpointed job so a restart resumes it
+        started = time.perf_counter()
+        until = await run_initial_backfill(client)
+        BACKFILL_DURATION.set(time.perf_counter() - started)
+        if until:
+            async with AsyncSessionLocal() as session:
+                await save_watermark(session, settings.CHATWOOT_ACCOUNT_ID, "conversations", until)
+                await save_watermark(session, settings.CHATWOOT_ACCOUNT_ID, "reporting_events", until)
+        await refresh_marts(AsyncSessionLocal)
+        return
+
+    semaphore = asyncio.Semaphore(settings.DATA_HUB_MAX_CONCURRENCY)
+    writer = BatchWriter(
+        AsyncSessionLocal,
+        TABLE_WRITERS,
+        batch_size=settings.DATA_HUB_WRITE_BATCH_SIZE,
+        queue_size=settings.DATA_HUB_WRITE_QUEUE_SIZE,
+        on_flush=_count_rows,
+    ).start()
+
+    started = time.perf_counter()
+    reports_watermark = None
+    fetch_reports = settings.DATA_HUB_REPORTING_EVENTS_MODE == "conversation"
+
+    try:
+        if not fetch_reports:
+            try:
+                events, reports_watermark = await sync_reporting_events(client, writer, time.time())
+                logger.info(f"Queued {events} reporting events from the account endpoint")
+            except Exception as e:
+                # e.g. Chatwoot versions without the account endpoint: fetch them per conversation
+                logger.warning(f"Account reporting events sync failed, falling back to per-conversation fetch: {e}")
+                fetch_reports = True
+
+        processed_count, failed_count, conversations_watermark = await sync_conversations(
+            client, writer, semaphore, fetch_reports
+        )
+    finally:
+        await writer.close()
+
+    elapsed = time.perf_counter() - started
+    BACKFILL_DURATION.set(elapsed)
+    BACKFILL_ROWS_PER_SECOND.set(writer.rows_written / elapsed if elapsed else 0)
+    logger.info(
+        f"Backfill Complete. Processed {processed_count} conversations, {writer.rows_written} rows "
+        f"({writer.rows_changed} changed) in {elapsed:.1f}s ({writer.failed_batches} failed batches)."
     )
-    
+
     async with AsyncSessionLocal() as session:
-        page = 1
-        processed_count = 0
-        
-        while True:
-            logger.info(f"Fetching Conversations Page {page}...")
-            # Fetch all conversations (status='all')
-            data = await client.list_conversations(page=page, status='all')
-            conversations = data.get('data', {}).get('payload', [])
-            meta = data.get('data', {}).get('meta', {})
-            
-            if not conversations:
-                break
-                
-            for conv in conversations:
-                conv_id = conv['id']
-                # 1. Upsert Conversation
-                try:
-                    await upsert_conversation(session, conv)
-                    
-                    # 2. Fetch Messages
-                    msgs_data = await client.get_messages(conv_id)
-                    messages = msgs_data.get('payload', [])
-                    for msg in messages:
-                        await upsert_message(session, msg)
-                        
-                    # 3. Fetch Reporting Events (Conversation level)
-                    # Note: API endpoint might not be exactly strictly documented for fetching ALL events per conv easily,
-                    # but assumes implementation in client exists.
-                    # As fallback, skipping if API returns 404.
-                    try:
-                        report_data = await client.get_conversation_reporting_events(conv_id)
-                        # Assume report_data returns list of events
-                        if isinstance(report_data, list):
-                            await upsert_reporting_events(session, report_data)
-                    except Exception as e:
-                        logger.warning(f"Could not fetch reporting events for conv {conv_id}: {e}")
-
-                    processed_count += 1
-                    
-                except Exception as e:
-                    logger.error(f"Error processing conv {conv_id}: {e}")
-            
-            await session.commit()
-            
-            # Check pagination
-            current_page = meta.get('current_page', page)
-            total_pages = meta.get('total_pages', page)
-            if current_page >= total_pages:
-                break
-            page += 1
-            
-        logger.info(f"Backfill Complete. Processed {processed_count} conversations.")
+        # Only advance past data that was fully written, otherwise retry the same window next cycle
+        conversations_ok = not failed_count and not (writer.failed_tables & {"raw_chatwoot_conversations", "raw_chatwoot_messages"})
+        if conversations_watermark and conversations_ok:
+            await save_watermark(session, settings.CHATWOOT_ACCOUNT_ID, "conversations", conversations_watermark)
+        elif not conversations_ok:
+            logger.warning(f"Conversations watermark kept: {failed_count} conversations failed")
+
+        if reports_watermark and "raw_chatwoot_reporting_events" not in writer.failed_tables:
+            await save_watermark(session, settings.CHATWOOT_ACCOUNT_ID, "reporting_events", reports_watermark)
+    await refresh_marts(AsyncSessionLocal)
+
+async def ensure_tables():
+    """The API creates all tables at startup; the worker may start first."""
+    async with engine.begin() as conn:
+        for model in (DataHubSyncState, DataHubBackfillJob, DataHubBackfillShard, DataHubReconcileBucket, DataHubRun, RawChatwootPayload, RawChatwootHeaderSet):
+            await conn.run_sync(model.__table__.create, checkfirst=True)
+
+async def run_partition_maintenance():
+    """Creates upcoming monthly partitions of the raw tables and archives expired ones."""
+    retention = {
+        "raw_chatwoot_events": settings.DATA_HUB_RETENTION_MONTHS_EVENTS,
+        "raw_chatwoot_messages": settings.DATA_HUB_RETENTION_MONTHS_MESSAGES,
+        "raw_chatwoot_reporting_events": settings.DATA_HUB_RETENTION_MONTHS_REPORTING_EVENTS,
+    }
+    async with AsyncSessionLocal() as session:
+        created, archived = await maintain_partitions(
+            session, date.today(), settings.DATA_HUB_PARTITION_MONTHS_AHEAD, retention, settings.DATA_HUB_ARCHIVE_SCHEMA
+        )
+    if created or archived:
+        logger.info(f"Partition maintenance: {created} created, {archived} archived")
+
+async def prepare_schema() -> bool:
+    """Worker tables, raw partitions and pending analytics migrations (no DDL when the schema is current)."""
+    await ensure_tables()
+    await run_partition_maintenance()
+    async with AsyncSessionLocal() as session:
+        await rekey_header_sets(session)
+    try:
+        async with AsyncSessionLocal() as session:
+            await init_analytics_schema(session)
+        return True
+    except Exception as e:
+        # Keep syncing raw data; mart refreshes will report their own failures
+        logger.error(f"Analytics migrations failed: {e}")
+        return False
+
+async def reconcile_recent() -> Dict[str, int]:
+    """Reconciles the last DATA_HUB_RECONCILE_DAYS full days (today is still moving)."""
+    today = date.today()
+    async with ChatwootClient(
+        base_url=settings.CHATWOOT_BASE_URL,
+        api_access_token=settings.CHATWOOT_API_TOKEN,
+        account_id=settings.CHATWOOT_ACCOUNT_ID,
+        max_connections=settings.DATA_HUB_MAX_CONCURRENCY + 2,
+    ) as client:
+        summary = await run_reconciliation(client, today - timedelta(days=settings.DATA_HUB_RECONCILE_DAYS), today)
+    if summary.get("resynced"):
+        await refresh_marts(AsyncSessionLocal)
+    return summary
+
+async def start_realtime():
+    """Real-time raw processor (also runnable alone: python -m data_hub_runner realtime)."""
+    await run_realtime_loop(
+        AsyncSessionLocal, settings.CHATWOOT_ACCOUNT_ID, settings.DATA_HUB_REALTIME_INTERVAL_SECONDS
+    )
 
 async def main():
     logger.info(f"Data Hub Runner Started. Interval: {settings.DATA_HUB_BACKFILL_INTERVAL_SECONDS}s")
+    start_metrics_server()
+
+    # Run once at startup: the sync loop itself never runs DDL
+    await prepare_schema()
+
+    # Reference kept for the process lifetime so the task is not garbage collected
+    realtime_task = asyncio.create_task(start_realtime()) if settings.DATA_HUB_REALTIME_ENABLED else None
+
+    last_reconcile = None
     while True:
         try:
             await run_backfill()
         except Exception as e:
             logger.error(f"Backfill Job Failed: {e}")
-        
+
+        # Next month's partition, rows a backfill parked in the default partition, retention
+        try:
+            await run_partition_maintenance()
+        except Exception as e:
+            logger.error(f"Partition Maintenance Failed: {e}")
+
+        interval = settings.DATA_HUB_RECONCILE_INTERVAL_SECONDS
+        if interval > 0 and (last_reconcile is None or time.monotonic() - last_reconcile >= interval):
+            try:
+                await reconcile_recent()
+                last_reconcile = time.monotonic()
+            except Exception as e:
+                logger.error(f"Reconciliation Failed: {e}")
+
         await asyncio.sleep(settings.DATA_HUB_BACKFILL_INTERVAL_SECONDS)
 
 if __name__ == "__main__":
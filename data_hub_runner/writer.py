@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger("DataHubWriter")
+
+# flush function per table: (session, rows) -> rows actually changed (None if unknown)
+FlushFn = Callable[[Any, List[dict]], Awaitable[Optional[int]]]
+
+
+class BatchWriter:
+    """
+    Single DB writer fed by the fetch tasks through a bounded queue.
+
+    Rows are buffered per table and flushed (one transaction per flush) when
+    a table reaches `batch_size` or the queue goes idle for `flush_interval`.
+    A full queue blocks the producers, so fetching never runs too far ahead
+    of the database.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        flush_fns: Dict[str, FlushFn],
+        batch_size: int = 500,
+        queue_size: int = 5000,
+        flush_interval: float = 1.0,
+        on_flush: Optional[Callable[[str, int, int], None]] = None,
+    ):
+        self.session_factory = session_factory
+        self.flush_fns = flush_fns
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.buffers: Dict[str, List[dict]] = {table: [] for table in flush_fns}
+        self.rows_written = 0
+        self.rows_changed = 0
+        self.failed_batches = 0
+        self.failed_tables = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def put(self, table: str, rows: List[dict]):
+        if rows:
+            await self.queue.put((table, rows))
+
+    async def drain(self):
+        """Waits until everything queued so far is flushed (used before checkpointing)."""
+        done = asyncio.get_running_loop().create_future()
+        await self.queue.put(done)
+        await done
+
+    async def close(self):
+        """Drains the queue, flushes what is left and stops the writer task."""
+        await self.queue.put(None)
+        if self._task:
+            await self._task
+
+    async def _run(self):
+        while True:
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                await self.flush_all()
+                continue
+
+            if item is None:
+                await self.flush_all()
+                return
+            if isinstance(item, asyncio.Future):
+                await self.flush_all()
+                item.set_result(None)
+                continue
+
+            table, rows = item
+            buffer = self.buffers[table]
+            buffer.extend(rows)
+            if len(buffer) >= self.batch_size:
+                await self.flush(table)
+
+    async def flush_all(self):
+        for table in self.buffers:
+            await self.flush(table)
+
+    async def flush(self, table: str):
+        rows = self.buffers[table]
+        if not rows:
+            return
+        self.buffers[table] = []
+        try:
+            async with self.session_factory() as session:
+                changed = await self.flush_fns[table](session, rows)
+                await session.commit()
+        except Exception as e:
+            # A bad batch is logged and dropped; the next backfill cycle rewrites it
+            self.failed_batches += 1
+            self.failed_tables.add(table)
+            logger.error(f"Failed to write {len(rows)} rows to {table}: {e}")
+            return
+        changed = len(rows) if changed is None else changed
+        self.rows_written += len(rows)
+        self.rows_changed += changed
+        if self.on_flush:
+            self.on_flush(table, len(rows), changed)
@@ -0,0 +1,4 @@
+"""
+Local stand-ins for external services (OpenAI, Chatwoot) used by load and
+integration tests. Nothing in here is imported by the production services.
+"""
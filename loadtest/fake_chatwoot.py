@@ -0,0 +1,505 @@
+"""
+Fake Chatwoot API for load and integration tests.
+
+Serves a synthetic, deterministic dataset (conversations, messages and
+reporting events) that is generated lazily from a seed, so a dataset with
+millions of messages costs only a few small arrays of memory.
+
+Implements the endpoints used by `ChatwootClient`:
+- GET  /api/v1/accounts/{account_id}/conversations
+- GET  /api/v1/accounts/{account_id}/conversations/{id}
+- GET  /api/v1/accounts/{account_id}/conversations/{id}/messages   (supports `before`)
+- POST /api/v1/accounts/{account_id}/conversations/{id}/messages
+- GET  /api/v1/accounts/{account_id}/conversations/{id}/reporting_events
+- GET  /api/v1/accounts/{account_id}/reporting_events              (supports `since`/`until`)
+- GET  /api/v1/accounts/{account_id}/inboxes
+- GET  /api/v2/accounts/{account_id}/reports                       (incoming/outgoing_messages_count per day)
+
+Run it with:
+    uvicorn loadtest.fake_chatwoot:app --host 0.0.0.0 --port 8200
+"""
+import bisect
+import itertools
+import logging
+import math
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from pydantic import BaseModel
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from loadtest.faults import FaultConfig, install_fault_injection
+
+logger = logging.getLogger("FakeChatwoot")
+
+# Message IDs are derived as conversation_id * stride + n, keeping them inside int4
+MESSAGE_ID_STRIDE = 1000
+REPORTING_EVENT_ID_STRIDE = 1000
+CREATED_MESSAGE_ID_START = 2_000_000_000
+STATUSES = ["resolved", "open", "pending"]
+STATUS_WEIGHTS = [0.7, 0.2, 0.1]
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="FAKE_CHATWOOT_", extra="ignore")
+
+    ACCOUNT_ID: int = 1
+    CONVERSATIONS: int = 1000
+    MESSAGES_PER_CONVERSATION: int = 20  # Average, actual count varies +/- 50%
+    INBOXES: int = 3
+    AGENTS: int = 5
+    DAYS: int = 90
+    SEED: int = 42
+    START_TS: Optional[int] = None  # Defaults to now - DAYS
+
+    CONVERSATIONS_PAGE_SIZE: int = 25
+    MESSAGES_PAGE_SIZE: int = 20
+    REPORTING_EVENTS_PAGE_SIZE: int = 25
+
+    LATENCY_MS: float = 0
+    LATENCY_JITTER_MS: float = 0
+    ERROR_RATE: float = 0.0
+    RATE_LIMIT_RATE: float = 0.0
+    RETRY_AFTER_SECONDS: int = 1
+
+
+class MessageCreate(BaseModel):
+    content: Optional[str] = None
+    message_type: str = "outgoing"
+    private: bool = False
+    content_type: str = "text"
+
+
+class SyntheticDataset:
+    """
+    Deterministic Chatwoot-like dataset. Conversation N is created at
+    start_ts + (N - 1) * spacing and all derived objects are computed on demand.
+    Only per-conversation counts and the messages created through the API are
+    held in memory.
+    """
+
+    def __init__(self, config: Settings):
+        if config.CONVERSATIONS * MESSAGE_ID_STRIDE >= CREATED_MESSAGE_ID_START:
+            raise ValueError("FAKE_CHATWOOT_CONVERSATIONS too large for int4 message ids")
+        self.config = config
+        self.account_id = config.ACCOUNT_ID
+        self.size = config.CONVERSATIONS
+        self.start_ts = config.START_TS or int(time.time()) - config.DAYS * 86400
+        self.spacing = max(config.DAYS * 86400 // max(self.size, 1), 1)
+
+        rnd = random.Random(config.SEED)
+        avg = config.MESSAGES_PER_CONVERSATION
+        low, high = max(1, avg // 2), min(MESSAGE_ID_STRIDE - 1, max(1, avg + avg // 2))
+        # Index 0 is conversation 1
+        self.message_counts = [rnd.randint(low, high) for _ in range(self.size)]
+        self.statuses = rnd.choices(range(len(STATUSES)), weights=STATUS_WEIGHTS, k=self.size)
+        self.report_counts = [self._report_count(i) for i in range(self.size)]
+        self.report_prefix = list(itertools.accumulate(self.report_counts, initial=0))
+
+        # Messages posted through the API (bot replies etc.)
+        self.created_messages: Dict[int, List[Dict[str, Any]]] = {}
+        self.touched: Dict[int, int] = {}  # conversation_id -> last_activity_at
+        self._next_created_id = CREATED_MESSAGE_ID_START
+        self._filter_cache: Dict[Any, List[int]] = {}
+
+    @property
+    def total_messages(self) -> int:
+        return sum(self.message_counts)
+
+    def _report_count(self, idx: int) -> int:
+        # first_response + one reply_time per agent reply + resolution if resolved
+        agent_replies = self.message_counts[idx] // 2
+        resolved = STATUSES[self.statuses[idx]] == "resolved"
+        return 1 + agent_replies + (1 if resolved else 0)
+
+    def exists(self, conversation_id: int) -> bool:
+        return 1 <= conversation_id <= self.size
+
+    def inbox_of(self, conversation_id: int) -> int:
+        return (conversation_id - 1) % self.config.INBOXES + 1
+
+    def agent_of(self, conversation_id: int) -> int:
+        return (conversation_id - 1) % self.config.AGENTS + 1
+
+    def created_ts(self, conversation_id: int) -> int:
+        return self.start_ts + (conversation_id - 1) * self.spacing
+
+    def message_ts(self, conversation_id: int, n: int) -> int:
+        return self.created_ts(conversation_id) + n * 60
+
+    def last_activity_ts(self, conversation_id: int) -> int:
+        if conversation_id in self.touched:
+            return self.touched[conversation_id]
+        return self.message_ts(conversation_id, self.message_counts[conversation_id - 1])
+
+    # --- Builders ---
+    def conversation(self, conversation_id: int) -> Dict[str, Any]:
+        status = STATUSES[self.statuses[conversation_id - 1]]
+        created = self.created_ts(conversation_id)
+        return {
+            "id": conversation_id,
+            "account_id": self.account_id,
+            "inbox_id": self.inbox_of(conversation_id),
+            "status": status,
+            "timestamp": created,
+            "created_at": created,
+            "last_activity_at": self.last_activity_ts(conversation_id),
+            "unread_count": 0 if status == "resolved" else 1,
+            "meta": {
+                "sender": {"id": 100000 + conversation_id, "name": f"Contact {conversation_id}"},
+                "assignee": {"id": self.agent_of(conversation_id)},
+            },
+            "labels": [],
+        }
+
+    def message(self, conversation_id: int, n: int) -> Dict[str, Any]:
+        incoming = n % 2 == 1
+        created = self.message_ts(conversation_id, n)
+        return {
+            "id": conversation_id * MESSAGE_ID_STRIDE + n,
+            "conversation_id": conversation_id,
+            "account_id": self.account_id,
+            "inbox_id": self.inbox_of(conversation_id),
+            "message_type": 0 if incoming else 1,
+            "content": f"Mensagem {n} da conversa {conversation_id}",
+            "content_type": "text",
+            "private": False,
+            "sender_type": "Contact" if incoming else "User",
+            "sender_id": 100000 + conversation_id if incoming else self.agent_of(conversation_id),
+            "created_at": created,
+            "updated_at": created,
+            "attachments": [],
+        }
+
+    def messages(self, conversation_id: int) -> List[Dict[str, Any]]:
+        count = self.message_counts[conversation_id - 1]
+        msgs = [self.message(conversation_id, n) for n in range(1, count + 1)]
+        return msgs + self.created_messages.get(conversation_id, [])
+
+    def reporting_event(self, conversation_id: int, j: int) -> Dict[str, Any]:
+        count = self.report_counts[conversation_id - 1]
+        created = self.created_ts(conversation_id)
+        rnd = random.Random(self.config.SEED * 7919 + conversation_id * 131 + j)
+        if j == 0:
+            name, value, at = "first_response", rnd.randint(30, 3600), self.message_ts(conversation_id, 2)
+        elif j == count - 1 and STATUSES[self.statuses[conversation_id - 1]] == "resolved":
+            at = self.message_ts(conversation_id, self.message_counts[conversation_id - 1])
+            name, value = "conversation_resolved", at - created
+        else:
+            name, value, at = "reply_time", rnd.randint(10, 1800), self.message_ts(conversation_id, 2 * j)
+        return {
+            "id": conversation_id * REPORTING_EVENT_ID_STRIDE + j + 1,
+            "account_id": self.account_id,
+            "conversation_id": conversation_id,
+            "inbox_id": self.inbox_of(conversation_id),
+            "user_id": self.agent_of(conversation_id),
+            "name": name,
+            "value": value,
+            "value_in_business_hours": None,
+            "event_start_time": created,
+            "event_end_time": at,
+            "created_at": at,
+            "updated_at": at,
+        }
+
+    def reporting_events(self, conversation_id: int) -> List[Dict[str, Any]]:
+        return [self.reporting_event(conversation_id, j) for j in range(self.report_counts[conversation_id - 1])]
+
+    # --- Queries ---
+    def conversation_ids(self, status: str = "all", inbox_id: Optional[int] = None, sort_by: str = "latest") -> List[int]:
+        key = (status, inbox_id, sort_by)
+        if key not in self._filter_cache:
+            ids = range(1, self.size + 1)
+            if sort_by == "latest":
+                # Like Chatwoot: last_activity_at, newest first
+                ids = sorted(ids, key=lambda c: (-self.last_activity_ts(c), -c))
+            ids = [
+                c for c in ids
+                if (status == "all" or STATUSES[self.statuses[c - 1]] == status)
+                and (inbox_id is None or self.inbox_of(c) == inbox_id)
+            ]
+            self._filter_cache[key] = ids
+        ids = self._filter_cache[key]
+        if sort_by == "latest" and self.touched:
+            # Conversations that received new messages move to the top
+            recent = [
+                c for c in sorted(self.touched, key=lambda c: -self.touched[c])
+                if (status == "all" or STATUSES[self.statuses[c - 1]] == status)
+                and (inbox_id is None or self.inbox_of(c) == inbox_id)
+            ]
+            recent_set = set(recent)
+            ids = recent + [c for c in ids if c not in recent_set]
+        return ids
+
+    def reporting_event_indices(self, since: Optional[int], until: Optional[int]) -> "IndexSegments":
+        """
+        Global indices (over the flattened per-conversation event list) of the events
+        created inside [since, until]. Only conversations straddling the window edges
+        are inspected one by one; the middle is a contiguous range.
+        """
+        max_duration = (max(self.message_counts, default=0) + 1) * 60
+
+        def conv_at(ts: float) -> int:
+            return min(max(math.floor((ts - self.start_ts) / self.spacing) + 1, 1), self.size + 1)
+
+        lo, hi = 1, self.size
+        full_lo, full_hi = 1, self.size
+        if since is not None:
+            lo = conv_at(since - max_duration)
+            full_lo = conv_at(since) + 1
+        if until is not None:
+            hi = conv_at(until) if until >= self.start_ts else 0
+            full_hi = conv_at(until - max_duration) - 1
+
+        def in_window(idx: int) -> bool:
+            at = self.event_at(idx)["created_at"]
+            return (since is None or at >= since) and (until is None or at <= until)
+
+        def explicit(first_conv: int, last_conv: int) -> List[int]:
+            start, end = self.report_prefix[first_conv - 1], self.report_prefix[last_conv]
+            return [i for i in range(start, end) if in_window(i)]
+
+        segments = IndexSegments()
+        if full_lo > full_hi:
+            if lo <= hi:
+                segments.add_list(explicit(lo, hi))
+            return segments
+        if lo < full_lo:
+            segments.add_list(explicit(lo, full_lo - 1))
+        segments.add_range(self.report_prefix[full_lo - 1], self.report_prefix[full_hi])
+        if full_hi < hi:
+            segments.add_list(explicit(full_hi + 1, hi))
+        return segments
+
+    def message_day_counts(
+        self, message_type: int, since: int, until: int, inbox_id: Optional[int] = None, tz_offset_hours: float = 0
+    ) -> Dict[int, int]:
+        """Messages of one type created in [since, until], per day start (unix, shifted by the offset)."""
+        offset = int(tz_offset_hours * 3600)
+        max_duration = (max(self.message_counts, default=0) + 1) * 60
+        first = max(1, math.floor((since - max_duration - self.start_ts) / self.spacing) + 1)
+        last = min(self.size, math.floor((until - self.start_ts) / self.spacing) + 1)
+        counts: Counter = Counter()
+
+        def add(ts: int):
+            if since <= ts <= until:
+                counts[(ts + offset) // 86400 * 86400 - offset] += 1
+
+        for c in range(first, last + 1):
+            if inbox_id is not None and self.inbox_of(c) != inbox_id:
+                continue
+            for n in range(1, self.message_counts[c - 1] + 1):
+                if (0 if n % 2 == 1 else 1) == message_type:
+                    add(self.message_ts(c, n))
+        for c, msgs in self.created_messages.items():
+            if inbox_id is None or self.inbox_of(c) == inbox_id:
+                for msg in msgs:
+                    if msg["message_type"] == message_type:
+                        add(msg["created_at"])
+        return counts
+
+    def event_at(self, global_index: int) -> Dict[str, Any]:
+        idx = bisect.bisect_right(self.report_prefix, global_index) - 1
+        return self.reporting_event(idx + 1, global_index - self.report_prefix[idx])
+
+    def create_message(self, conversation_id: int, data: MessageCreate) -> Dict[str, Any]:
+        now = int(time.time())
+        self._next_created_id += 1
+        msg = {
+            "id": self._next_created_id,
+            "conversation_id": conversation_id,
+            "account_id": self.account_id,
+            "inbox_id": self.inbox_of(conversation_id),
+            "message_type": 1 if data.message_type == "outgoing" else 0,
+            "content": data.content,
+            "content_type": data.content_type,
+            "private": data.private,
+            "sender_type": "User",
+            "sender_id": self.agent_of(conversation_id),
+            "created_at": now,
+            "updated_at": now,
+            "attachments": [],
+        }
+        self.created_messages.setdefault(conversation_id, []).append(msg)
+        self.touched[conversation_id] = now
+        return msg
+
+
+class IndexSegments:
+    """Concatenation of contiguous ranges and explicit index lists, sliceable by page."""
+
+    def __init__(self):
+        self.segments: List[Any] = []
+
+    def add_range(self, start: int, end: int):
+        if end > start:
+            self.segments.append(range(start, end))
+
+    def add_list(self, items: List[int]):
+        if items:
+            self.segments.append(items)
+
+    def __len__(self) -> int:
+        return sum(len(seg) for seg in self.segments)
+
+    def slice(self, offset: int, limit: int) -> List[int]:
+        out: List[int] = []
+        for seg in self.segments:
+            if offset >= len(seg):
+                offset -= len(seg)
+                continue
+            out.extend(seg[offset:offset + limit - len(out)])
+            offset = 0
+            if len(out) >= limit:
+                break
+        return out
+
+
+def _page(items: List[Any], page: int, page_size: int) -> List[Any]:
+    start = (max(page, 1) - 1) * page_size
+    return items[start:start + page_size]
+
+
+def create_app(config: Settings = None) -> FastAPI:
+    config = config or Settings()
+    dataset = SyntheticDataset(config)
+    stats: Counter = Counter()
+    app = FastAPI(title="Fake Chatwoot")
+    app.state.dataset = dataset
+    install_fault_injection(
+        app,
+        FaultConfig(
+            latency_ms=config.LATENCY_MS,
+            latency_jitter_ms=config.LATENCY_JITTER_MS,
+            error_rate=config.ERROR_RATE,
+            rate_limit_rate=config.RATE_LIMIT_RATE,
+            retry_after_seconds=config.RETRY_AFTER_SECONDS,
+        ),
+        error_body=lambda code: {"error": "Too many requests" if code == 429 else "Internal server error"},
+    )
+    logger.info(f"Synthetic dataset: {dataset.size} conversations, {dataset.total_messages} messages")
+
+    @app.middleware("http")
+    async def count_requests(request: Request, call_next):
+        response = await call_next(request)
+        route = request.scope.get("route")
+        stats[f"{request.method} {route.path if route else request.url.path}"] += 1
+        return response
+
+    def _check(account_id: int, conversation_id: Optional[int] = None):
+        if account_id != dataset.account_id:
+            raise HTTPException(status_code=404, detail="Account not found")
+        if conversation_id is not None and not dataset.exists(conversation_id):
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+    @app.get("/_fake/stats")
+    async def get_stats():
+        return {
+            "conversations": dataset.size,
+            "messages": dataset.total_messages,
+            "created_messages": sum(len(v) for v in dataset.created_messages.values()),
+            "requests": dict(stats),
+        }
+
+    @app.get("/api/v1/accounts/{account_id}/conversations")
+    async def list_conversations(
+        account_id: int,
+        page: int = 1,
+        status: str = "open",
+        inbox_id: Optional[int] = None,
+        sort_by: str = "latest",
+    ):
+        _check(account_id)
+        ids = dataset.conversation_ids(status, inbox_id, sort_by)
+        page_size = config.CONVERSATIONS_PAGE_SIZE
+        return {
+            "data": {
+                "meta": {
+                    "all_count": len(ids),
+                    "current_page": page,
+                    "total_pages": max(1, math.ceil(len(ids) / page_size)),
+                },
+                "payload": [dataset.conversation(c) for c in _page(ids, page, page_size)],
+            }
+        }
+
+    @app.get("/api/v1/accounts/{account_id}/conversations/{conversation_id}")
+    async def get_conversation(account_id: int, conversation_id: int):
+        _check(account_id, conversation_id)
+        return dataset.conversation(conversation_id)
+
+    @app.get("/api/v1/accounts/{account_id}/conversations/{conversation_id}/messages")
+    async def list_messages(account_id: int, conversation_id: int, before: Optional[int] = None):
+        # Like Chatwoot: the latest page, or the page preceding `before`, in ascending order
+        _check(account_id, conversation_id)
+        msgs = dataset.messages(conversation_id)
+        if before is not None:
+            msgs = [m for m in msgs if m["id"] < before]
+        return {
+            "meta": {"contact": {"id": 100000 + conversation_id}, "assignee": {"id": dataset.agent_of(conversation_id)}},
+            "payload": msgs[-config.MESSAGES_PAGE_SIZE:],
+        }
+
+    @app.post("/api/v1/accounts/{account_id}/conversations/{conversation_id}/messages")
+    async def create_message(account_id: int, conversation_id: int, data: MessageCreate):
+        _check(account_id, conversation_id)
+        return dataset.create_message(conversation_id, data)
+
+    @app.get("/api/v1/accounts/{account_id}/conversations/{conversation_id}/reporting_events")
+    async def conversation_reporting_events(account_id: int, conversation_id: int):
+        _check(account_id, conversation_id)
+        return dataset.reporting_events(conversation_id)
+
+    @app.get("/api/v1/accounts/{account_id}/reporting_events")
+    async def account_reporting_events(
+        account_id: int,
+        page: int = 1,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        type: Optional[str] = None,
+    ):
+        _check(account_id)
+        page_size = config.REPORTING_EVENTS_PAGE_SIZE
+        indices = dataset.reporting_event_indices(since, until)
+        total = len(indices)
+        return {
+            "payload": [dataset.event_at(i) for i in indices.slice((max(page, 1) - 1) * page_size, page_size)],
+            "meta": {
+                "count": total,
+                "current_page": page,
+                "total_pages": max(1, math.ceil(total / page_size)),
+            },
+        }
+
+    @app.get("/api/v1/accounts/{account_id}/inboxes")
+    async def list_inboxes(account_id: int):
+        _check(account_id)
+        return {"payload": [{"id": i, "name": f"Inbox {i}"} for i in range(1, config.INBOXES + 1)]}
+
+    @app.get("/api/v2/accounts/{account_id}/reports")
+    async def reports(
+        account_id: int,
+        metric: str,
+        since: int,
+        until: int,
+        type: str = "account",
+        id: Optional[int] = None,
+        group_by: str = "day",
+        timezone_offset: float = 0,
+    ):
+        _check(account_id)
+        message_types = {"incoming_messages_count": 0, "outgoing_messages_count": 1}
+        if metric not in message_types or group_by != "day" or type not in ("account", "inbox"):
+            raise HTTPException(status_code=422, detail="Unsupported report")
+        counts = dataset.message_day_counts(
+            message_types[metric], since, until, id if type == "inbox" else None, timezone_offset
+        )
+        return [{"value": counts[ts], "timestamp": ts} for ts in sorted(counts)]
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,252 @@
+"""
+Fake OpenAI-compatible API for load and integration tests.
+
+Implements the subset of endpoints used by the platform:
+- POST /v1/chat/completions (with and without `stream`)
+- /v1/files
+- /v1/vector_stores and /v1/vector_stores/{id}/files
+
+Run it with:
+    uvicorn loadtest.fake_openai:app --host 0.0.0.0 --port 8100
+
+and point the services at it with OPENAI_BASE_URL=http://localhost:8100/v1.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from loadtest.faults import FaultConfig, install_fault_injection
+
+logger = logging.getLogger("FakeOpenAI")
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="FAKE_OPENAI_", extra="ignore")
+
+    LATENCY_MS: float = 0
+    LATENCY_JITTER_MS: float = 0
+    ERROR_RATE: float = 0.0
+    RATE_LIMIT_RATE: float = 0.0
+    RETRY_AFTER_SECONDS: int = 1
+
+    # Completion shape
+    RESPONSE_WORDS: int = 40
+    STREAM_CHUNK_DELAY_MS: float = 0
+    # Time a vector store file stays "in_progress" before "completed"
+    FILE_PROCESSING_MS: float = 0
+
+
+settings = Settings()
+
+
+class ChatMessage(BaseModel):
+    role: str
+    content: Optional[Any] = None
+
+
+class ChatCompletionRequest(BaseModel):
+    model: str = "gpt-4o-mini"
+    messages: List[ChatMessage]
+    stream: bool = False
+    max_tokens: Optional[int] = None
+
+
+class VectorStoreCreate(BaseModel):
+    name: Optional[str] = None
+
+
+class VectorStoreFileCreate(BaseModel):
+    file_id: str
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:24]}"
+
+
+def _count_tokens(text: str) -> int:
+    # Whitespace split is close enough for load-test accounting
+    return len(text.split())
+
+
+def build_answer(messages: List[ChatMessage], words: int) -> str:
+    """
+    Deterministic answer in the ReAct format CrewAI expects, so agents finish
+    after a single LLM call instead of looping until max_iter.
+    """
+    last_user = next((m.content for m in reversed(messages) if m.role == "user"), "") or ""
+    if not isinstance(last_user, str):
+        last_user = json.dumps(last_user)
+    filler = " ".join(["ok"] * max(words - 1, 0))
+    return f"Thought: Agora eu sei a resposta final\nFinal Answer: Resposta simulada ({len(last_user)} chars). {filler}".strip()
+
+
+def create_app(config: Settings = settings) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+    install_fault_injection(
+        app,
+        FaultConfig(
+            latency_ms=config.LATENCY_MS,
+            latency_jitter_ms=config.LATENCY_JITTER_MS,
+            error_rate=config.ERROR_RATE,
+            rate_limit_rate=config.RATE_LIMIT_RATE,
+            retry_after_seconds=config.RETRY_AFTER_SECONDS,
+        ),
+        error_body=lambda code: {
+            "error": {
+                "message": "Rate limit reached (injected)" if code == 429 else "Internal error (injected)",
+                "type": "rate_limit_error" if code == 429 else "server_error",
+                "code": None,
+            }
+        },
+    )
+
+    # In-memory state (per process)
+    files: Dict[str, Dict[str, Any]] = {}
+    vector_stores: Dict[str, Dict[str, Any]] = {}
+    vs_files: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "files": len(files), "vector_stores": len(vector_stores)}
+
+    # --- CHAT ---
+    @app.post("/v1/chat/completions")
+    async def chat_completions(req: ChatCompletionRequest):
+        answer = build_answer(req.messages, config.RESPONSE_WORDS)
+        prompt_tokens = sum(_count_tokens(str(m.content or "")) for m in req.messages)
+        completion_tokens = _count_tokens(answer)
+        completion_id = _new_id("chatcmpl")
+        created = int(time.time())
+
+        if not req.stream:
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": req.model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+
+        async def event_stream():
+            def chunk(delta: dict, finish_reason=None) -> str:
+                body = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": req.model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }
+                return f"data: {json.dumps(body)}\n\n"
+
+            yield chunk({"role": "assistant", "content": ""})
+            for word in answer.split(" "):
+                if config.STREAM_CHUNK_DELAY_MS:
+                    await asyncio.sleep(config.STREAM_CHUNK_DELAY_MS / 1000)
+                yield chunk({"content": word + " "})
+            yield chunk({}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    # --- FILES ---
+    @app.post("/v1/files")
+    async def upload_file(file: UploadFile = File(...), purpose: str = Form("assistants")):
+        content = await file.read()
+        file_id = _new_id("file")
+        files[file_id] = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": file.filename,
+            "purpose": purpose,
+        }
+        return files[file_id]
+
+    @app.get("/v1/files/{file_id}")
+    async def get_file(file_id: str):
+        if file_id not in files:
+            raise HTTPException(status_code=404, detail="No such file")
+        return files[file_id]
+
+    @app.delete("/v1/files/{file_id}")
+    async def delete_file(file_id: str):
+        files.pop(file_id, None)
+        return {"id": file_id, "object": "file", "deleted": True}
+
+    # --- VECTOR STORES ---
+    @app.post("/v1/vector_stores")
+    async def create_vector_store(data: VectorStoreCreate):
+        vs_id = _new_id("vs")
+        vector_stores[vs_id] = {
+            "id": vs_id,
+            "object": "vector_store",
+            "name": data.name,
+            "created_at": int(time.time()),
+            "status": "completed",
+        }
+        vs_files[vs_id] = {}
+        return vector_stores[vs_id]
+
+    @app.get("/v1/vector_stores/{vs_id}")
+    async def get_vector_store(vs_id: str):
+        if vs_id not in vector_stores:
+            raise HTTPException(status_code=404, detail="No such vector store")
+        return vector_stores[vs_id]
+
+    @app.post("/v1/vector_stores/{vs_id}/files")
+    async def create_vector_store_file(vs_id: str, data: VectorStoreFileCreate):
+        if vs_id not in vector_stores:
+            raise HTTPException(status_code=404, detail="No such vector store")
+        if data.file_id not in files:
+            raise HTTPException(status_code=404, detail="No such file")
+        vs_files[vs_id][data.file_id] = {
+            "id": data.file_id,
+            "object": "vector_store.file",
+            "vector_store_id": vs_id,
+            "created_at": int(time.time()),
+            "ready_at": time.monotonic() + config.FILE_PROCESSING_MS / 1000,
+            "usage_bytes": files[data.file_id]["bytes"],
+        }
+        return _vs_file_view(vs_files[vs_id][data.file_id])
+
+    @app.get("/v1/vector_stores/{vs_id}/files/{file_id}")
+    async def get_vector_store_file(vs_id: str, file_id: str):
+        entry = vs_files.get(vs_id, {}).get(file_id)
+        if not entry:
+            raise HTTPException(status_code=404, detail="No such vector store file")
+        return _vs_file_view(entry)
+
+    @app.delete("/v1/vector_stores/{vs_id}/files/{file_id}")
+    async def delete_vector_store_file(vs_id: str, file_id: str):
+        if not vs_files.get(vs_id, {}).pop(file_id, None):
+            raise HTTPException(status_code=404, detail="No such vector store file")
+        return {"id": file_id, "object": "vector_store.file.deleted", "deleted": True}
+
+    return app
+
+
+def _vs_file_view(entry: Dict[str, Any]) -> Dict[str, Any]:
+    view = {k: v for k, v in entry.items() if k != "ready_at"}
+    view["status"] = "completed" if time.monotonic() >= entry["ready_at"] else "in_progress"
+    return view
+
+
+app = create_app()
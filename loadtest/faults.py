@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import random
+from typing import Optional
+
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+logger = logging.getLogger("FakeFaults")
+
+# Paths that are never delayed or failed (control plane of the fakes)
+CONTROL_PREFIX = "/_fake"
+
+
+class FaultConfig(BaseModel):
+    """Tunable latency/error profile applied to every request of a fake server."""
+    latency_ms: float = 0
+    latency_jitter_ms: float = 0
+    error_rate: float = 0.0        # Fraction of requests answered with 500
+    rate_limit_rate: float = 0.0   # Fraction of requests answered with 429
+    retry_after_seconds: int = 1
+
+
+def pick_fault(config: FaultConfig, rnd: random.Random = random) -> Optional[int]:
+    """Returns the status code to inject (429/500) or None to let the request through."""
+    roll = rnd.random()
+    if roll < config.rate_limit_rate:
+        return 429
+    if roll < config.rate_limit_rate + config.error_rate:
+        return 500
+    return None
+
+
+def install_fault_injection(app: FastAPI, config: FaultConfig, error_body=None):
+    """
+    Adds a middleware that delays and fails requests according to `config`,
+    plus GET/PUT `/_fake/faults` so a load test can change the profile at runtime.
+    `error_body(status_code)` builds the JSON body of injected errors.
+    """
+    app.state.faults = config
+
+    @app.middleware("http")
+    async def fault_middleware(request: Request, call_next):
+        if request.url.path.startswith(CONTROL_PREFIX):
+            return await call_next(request)
+
+        faults: FaultConfig = app.state.faults
+        delay_ms = faults.latency_ms
+        if faults.latency_jitter_ms:
+            delay_ms += random.uniform(0, faults.latency_jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+        status_code = pick_fault(faults)
+        if status_code is None:
+            return await call_next(request)
+
+        body = error_body(status_code) if error_body else {"error": f"injected {status_code}"}
+        headers = {}
+        if status_code == 429:
+            headers["Retry-After"] = str(faults.retry_after_seconds)
+        logger.debug(f"Injected {status_code} for {request.method} {request.url.path}")
+        return JSONResponse(status_code=status_code, content=body, headers=headers)
+
+    router = APIRouter()
+
+    @router.get("/faults")
+    async def get_faults():
+        return app.state.faults
+
+    @router.put("/faults")
+    async def set_faults(new_config: FaultConfig):
+        app.state.faults = new_config
+        logger.info(f"Fault profile updated: {new_config}")
+        return new_config
+
+    app.include_router(router, prefix=CONTROL_PREFIX, tags=["fake"])
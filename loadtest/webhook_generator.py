@@ -0,0 +1,134 @@
+"""
+Fires synthetic Chatwoot `message_created` webhooks at a target rate.
+
+Open-loop: requests are scheduled on a fixed timeline regardless of how long
+previous ones take, so a slow API shows up as latency instead of silently
+lowering the offered load.
+
+Usage:
+    python -m loadtest.webhook_generator \
+        --url "http://localhost:8000/api/v1/webhooks/chatwoot?t=SEU_TOKEN" \
+        --rate 50 --duration 60 --conversations 1000
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import httpx
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("WebhookGenerator")
+
+# Above the synthetic dataset range of loadtest.fake_chatwoot
+WEBHOOK_MESSAGE_ID_START = 1_500_000_000
+
+
+def build_message_created(message_id: int, conversation_id: int, account_id: int = 1, inboxes: int = 3) -> Dict[str, Any]:
+    """Payload in the shape `chatwoot_webhook` parses."""
+    inbox_id = (conversation_id - 1) % inboxes + 1
+    return {
+        "event": "message_created",
+        "message_type": "incoming",
+        "account": {"id": account_id},
+        "data": {
+            "id": message_id,
+            "content": f"Mensagem de carga {message_id}",
+            "message_type": "incoming",
+            "created_at": int(time.time()),
+            "inbox": {"id": inbox_id},
+            "conversation": {"id": conversation_id, "inbox_id": inbox_id},
+            "sender": {
+                "id": 100000 + conversation_id,
+                "name": f"Contact {conversation_id}",
+                "phone_number": f"+5511{conversation_id:09d}",
+            },
+        },
+    }
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+async def run(args) -> Dict[str, Any]:
+    statuses: Counter = Counter()
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    message_ids = itertools.count(args.start_message_id)
+    rnd = random.Random(args.seed)
+    total = args.count or int(args.rate * args.duration)
+    interval = 1.0 / args.rate
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+
+        async def fire(payload):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    resp = await client.post(args.url, json=payload)
+                    statuses[resp.status_code] += 1
+                except Exception as e:
+                    statuses[type(e).__name__] += 1
+                finally:
+                    latencies.append(time.perf_counter() - started)
+
+        tasks = []
+        t0 = time.perf_counter()
+        for i in range(total):
+            # Sleep until this request's slot on the timeline
+            delay = t0 + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            payload = build_message_created(
+                next(message_ids),
+                rnd.randint(1, args.conversations),
+                account_id=args.account_id,
+                inboxes=args.inboxes,
+            )
+            tasks.append(asyncio.create_task(fire(payload)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "sent": total,
+        "elapsed_seconds": round(elapsed, 2),
+        "achieved_rate": round(total / elapsed, 2) if elapsed else 0,
+        "statuses": {str(k): v for k, v in statuses.items()},
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.5) * 1000, 1),
+            "p95": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1) if latencies else 0,
+        },
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Chatwoot message_created webhook generator")
+    parser.add_argument("--url", default="http://localhost:8000/api/v1/webhooks/chatwoot?t=SEU_TOKEN")
+    parser.add_argument("--rate", type=float, default=10, help="Events per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run (ignored with --count)")
+    parser.add_argument("--count", type=int, default=0, help="Total events to send")
+    parser.add_argument("--concurrency", type=int, default=100, help="Max in-flight requests")
+    parser.add_argument("--conversations", type=int, default=1000, help="Conversation id range (1..N)")
+    parser.add_argument("--inboxes", type=int, default=3)
+    parser.add_argument("--account-id", type=int, default=1)
+    parser.add_argument("--start-message-id", type=int, default=WEBHOOK_MESSAGE_ID_START)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    summary = asyncio.run(run(parse_args()))
+    logger.info(f"Summary: {summary}")
@@ -0,0 +1,2 @@
+-- Id cursor for the real-time raw table processor (resource 'raw_events')
+ALTER TABLE data_hub_sync_state ADD COLUMN IF NOT EXISTS position BIGINT;
@@ -0,0 +1,5 @@
+-- Content hash of payload_json on the raw Chatwoot mirrors.
+-- Upserts only rewrite a row when the hash differs; rows without a hash are rewritten once.
+ALTER TABLE raw_chatwoot_conversations ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32);
+ALTER TABLE raw_chatwoot_messages ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32);
+ALTER TABLE raw_chatwoot_reporting_events ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32);
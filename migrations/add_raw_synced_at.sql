@@ -0,0 +1,14 @@
+-- Change tracking for incremental marts: synced_at is set on insert and on every
+-- upsert that really changed the row. Marts only recompute the days and
+-- conversations of rows synced since their last refresh.
+ALTER TABLE raw_chatwoot_conversations ADD COLUMN IF NOT EXISTS synced_at TIMESTAMP NOT NULL DEFAULT now();
+ALTER TABLE raw_chatwoot_messages ADD COLUMN IF NOT EXISTS synced_at TIMESTAMP NOT NULL DEFAULT now();
+ALTER TABLE raw_chatwoot_reporting_events ADD COLUMN IF NOT EXISTS synced_at TIMESTAMP NOT NULL DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS ix_raw_chatwoot_conversations_synced_at ON raw_chatwoot_conversations (synced_at);
+CREATE INDEX IF NOT EXISTS ix_raw_chatwoot_messages_synced_at ON raw_chatwoot_messages (synced_at);
+CREATE INDEX IF NOT EXISTS ix_raw_chatwoot_reporting_events_synced_at ON raw_chatwoot_reporting_events (synced_at);
+
+-- Lookups of the affected days and conversations
+CREATE INDEX IF NOT EXISTS ix_raw_chatwoot_messages_created_at_ts ON raw_chatwoot_messages (created_at_ts);
+CREATE INDEX IF NOT EXISTS ix_raw_chatwoot_reporting_events_conversation_id ON raw_chatwoot_reporting_events (conversation_id);
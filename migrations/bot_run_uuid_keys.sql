@@ -0,0 +1,18 @@
+-- bot_runs / bot_run_events keys: varchar uuid4 strings -> native uuid (16 bytes instead of 37).
+-- New ids are UUIDv7 (shared/utils/ids.py), time-ordered so inserts append to the key indexes.
+-- Rewrites both tables: run with bot_runner and the API stopped.
+BEGIN;
+
+ALTER TABLE bot_run_events DROP CONSTRAINT IF EXISTS bot_run_events_run_id_fkey;
+
+ALTER TABLE bot_runs ALTER COLUMN id TYPE uuid USING id::uuid;
+ALTER TABLE bot_run_events ALTER COLUMN id TYPE uuid USING id::uuid;
+ALTER TABLE bot_run_events ALTER COLUMN run_id TYPE uuid USING run_id::uuid;
+
+ALTER TABLE bot_run_events
+    ADD CONSTRAINT bot_run_events_run_id_fkey FOREIGN KEY (run_id) REFERENCES bot_runs (id);
+
+-- Events of a run in order (Test Lab polling/streaming, archive batches)
+CREATE INDEX IF NOT EXISTS ix_bot_run_events_run_id_timestamp ON bot_run_events (run_id, "timestamp");
+
+COMMIT;
@@ -0,0 +1,92 @@
+-- Hot columns extracted at ingest, full payloads moved to a content-addressed side table,
+-- webhook header sets deduplicated. Run with the worker and API stopped; the UPDATEs
+-- rewrite the mirrors once, VACUUM FULL (or pg_repack) afterwards returns the space.
+
+CREATE TABLE IF NOT EXISTS raw_chatwoot_payloads (
+    content_hash VARCHAR(32) PRIMARY KEY,
+    payload_json JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT now()
+);
+-- lz4 needs PostgreSQL 14+ built with it; pglz otherwise
+DO $$ BEGIN ALTER TABLE raw_chatwoot_payloads ALTER COLUMN payload_json SET COMPRESSION lz4;
+EXCEPTION WHEN others THEN NULL; END $$;
+
+CREATE TABLE IF NOT EXISTS raw_chatwoot_header_sets (
+    headers_hash VARCHAR(32) PRIMARY KEY,
+    headers_json JSONB NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+ALTER TABLE raw_chatwoot_conversations ADD COLUMN IF NOT EXISTS last_activity_at TIMESTAMP;
+ALTER TABLE raw_chatwoot_conversations ADD COLUMN IF NOT EXISTS unread_count INTEGER;
+ALTER TABLE raw_chatwoot_messages ADD COLUMN IF NOT EXISTS has_attachment BOOLEAN;
+ALTER TABLE raw_chatwoot_events ADD COLUMN IF NOT EXISTS header_set_hash VARCHAR(32);
+ALTER TABLE raw_chatwoot_events ADD COLUMN IF NOT EXISTS request_headers_json JSONB;
+
+DO $$
+DECLARE t text;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name = 'raw_chatwoot_messages' AND column_name = 'payload_json') THEN
+        RETURN; -- Already migrated
+    END IF;
+
+    UPDATE raw_chatwoot_conversations SET
+        last_activity_at = to_timestamp((payload_json->>'last_activity_at')::double precision)::timestamp,
+        unread_count = (payload_json->>'unread_count')::int
+    WHERE jsonb_typeof(payload_json->'last_activity_at') = 'number';
+    UPDATE raw_chatwoot_messages SET
+        has_attachment = jsonb_typeof(payload_json->'attachments') = 'array'
+                         AND jsonb_array_length(payload_json->'attachments') > 0;
+
+    FOREACH t IN ARRAY ARRAY['raw_chatwoot_conversations', 'raw_chatwoot_messages', 'raw_chatwoot_reporting_events'] LOOP
+        -- Rows synced before content hashes: md5 has the same width, the next sync rehashes them
+        EXECUTE format('UPDATE %I SET content_hash = md5(payload_json::text) WHERE content_hash IS NULL AND payload_json IS NOT NULL', t);
+        EXECUTE format(
+            'INSERT INTO raw_chatwoot_payloads (content_hash, payload_json) '
+            'SELECT DISTINCT ON (content_hash) content_hash, payload_json FROM %I WHERE payload_json IS NOT NULL '
+            'ON CONFLICT (content_hash) DO NOTHING', t);
+    END LOOP;
+
+    -- Staging views must stop reading payload_json before it is dropped
+    CREATE OR REPLACE VIEW stg_conversations AS
+    SELECT conversation_id, inbox_id, status, assignee_id, contact_id,
+           created_at_ts AS created_at, updated_at_ts AS updated_at, last_activity_at, unread_count
+    FROM raw_chatwoot_conversations;
+
+    CREATE OR REPLACE VIEW stg_messages AS
+    SELECT message_id, conversation_id, inbox_id, sender_type, message_type, private AS is_private,
+           created_at_ts AS created_at, LENGTH(content) AS content_length,
+           COALESCE(has_attachment, false) AS has_attachment, sender_id
+    FROM raw_chatwoot_messages;
+
+    FOREACH t IN ARRAY ARRAY['raw_chatwoot_conversations', 'raw_chatwoot_messages', 'raw_chatwoot_reporting_events'] LOOP
+        EXECUTE format('ALTER TABLE %I DROP COLUMN payload_json', t);
+    END LOOP;
+END $$;
+
+-- Webhook events: repeated headers to raw_chatwoot_header_sets, per-request ones stay on the event
+-- (same list as REQUEST_HEADERS in app/api/v1/endpoints/webhooks.py)
+DO $$
+DECLARE per_request text[] := ARRAY['content-length', 'x-request-id', 'x-real-ip', 'x-forwarded-for', 'x-amzn-trace-id',
+                                    'traceparent', 'tracestate', 'x-chatwoot-signature', 'x-chatwoot-timestamp', 'x-chatwoot-delivery'];
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name = 'raw_chatwoot_events' AND column_name = 'headers_json') THEN
+        RETURN;
+    END IF;
+
+    -- md5 is a provisional key: the live key is blake2b of canonical JSON (content_hash), which
+    -- SQL cannot compute. The data hub worker re-keys these sets at startup (bulk.rekey_header_sets),
+    -- before new deliveries would store them a second time.
+    UPDATE raw_chatwoot_events SET
+        header_set_hash = md5((headers_json - per_request)::text),
+        request_headers_json = (SELECT jsonb_object_agg(key, value) FROM jsonb_each(headers_json) WHERE key = ANY(per_request))
+    WHERE headers_json IS NOT NULL;
+    INSERT INTO raw_chatwoot_header_sets (headers_hash, headers_json)
+    SELECT DISTINCT ON (header_set_hash) header_set_hash, headers_json - per_request
+    FROM raw_chatwoot_events WHERE header_set_hash IS NOT NULL
+    ON CONFLICT (headers_hash) DO NOTHING;
+
+    ALTER TABLE raw_chatwoot_events DROP COLUMN headers_json;
+END $$;
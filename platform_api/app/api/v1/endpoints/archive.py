@@ -0,0 +1,51 @@
+import asyncio
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+
+from app.core.config import settings
+from app.db.archive import EVENTS, RUNS, ArchiveUnavailable, read_archive
+
+router = APIRouter()
+
+
+def _check_range(date_from: date, date_to: date):
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to is before date_from")
+    if (date_to - date_from).days + 1 > settings.ARCHIVE_MAX_QUERY_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.ARCHIVE_MAX_QUERY_DAYS} days per query")
+
+
+async def _read(table: str, date_from: date, date_to: date, filters: dict, limit: int):
+    _check_range(date_from, date_to)
+    try:
+        return await asyncio.to_thread(read_archive, settings.ARCHIVE_DIR, table, date_from, date_to, filters, limit)
+    except ArchiveUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/bot-runs")
+async def get_archived_runs(
+    date_from: date = Query(..., description="YYYY-MM-DD, run creation day"),
+    date_to: date = Query(..., description="YYYY-MM-DD, inclusive"),
+    run_id: Optional[str] = None,
+    conversation_id: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(1000, le=10000),
+):
+    """Archived bot runs (read-only). Only the Parquet files of the requested days are scanned."""
+    filters = {"id": run_id, "conversation_id": conversation_id, "status": status}
+    return await _read(RUNS, date_from, date_to, filters, limit)
+
+
+@router.get("/bot-run-events")
+async def get_archived_run_events(
+    date_from: date = Query(..., description="YYYY-MM-DD, creation day of the run"),
+    date_to: date = Query(..., description="YYYY-MM-DD, inclusive"),
+    run_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    limit: int = Query(1000, le=10000),
+):
+    """Archived events of bot runs (read-only), filed under their run's creation day."""
+    filters = {"run_id": run_id, "event_type": event_type}
+    return await _read(EVENTS, date_from, date_to, filters, limit)
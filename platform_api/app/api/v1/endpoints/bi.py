@@ -1,8 +1,11 @@
-from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, Query
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
+from app.core.config import settings
 from app.db.session import get_db
+from shared.utils.sketch import merge_sketches
 
 router = APIRouter()
 
@@ -49,56 +52,135 @@ async def get_agent_volume(
 
 @router.get("/time-metrics")
 async def get_time_metrics(
-    date_from: str = Query(None), # Not always applicable if mart is lifetime, assuming mart is per conversation
-    # Conversations don't have a rigid 'date' in the mart unless looking at creation date in stg joined?
-    # The mart_conversation_time_metrics is keyed by conversation_id. 
-    # To filter by date, we need to join stg_conversations or add date to mart.
-    # I'll join stg_conversations for filtering.
-    date_to: str = Query(None),
+    date_from: str = Query(None, description="YYYY-MM-DD, conversation creation day"),
+    date_to: str = Query(None, description="YYYY-MM-DD, inclusive"),
     inbox_id: Optional[int] = None,
+    exact: bool = Query(False, description="Exact percentiles from the per-conversation mart"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     SLA Metrics: First Response, Resolution, etc.
-    Returns aggregates (AVG, P50, P90).
+    Returns aggregates (AVG, P50, P90) of the conversations created in the range.
+    Percentiles merge the daily sketches of mart_time_metric_sketches
+    (within 1% of a true value); averages are exact. With `exact`, they are
+    computed over mart_conversation_time_metrics, an index range scan on
+    (created_day, inbox_id) that grows with the number of conversations.
     """
+    day_column = "created_day" if exact else "day"
+    filters = ""
+    params = {}
+    if date_from:
+        filters += f" AND {day_column} >= CAST(:d_from AS date)"
+        params["d_from"] = date_from
+    if date_to:
+        filters += f" AND {day_column} <= CAST(:d_to AS date)"
+        params["d_to"] = date_to
+    if inbox_id:
+        filters += " AND inbox_id = :inbox_id"
+        params["inbox_id"] = inbox_id
+
+    if exact:
+        query = """
+        SELECT
+            AVG(first_response_seconds) as avg_first_response,
+            PERCENTILE_CONT(0.5) WITHIN GROUP(ORDER BY first_response_seconds) as p50_first_response,
+            PERCENTILE_CONT(0.9) WITHIN GROUP(ORDER BY first_response_seconds) as p90_first_response,
+
+            AVG(resolution_seconds) as avg_resolution,
+            PERCENTILE_CONT(0.5) WITHIN GROUP(ORDER BY resolution_seconds) as p50_resolution,
+
+            AVG(reply_time_seconds) as avg_reply_time
+        FROM mart_conversation_time_metrics
+        WHERE created_day IS NOT NULL
+        """
+        result = await db.execute(text(query + filters), params)
+        row = result.fetchone()
+        return dict(row._mapping) if row else {}
+
     query = """
-    WITH filtered AS (
-        SELECT 
-            m.first_response_seconds,
-            m.resolution_seconds,
-            m.reply_time_seconds
-        FROM mart_conversation_time_metrics m
-        JOIN stg_conversations c ON c.conversation_id = m.conversation_id
+        SELECT metric, count, total, zero_count, buckets, counts
+        FROM mart_time_metric_sketches
         WHERE 1=1
     """
+    rows_by_metric: Dict[str, List[Any]] = {}
+    for row in await db.execute(text(query + filters), params):
+        rows_by_metric.setdefault(row.metric, []).append(row)
+    first_response, resolution, reply_time = (
+        merge_sketches(rows_by_metric.get(metric, [])) for metric in ("first_response", "resolution", "reply_time")
+    )
+    return {
+        "avg_first_response": first_response.mean,
+        "p50_first_response": first_response.quantile(0.5),
+        "p90_first_response": first_response.quantile(0.9),
+        "avg_resolution": resolution.mean,
+        "p50_resolution": resolution.quantile(0.5),
+        "avg_reply_time": reply_time.mean,
+    }
+
+@router.get("/bot-latency")
+async def get_bot_latency(
+    date_from: date = Query(None, description="YYYY-MM-DD, at most ARCHIVE_AFTER_DAYS ago"),
+    date_to: date = Query(None, description="YYYY-MM-DD"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Customer wait time per crew version: webhook receipt -> Chatwoot reply.
+    Built from the 'latency_breakdown' events written by bot_runner.
+    Runs older than ARCHIVE_AFTER_DAYS are moved to the Parquet archive
+    (/archive/bot-runs), so a `date_from` before the archive cutoff is
+    rejected instead of silently answering over part of the range.
+    """
+    archived_before = (datetime.utcnow() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)).date() + timedelta(days=1)
+    if date_from and date_from < archived_before:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Runs before {archived_before} may be archived, see /api/v1/archive/bot-runs",
+        )
+    query = """
+    WITH runs AS (
+        SELECT
+            r.crew_version_id,
+            (e.payload_json->>'total_ms')::float AS total_ms,
+            (e.payload_json->>'queue_wait_ms')::float AS queue_wait_ms,
+            (e.payload_json->>'db_ms')::float AS db_ms,
+            (e.payload_json->>'crew_ms')::float AS crew_ms,
+            (e.payload_json->>'llm_ms')::float AS llm_ms,
+            (e.payload_json->>'llm_calls')::int AS llm_calls,
+            (e.payload_json->>'reply_ms')::float AS reply_ms
+        FROM bot_run_events e
+        JOIN bot_runs r ON r.id = e.run_id
+        WHERE e.event_type = 'latency_breakdown'
+    """
     params = {}
     if date_from:
-        query += " AND c.created_at >= :d_from"
+        query += " AND r.created_at >= CAST(:d_from AS date)"
         params["d_from"] = date_from
     if date_to:
-        query += " AND c.created_at <= :d_to"
+        query += " AND r.created_at < CAST(:d_to AS date) + 1"
         params["d_to"] = date_to
-    if inbox_id:
-        query += " AND m.inbox_id = :inbox_id"
-        params["inbox_id"] = inbox_id
-    
+
     query += """)
     SELECT
-        AVG(first_response_seconds) as avg_first_response,
-        PERCENTILE_CONT(0.5) WITHIN GROUP(ORDER BY first_response_seconds) as p50_first_response,
-        PERCENTILE_CONT(0.9) WITHIN GROUP(ORDER BY first_response_seconds) as p90_first_response,
-        
-        AVG(resolution_seconds) as avg_resolution,
-        PERCENTILE_CONT(0.5) WITHIN GROUP(ORDER BY resolution_seconds) as p50_resolution,
-        
-        AVG(reply_time_seconds) as avg_reply_time
-    FROM filtered
+        runs.crew_version_id,
+        v.version_tag,
+        COUNT(*) as runs,
+        AVG(total_ms) as avg_total_ms,
+        PERCENTILE_CONT(0.5) WITHIN GROUP(ORDER BY total_ms) as p50_total_ms,
+        PERCENTILE_CONT(0.95) WITHIN GROUP(ORDER BY total_ms) as p95_total_ms,
+        AVG(queue_wait_ms) as avg_queue_wait_ms,
+        AVG(db_ms) as avg_db_ms,
+        AVG(crew_ms) as avg_crew_ms,
+        AVG(llm_ms) as avg_llm_ms,
+        AVG(llm_calls) as avg_llm_calls,
+        AVG(reply_ms) as avg_reply_ms
+    FROM runs
+    LEFT JOIN bot_crew_versions v ON v.id = runs.crew_version_id
+    GROUP BY runs.crew_version_id, v.version_tag
+    ORDER BY runs.crew_version_id
     """
-    
+
     result = await db.execute(text(query), params)
-    row = result.fetchone()
-    return dict(row._mapping) if row else {}
+    return [dict(row._mapping) for row in result]
 
 @router.get("/backlog")
 async def get_backlog(
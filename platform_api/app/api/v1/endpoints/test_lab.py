@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from datetime import datetime
+from uuid import UUID
 import asyncio
 
 from app.db.session import get_db
@@ -33,13 +34,13 @@ async def create_test_run(
 ) -> Any:
     """Create a new manual run context."""
     # Check if exists
-    result = await db.execute(select(BotRun).where(BotRun.id == run_in.id))
+    result = await db.execute(select(BotRun).where(BotRun.id == str(run_in.id)))
     existing = result.scalars().first()
     if existing:
         return existing
         
     db_obj = BotRun(
-        id=run_in.id, 
+        id=str(run_in.id), 
         source="manual", 
         status="running"
         # crew_version_id intentionally left null initially or set if provided
@@ -54,12 +55,12 @@ async def create_test_run(
 
 @router.get("/runs/{run_id}", response_model=TestRunSchema)
 async def get_test_run(
-    run_id: str,
+    run_id: UUID,
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Get a specific run."""
     result = await db.execute(
-        select(BotRun).where(BotRun.id == run_id).options(selectinload(BotRun.events))
+        select(BotRun).where(BotRun.id == str(run_id)).options(selectinload(BotRun.events))
     )
     run = result.scalars().first()
     if not run:
@@ -68,7 +69,7 @@ async def get_test_run(
 
 @router.post("/runs/{run_id}/messages", response_model=TestRunEventSchema)
 async def add_message(
-    run_id: str,
+    run_id: UUID,
     msg_in: MessageCreate,
     db: AsyncSession = Depends(get_db)
 ) -> Any:
@@ -77,11 +78,11 @@ async def add_message(
     This triggers the pipeline execution synchronously for the Test Lab MVP.
     """
     # 1. Get Run
-    result = await db.execute(select(BotRun).where(BotRun.id == run_id))
+    result = await db.execute(select(BotRun).where(BotRun.id == str(run_id)))
     run = result.scalars().first()
     if not run:
         # Auto-create
-        run = BotRun(id=run_id, source="manual", status="running")
+        run = BotRun(id=str(run_id), source="manual", status="running")
         db.add(run)
         await db.commit()
     
@@ -152,17 +153,17 @@ async def add_message(
 
 @router.get("/runs/{run_id}/events", response_model=List[TestRunEventSchema])
 async def get_run_events(
-    run_id: str,
+    run_id: UUID,
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     result = await db.execute(
-        select(BotRunEvent).where(BotRunEvent.run_id == run_id).order_by(BotRunEvent.timestamp)
+        select(BotRunEvent).where(BotRunEvent.run_id == str(run_id)).order_by(BotRunEvent.timestamp)
     )
     return result.scalars().all()
 
 @router.get("/runs/{run_id}/events/stream")
 async def stream_run_events(
-    run_id: str,
+    run_id: UUID,
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -178,7 +179,7 @@ async def stream_run_events(
         # Keep connection open for a while or until run finishes
         for _ in range(60): 
             # Check for new events
-            query = select(BotRunEvent).where(BotRunEvent.run_id == run_id)
+            query = select(BotRunEvent).where(BotRunEvent.run_id == str(run_id))
             if last_event_time:
                 query = query.where(BotRunEvent.timestamp > last_event_time)
             query = query.order_by(BotRunEvent.timestamp)
@@ -199,7 +200,7 @@ async def stream_run_events(
             await asyncio.sleep(1)
             
             # Check run status
-            r_res = await db.execute(select(BotRun).where(BotRun.id == run_id))
+            r_res = await db.execute(select(BotRun).where(BotRun.id == str(run_id)))
             r = r_res.scalars().first()
             if r and r.status in ["success", "failed"]:
                 yield f"data: {{\"type\": \"status_change\", \"status\": \"{r.status}\"}}\n\n"
@@ -2,13 +2,17 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 import logging
 import json
+import time
 from datetime import datetime, timezone
+from typing import Dict, Tuple
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.db.session import get_db
-from app.models.data_hub import RawChatwootEvent
+from app.models.data_hub import RawChatwootEvent, RawChatwootHeaderSet, content_hash
 from shared.utils.redis_utils import RedisStreamUtils
+from shared.utils.tracing import span, current_traceparent
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -16,6 +20,33 @@ logger = logging.getLogger(__name__)
 # Basic token for dev purposes.
 WEBHOOK_TOKEN = "SEU_TOKEN" 
 
+# Headers that differ on every delivery, kept on the event itself
+REQUEST_HEADERS = {
+    "content-length", "x-request-id", "x-real-ip", "x-forwarded-for", "x-amzn-trace-id",
+    "traceparent", "tracestate", "x-chatwoot-signature", "x-chatwoot-timestamp", "x-chatwoot-delivery",
+}
+# Header sets already stored by this process (a Chatwoot instance sends a handful)
+_known_header_sets = set()
+MAX_KNOWN_HEADER_SETS = 1000
+
+
+def split_headers(headers: Dict[str, str]) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+    """(header set hash, repeated headers, per-request headers)"""
+    shared, per_request = {}, {}
+    for name, value in headers.items():
+        (per_request if name.lower() in REQUEST_HEADERS else shared)[name.lower()] = value
+    return content_hash(shared), shared, per_request
+
+
+async def store_header_set(db: AsyncSession, headers_hash: str, headers: Dict[str, str]):
+    if headers_hash in _known_header_sets:
+        return
+    await db.execute(
+        pg_insert(RawChatwootHeaderSet)
+        .values(headers_hash=headers_hash, headers_json=headers)
+        .on_conflict_do_nothing(index_elements=["headers_hash"])
+    )
+
 @router.post("/chatwoot")
 async def chatwoot_webhook(
     request: Request,
@@ -29,85 +60,100 @@ async def chatwoot_webhook(
     3. Filters 'message_created'.
     4. Publishes normalized event to Redis.
     """
-    # 1. Validate Token
-    if t != WEBHOOK_TOKEN:
-        logger.warning(f"Invalid webhook token attempted: {t}")
-        raise HTTPException(status_code=403, detail="Invalid token")
-
-    try:
-        payload = await request.json()
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid JSON payload")
-
-    # 2. Persist RAW Event
-    event_type = payload.get("event")
-    account_id = payload.get("account", {}).get("id")
+    received_at_ms = int(time.time() * 1000)
+
+    # Root span of the end-to-end trace (webhook -> stream -> bot_runner -> reply)
+    with span("webhook.chatwoot", attributes={"http.route": "/webhooks/chatwoot"}):
+        # 1. Validate Token
+        if t != WEBHOOK_TOKEN:
+            logger.warning(f"Invalid webhook token attempted: {t}")
+            raise HTTPException(status_code=403, detail="Invalid token")
+
+        try:
+            payload = await request.json()
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+        # 2. Persist RAW Event
+        event_type = payload.get("event")
+        account_id = payload.get("account", {}).get("id")
     
-    # Extract IDs if available just for indexing columns
-    data = payload.get("data", {})
-    conversation_id = data.get("conversation", {}).get("id")
-    message_id = data.get("id")
+        # Extract IDs if available just for indexing columns
+        data = payload.get("data", {})
+        conversation_id = data.get("conversation", {}).get("id")
+        message_id = data.get("id")
     
-    # Use consolidated RawChatwootEvent
-    # Note: received_at is default now
-    raw_event = RawChatwootEvent(
-        event_name=event_type,
-        account_id=account_id,
-        inbox_id=data.get("inbox", {}).get("id"), # Added inbox_id mapping
-        conversation_id=conversation_id,
-        message_id=message_id,
-        payload_json=payload,
-        headers_json=dict(request.headers),
-        is_valid=True 
-    )
-    db.add(raw_event)
-    await db.commit()
-    await db.refresh(raw_event)
+        headers_hash, shared_headers, request_headers = split_headers(dict(request.headers))
+
+        # Use consolidated RawChatwootEvent
+        # Note: received_at is default now
+        raw_event = RawChatwootEvent(
+            event_name=event_type,
+            account_id=account_id,
+            inbox_id=data.get("inbox", {}).get("id"), # Added inbox_id mapping
+            conversation_id=conversation_id,
+            message_id=message_id,
+            payload_json=payload,
+            header_set_hash=headers_hash,
+            request_headers_json=request_headers,
+            is_valid=True 
+        )
+        with span("db.persist_raw_event"):
+            await store_header_set(db, headers_hash, shared_headers)
+            db.add(raw_event)
+            await db.commit()
+            await db.refresh(raw_event)
+        if len(_known_header_sets) >= MAX_KNOWN_HEADER_SETS:
+            _known_header_sets.clear()
+        _known_header_sets.add(headers_hash)
     
-    logger.info(f"Persisted Raw Event ID: {raw_event.id} - Type: {event_type}")
-
-    # 3. Filter Event Type
-    if event_type != "message_created":
-        logger.info(f"Ignored event type: {event_type}")
-        return {"status": "ignored", "reason": "event_type"}
-
-    # 4. Extract Data & Publish
-    try:
-        conversation = data.get("conversation", {})
-        sender = data.get("sender", {})
-        message_type = payload.get("message_type") # incoming/outgoing
+        logger.info(f"Persisted Raw Event ID: {raw_event.id} - Type: {event_type}")
+
+        # 3. Filter Event Type
+        if event_type != "message_created":
+            logger.info(f"Ignored event type: {event_type}")
+            return {"status": "ignored", "reason": "event_type"}
+
+        # 4. Extract Data & Publish
+        try:
+            conversation = data.get("conversation", {})
+            sender = data.get("sender", {})
+            message_type = payload.get("message_type") # incoming/outgoing
         
-        event_data = {
-            "raw_event_id": raw_event.id, # Link to raw storage
-            "account_id": account_id,
-            "inbox_id": data.get("inbox", {}).get("id"),
-            "conversation_id": conversation.get("id"),
-            "message_id": message_id,
-            "message_type": message_type,
-            "sender": {
-                "id": sender.get("id"),
-                "name": sender.get("name"),
-                "phone_number": sender.get("phone_number")
-            },
-            "content": data.get("content"),
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
+            event_data = {
+                "raw_event_id": raw_event.id, # Link to raw storage
+                "account_id": account_id,
+                "inbox_id": data.get("inbox", {}).get("id"),
+                "conversation_id": conversation.get("id"),
+                "message_id": message_id,
+                "message_type": message_type,
+                "sender": {
+                    "id": sender.get("id"),
+                    "name": sender.get("name"),
+                    "phone_number": sender.get("phone_number")
+                },
+                "content": data.get("content"),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                # Trace context for bot_runner (latency from receipt to reply)
+                "traceparent": current_traceparent(),
+                "received_at_ms": received_at_ms
+            }
         
-        logger.info(f"Publishing message_created: {event_data['message_id']} (Raw ID: {raw_event.id})")
+            logger.info(f"Publishing message_created: {event_data['message_id']} (Raw ID: {raw_event.id})")
 
-        # Publish to Redis Stream
-        redis = RedisStreamUtils(settings.REDIS_URL)
-        await redis.publish_message(
-            stream_name=settings.REDIS_STREAM_NAME,
-            data=event_data
-        )
+            # Publish to Redis Stream
+            redis = RedisStreamUtils(settings.REDIS_URL)
+            await redis.publish_message(
+                stream_name=settings.REDIS_STREAM_NAME,
+                data=event_data
+            )
         
-        return {"status": "processed", "message_id": event_data["message_id"], "raw_id": raw_event.id}
-
-    except Exception as e:
-        logger.error(f"Error processing webhook: {str(e)}")
-        # Optionally mark raw event as invalid or add error note
-        raw_event.is_valid = False
-        raw_event.validation_error = str(e)
-        await db.commit()
-        raise HTTPException(status_code=500, detail="Internal processing error")
+            return {"status": "processed", "message_id": event_data["message_id"], "raw_id": raw_event.id}
+
+        except Exception as e:
+            logger.error(f"Error processing webhook: {str(e)}")
+            # Optionally mark raw event as invalid or add error note
+            raw_event.is_valid = False
+            raw_event.validation_error = str(e)
+            await db.commit()
+            raise HTTPException(status_code=500, detail="Internal processing error")
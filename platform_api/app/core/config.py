@@ -19,4 +19,11 @@ class Settings(BaseSettings):
     REDIS_URL: str
     REDIS_STREAM_NAME: str = "events:chatwoot"
 
+    # Bot run archive (compressed Parquet cold storage, app/db/archive.py)
+    ARCHIVE_DIR: str = "/app/data/archive"
+    ARCHIVE_AFTER_DAYS: int = 90
+    ARCHIVE_INTERVAL_SECONDS: int = 86400  # 0 disables the archiver of this process
+    ARCHIVE_BATCH_RUNS: int = 1000
+    ARCHIVE_MAX_QUERY_DAYS: int = 31
+
 settings = Settings()
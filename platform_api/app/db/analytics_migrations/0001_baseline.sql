@@ -0,0 +1,112 @@
+-- Analytics schema baseline: staging views, mart tables, backlog snapshot.
+-- Idempotent, so it also upgrades databases created by the former analytics.sql
+-- (materialized view marts). Later changes go in new numbered files.
+
+-- STG LAYERS (Views)
+-- They read typed columns extracted at ingest, not payload JSON
+-- (migrations/extract_raw_payloads.sql upgrades older raw tables and these views).
+
+CREATE OR REPLACE VIEW stg_conversations AS
+SELECT
+    conversation_id,
+    inbox_id,
+    status,
+    assignee_id,
+    contact_id,
+    created_at_ts AS created_at,
+    updated_at_ts AS updated_at,
+    last_activity_at,
+    unread_count
+FROM raw_chatwoot_conversations;
+
+CREATE OR REPLACE VIEW stg_messages AS
+SELECT
+    message_id,
+    conversation_id,
+    inbox_id,
+    sender_type,
+    message_type,
+    private AS is_private,
+    created_at_ts AS created_at,
+    LENGTH(content) AS content_length,
+    COALESCE(has_attachment, false) AS has_attachment,
+    sender_id -- Appended: CREATE OR REPLACE VIEW can only add columns at the end
+FROM raw_chatwoot_messages;
+
+CREATE OR REPLACE VIEW stg_reporting_events AS
+SELECT
+    reporting_event_id,
+    conversation_id,
+    inbox_id,
+    user_id,
+    name,
+    value_seconds,
+    value_business_hours_seconds,
+    event_start_time,
+    event_end_time
+FROM raw_chatwoot_reporting_events
+WHERE conversation_id IS NOT NULL; -- Ensure linked to conversation
+
+-- MART LAYERS (Aggregate tables maintained incrementally by data_hub_runner/analytics.py / Snapshot Table for Backlog)
+
+-- Earlier versions created the marts as materialized views
+DO $$
+DECLARE mv text;
+BEGIN
+    FOR mv IN SELECT matviewname FROM pg_matviews
+              WHERE matviewname IN ('mart_inbox_daily_volume', 'mart_agent_daily_volume', 'mart_conversation_time_metrics')
+    LOOP
+        EXECUTE format('DROP MATERIALIZED VIEW %I', mv);
+    END LOOP;
+END $$;
+
+-- Last refresh of each mart: rows synced (raw *.synced_at) after it are pending.
+-- source_changes is the source tables' write counter then (pg_stat_user_tables); unchanged = skip.
+CREATE TABLE IF NOT EXISTS mart_refresh_state (
+    mart VARCHAR PRIMARY KEY,
+    watermark TIMESTAMP NOT NULL,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+ALTER TABLE mart_refresh_state ADD COLUMN IF NOT EXISTS source_changes BIGINT;
+
+-- 1. Inbox Daily Volume (recomputed per affected day)
+CREATE TABLE IF NOT EXISTS mart_inbox_daily_volume (
+    day DATE NOT NULL,
+    inbox_id INT,
+    conversations_count BIGINT NOT NULL,
+    messages_count BIGINT NOT NULL
+);
+
+-- 2. Agent Daily Volume (recomputed per affected day)
+CREATE TABLE IF NOT EXISTS mart_agent_daily_volume (
+    day DATE NOT NULL,
+    user_id INT,
+    messages_count BIGINT NOT NULL,
+    conversations_touched BIGINT NOT NULL
+);
+
+-- 3. Conversation Time Metrics (recomputed per affected conversation)
+-- Derived from reporting events primarily, or calculated if not available.
+-- Chatwoot exports 'first_response', 'resolution', 'reply_time' events.
+CREATE TABLE IF NOT EXISTS mart_conversation_time_metrics (
+    conversation_id INT NOT NULL,
+    inbox_id INT,
+    first_response_seconds INT,
+    resolution_seconds INT,
+    reply_time_seconds NUMERIC,
+    first_response_bh_seconds INT,
+    resolution_bh_seconds INT
+);
+
+-- 4. Backlog Snapshot Table (History)
+CREATE TABLE IF NOT EXISTS mart_backlog_snapshot (
+    snapshot_ts TIMESTAMP DEFAULT NOW(),
+    inbox_id INT,
+    status VARCHAR,
+    count INT
+);
+
+-- Indices
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mart_inbox_daily ON mart_inbox_daily_volume (day, inbox_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mart_agent_daily ON mart_agent_daily_volume (day, user_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mart_conv_metrics ON mart_conversation_time_metrics (conversation_id);
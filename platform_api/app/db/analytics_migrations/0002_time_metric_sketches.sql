@@ -0,0 +1,18 @@
+-- 5. Time Metric Sketches (recomputed per affected conversation creation day)
+-- One quantile sketch (shared/utils/sketch.py) per day, inbox and metric
+-- ('first_response', 'resolution', 'reply_time'): value count and sum for the
+-- average, values <= 0 in zero_count, and the counts of the non-empty
+-- logarithmic buckets. /bi/time-metrics merges the sketches of the requested
+-- range instead of sorting every conversation.
+CREATE TABLE IF NOT EXISTS mart_time_metric_sketches (
+    day DATE NOT NULL,
+    inbox_id INT,
+    metric VARCHAR NOT NULL,
+    count BIGINT NOT NULL,
+    total DOUBLE PRECISION NOT NULL,
+    zero_count BIGINT NOT NULL,
+    buckets INT[] NOT NULL,
+    counts BIGINT[] NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mart_time_metric_sketches ON mart_time_metric_sketches (day, inbox_id, metric);
@@ -0,0 +1,12 @@
+-- Conversation creation day on the time metrics mart, so date-filtered SLA
+-- queries scan (created_day, inbox_id) instead of joining stg_conversations.
+-- The refresh keeps it current; rows already in the mart are filled here.
+ALTER TABLE mart_conversation_time_metrics ADD COLUMN IF NOT EXISTS created_day DATE;
+
+UPDATE mart_conversation_time_metrics m
+SET created_day = c.created_at_ts::date
+FROM raw_chatwoot_conversations c
+WHERE c.conversation_id = m.conversation_id
+  AND m.created_day IS DISTINCT FROM c.created_at_ts::date;
+
+CREATE INDEX IF NOT EXISTS idx_mart_conv_metrics_day_inbox ON mart_conversation_time_metrics (created_day, inbox_id);
@@ -0,0 +1,234 @@
+"""
+Cold storage of old bot runs: compressed (zstd) Parquet files, one
+directory per day, with a manifest per directory.
+
+    <root>/bot_runs/date=2024-05-01/part-<batch>.parquet
+    <root>/bot_run_events/date=2024-05-01/part-<batch>.parquet
+    <root>/<table>/date=2024-05-01/_manifest.json
+
+Runs are partitioned by their created_at day and their events follow them,
+so a run and all its events always sit under the same date. Each batch is
+written (files, then manifests) before its rows are deleted in the same
+transaction that read them. A batch retried after a crash has the same
+name and overwrites its files instead of duplicating them.
+
+Reads only open the day directories of the requested range and the files
+their manifests list; Parquet row-group statistics prune the rest.
+
+pyarrow is optional: without it nothing is archived and reads fail with
+ArchiveUnavailable.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+RUNS = "bot_runs"
+EVENTS = "bot_run_events"
+TABLES = (RUNS, EVENTS)
+MANIFEST = "_manifest.json"
+# One archiver at a time across API processes
+ARCHIVE_LOCK_KEY = 7260433
+
+
+class ArchiveUnavailable(RuntimeError):
+    pass
+
+
+def _schema(table: str):
+    if table == RUNS:
+        return pa.schema([
+            ("id", pa.string()),
+            ("crew_version_id", pa.int64()),
+            ("source", pa.string()),
+            ("conversation_id", pa.string()),
+            ("status", pa.string()),
+            ("result_output", pa.string()),
+            ("created_at", pa.timestamp("us")),
+            ("finished_at", pa.timestamp("us")),
+        ])
+    return pa.schema([
+        ("id", pa.string()),
+        ("run_id", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("event_type", pa.string()),
+        ("payload_json", pa.string()),  # JSON text, decoded on read
+    ])
+
+
+# --- Layout ---
+
+def partition_dir(root: Path, table: str, day: date) -> Path:
+    return Path(root) / table / f"date={day.isoformat()}"
+
+
+def batch_name(run_ids: Sequence[str]) -> str:
+    """Deterministic file name of a batch of runs."""
+    digest = hashlib.sha1("\n".join(sorted(run_ids)).encode()).hexdigest()[:16]
+    return f"part-{digest}.parquet"
+
+
+def days_between(date_from: date, date_to: date) -> List[date]:
+    return [date_from + timedelta(days=n) for n in range((date_to - date_from).days + 1)]
+
+
+def load_manifest(directory: Path) -> Dict[str, Any]:
+    path = Path(directory) / MANIFEST
+    if not path.exists():
+        return {"files": []}
+    return json.loads(path.read_text())
+
+
+def record_file(directory: Path, entry: Dict[str, Any]):
+    """Adds (or replaces, on a retried batch) a file entry of the manifest, atomically."""
+    manifest = load_manifest(directory)
+    manifest["files"] = [f for f in manifest["files"] if f["file"] != entry["file"]] + [entry]
+    _write_atomic(Path(directory) / MANIFEST, lambda tmp: tmp.write_text(json.dumps(manifest, indent=1, default=str)))
+
+
+def _write_atomic(path: Path, write):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _write_parquet(directory: Path, name: str, table: str, rows: List[Dict[str, Any]], time_column: str) -> Dict[str, Any]:
+    data = pa.Table.from_pylist(rows, schema=_schema(table))
+    _write_atomic(Path(directory) / name, lambda tmp: pq.write_table(data, tmp, compression="zstd"))
+    times = [r[time_column] for r in rows if r[time_column] is not None]
+    return {
+        "file": name,
+        "rows": len(rows),
+        "bytes": (Path(directory) / name).stat().st_size,
+        f"min_{time_column}": min(times) if times else None,
+        f"max_{time_column}": max(times) if times else None,
+        "archived_at": datetime.utcnow(),
+    }
+
+
+def write_day(root: Path, day: date, name: str, runs: List[Dict[str, Any]], events: List[Dict[str, Any]]):
+    """Writes the runs and events of one day of a batch, then records them in the manifests."""
+    for table, rows, time_column in ((RUNS, runs, "created_at"), (EVENTS, events, "timestamp")):
+        if not rows:
+            continue
+        directory = partition_dir(root, table, day)
+        record_file(directory, _write_parquet(directory, name, table, rows, time_column))
+
+
+# --- Archiving ---
+
+RUNS_SQL = """
+    SELECT id::text AS id, crew_version_id, source, conversation_id, status, result_output, created_at, finished_at
+    FROM bot_runs WHERE created_at < :cutoff
+    ORDER BY created_at, id LIMIT :limit
+"""
+EVENTS_SQL = """
+    SELECT id::text AS id, run_id::text AS run_id, "timestamp", event_type, payload_json::text AS payload_json
+    FROM bot_run_events WHERE run_id = ANY(CAST(:run_ids AS uuid[]))
+    ORDER BY run_id, "timestamp"
+"""
+
+
+async def archive_batch(session, root: Path, cutoff: datetime, batch_runs: int) -> Tuple[int, int]:
+    """
+    Archives the oldest `batch_runs` runs created before `cutoff` and deletes
+    them. Returns (runs, events) archived, (0, 0) when there is nothing left
+    or another process holds the archive lock.
+    """
+    locked = await session.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ARCHIVE_LOCK_KEY})
+    if not locked.scalar():
+        await session.rollback()
+        return 0, 0
+    runs = [dict(r._mapping) for r in await session.execute(text(RUNS_SQL), {"cutoff": cutoff, "limit": batch_runs})]
+    if not runs:
+        await session.rollback()
+        return 0, 0
+    run_ids = [r["id"] for r in runs]
+    events = [dict(r._mapping) for r in await session.execute(text(EVENTS_SQL), {"run_ids": run_ids})]
+
+    name = batch_name(run_ids)
+    day_of_run = {r["id"]: r["created_at"].date() for r in runs}
+    by_day: Dict[date, Tuple[list, list]] = {}
+    for run in runs:
+        by_day.setdefault(day_of_run[run["id"]], ([], []))[0].append(run)
+    for event in events:
+        by_day[day_of_run[event["run_id"]]][1].append(event)
+    for day, (day_runs, day_events) in sorted(by_day.items()):
+        await asyncio.to_thread(write_day, root, day, name, day_runs, day_events)
+
+    await session.execute(text("DELETE FROM bot_run_events WHERE run_id = ANY(CAST(:run_ids AS uuid[]))"), {"run_ids": run_ids})
+    await session.execute(text("DELETE FROM bot_runs WHERE id = ANY(CAST(:run_ids AS uuid[]))"), {"run_ids": run_ids})
+    await session.commit()
+    return len(runs), len(events)
+
+
+async def archive_old_runs(session_factory, root: Path, older_than_days: int, batch_runs: int = 1000) -> Tuple[int, int]:
+    """Archives every run older than `older_than_days`, batch by batch. Returns (runs, events)."""
+    if not PYARROW_AVAILABLE:
+        logger.warning("pyarrow is not installed, bot runs are not archived")
+        return 0, 0
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    total_runs = total_events = 0
+    while True:
+        async with session_factory() as session:
+            runs, events = await archive_batch(session, root, cutoff, batch_runs)
+        if not runs:
+            break
+        total_runs += runs
+        total_events += events
+    if total_runs:
+        logger.info(f"Archived {total_runs} bot runs and {total_events} events older than {cutoff:%Y-%m-%d}")
+    return total_runs, total_events
+
+
+async def run_archive_loop(session_factory, root: Path, older_than_days: int, batch_runs: int, interval_seconds: int):
+    while True:
+        try:
+            await archive_old_runs(session_factory, root, older_than_days, batch_runs)
+        except Exception as e:
+            logger.error(f"Bot run archiving failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+# --- Reading ---
+
+def read_archive(
+    root: Path, table: str, date_from: date, date_to: date, filters: Optional[Dict[str, Any]] = None, limit: int = 1000
+) -> List[Dict[str, Any]]:
+    """
+    Rows of `table` archived for the days date_from..date_to (run created_at),
+    matching the equality `filters`. Only the files listed in those days'
+    manifests are opened.
+    """
+    if not PYARROW_AVAILABLE:
+        raise ArchiveUnavailable("pyarrow is not installed")
+    predicates = [(column, "=", value) for column, value in (filters or {}).items() if value is not None]
+    rows: List[Dict[str, Any]] = []
+    for day in days_between(date_from, date_to):
+        directory = partition_dir(root, table, day)
+        for entry in load_manifest(directory)["files"]:
+            found = pq.read_table(directory / entry["file"], filters=predicates or None).to_pylist()
+            for row in found:
+                if table == EVENTS and row.get("payload_json") is not None:
+                    row["payload_json"] = json.loads(row["payload_json"])
+                row["archive_date"] = day
+            rows.extend(found)
+            if len(rows) >= limit:
+                return rows[:limit]
+    return rows
@@ -9,4 +9,4 @@ from app.models.bot_studio import BotAgent, BotTask, BotCrew, BotCrewTaskLink, B
 from app.models.bot_run import BotRun, BotRunEvent # noqa
 from app.models.ai import AiProvider, AiModel, AiUsageLog # noqa
 from app.models.kb import KnowledgeBase, KBFile # noqa
-from app.models.data_hub import RawChatwootEvent, RawChatwootConversation, RawChatwootMessage, RawChatwootReportingEvent # noqa
+from app.models.data_hub import RawChatwootEvent, RawChatwootConversation, RawChatwootMessage, RawChatwootReportingEvent, RawChatwootPayload, RawChatwootHeaderSet, DataHubSyncState, DataHubBackfillJob, DataHubBackfillShard, DataHubReconcileBucket, DataHubRun # noqa
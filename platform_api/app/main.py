@@ -1,11 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from contextlib import asynccontextmanager
+import asyncio
 import logging
+import time
 from app.core.config import settings
 from app.core.logging import setup_logging
-from app.api.v1.endpoints import auth, webhooks, admin, kb, test_lab, ai, bi
-from app.db.session import engine
+from app.api.v1.endpoints import auth, webhooks, admin, kb, test_lab, ai, bi, archive
+from app.db.archive import run_archive_loop
+from app.db.session import engine, AsyncSessionLocal
 from app.db.base import Base
+from shared.utils.tracing import init_tracing
+from shared.utils.metrics import HTTP_REQUEST_DURATION, CONTENT_TYPE_LATEST, render_latest
 
 # Setup Logging
 setup_logging()
@@ -15,15 +20,26 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # Startup
     logger.info(f"Starting {settings.APP_NAME}...")
+    init_tracing("platform_api")
     
     # Initialize DB (Create tables for DEV mode - in prod use migrations)
     # This will now create tables for User, TestRun, KBDocument etc.
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+    # Moves old bot runs to Parquet; an advisory lock keeps concurrent API processes from overlapping
+    archiver = None
+    if settings.ARCHIVE_INTERVAL_SECONDS > 0:
+        archiver = asyncio.create_task(run_archive_loop(
+            AsyncSessionLocal, settings.ARCHIVE_DIR, settings.ARCHIVE_AFTER_DAYS,
+            settings.ARCHIVE_BATCH_RUNS, settings.ARCHIVE_INTERVAL_SECONDS,
+        ))
         
     yield
     # Shutdown
     logger.info("Shutting down...")
+    if archiver:
+        archiver.cancel()
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -31,10 +47,31 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route template (e.g. /api/v1/kb/{kb_id}) keeps label cardinality bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.labels(
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=str(status)
+        ).observe(time.perf_counter() - started)
+
 @app.get("/health")
 def health_check():
     return {"status": "ok", "env": settings.APP_ENV}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
+
 # Register Routers
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
 app.include_router(webhooks.router, prefix=f"{settings.API_V1_STR}/webhooks", tags=["webhooks"])
@@ -43,6 +80,7 @@ app.include_router(kb.router, prefix=f"{settings.API_V1_STR}/kb", tags=["kb"])
 app.include_router(test_lab.router, prefix=f"{settings.API_V1_STR}/testlab", tags=["test_lab"])
 app.include_router(ai.router, prefix=f"{settings.API_V1_STR}/ai", tags=["ai"])
 app.include_router(bi.router, prefix=f"{settings.API_V1_STR}/bi", tags=["bi"])
+app.include_router(archive.router, prefix=f"{settings.API_V1_STR}/archive", tags=["archive"])
 # P2: Bot Studio Routers
 from app.api.v1.endpoints import bot_studio
 app.include_router(bot_studio.router, prefix=f"{settings.API_V1_STR}/botstudio", tags=["bot_studio"])
@@ -1,14 +1,20 @@
 from datetime import datetime
-import uuid
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
+from shared.utils.ids import uuid7
+
+
+def _new_id() -> str:
+    return str(uuid7())
+
 
 class BotRun(Base):
     __tablename__ = "bot_runs"
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4())) # UUID string
+    # Native uuid, handled as str in Python; UUIDv7 so new runs append to the primary key index
+    id = Column(UUID(as_uuid=False), primary_key=True, default=_new_id)
     crew_version_id = Column(ForeignKey("bot_crew_versions.id"), nullable=True) # Nullable for ad-hoc/test runs
     source = Column(String, default="manual") # chatwoot, manual
     conversation_id = Column(String, nullable=True) # Chatwoot conversation ID or TestLab run_id
@@ -23,8 +29,10 @@ class BotRun(Base):
 
 class BotRunEvent(Base):
     __tablename__ = "bot_run_events"
+    # A run's events in order (Test Lab polling and streaming) read one contiguous index range
+    __table_args__ = (Index("ix_bot_run_events_run_id_timestamp", "run_id", "timestamp"),)
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUID(as_uuid=False), primary_key=True, default=_new_id)
     run_id = Column(ForeignKey("bot_runs.id"), nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
     event_type = Column(String, nullable=False) # task_start, task_end, error, final_answer
@@ -1,26 +1,56 @@
+import hashlib
+import json
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, Text, BigInteger
+from typing import Any
+from sqlalchemy import Column, String, Integer, Date, DateTime, Boolean, Text, BigInteger, Float, ForeignKey, Index, DDL, event, func
+from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
 from app.db.base_class import Base
 
+def content_hash(payload: Any) -> str:
+    """Stable hash of a payload (key order independent): key of raw_chatwoot_payloads and header sets."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def partitioned_by_month(column: str, brin_index: str):
+    """
+    Table args of a raw table range-partitioned by month on `column`, with a
+    BRIN index on it. Monthly partitions are managed by
+    data_hub_runner/partitions.py; the primary key must include `column`.
+    """
+    return (
+        Index(brin_index, column, postgresql_using="brin"),
+        {"postgresql_partition_by": f"RANGE ({column})"},
+    )
+
+
+def _create_default_partition(table):
+    # Rows are never rejected: months without a partition land here until it is created
+    event.listen(table, "after_create", DDL(f"CREATE TABLE IF NOT EXISTS {table.name}_default PARTITION OF {table.name} DEFAULT"))
+
+
 class RawChatwootEvent(Base):
     """
     Stores all incoming Chatwoot Webhook events in their raw format.
     Consolidates previous ChatwootWebhookEventRaw.
+    Partitioned by month of received_at.
     """
     __tablename__ = "raw_chatwoot_events"
+    __table_args__ = partitioned_by_month("received_at", "ix_raw_chatwoot_events_received_at_brin")
 
-    id = Column(Integer, primary_key=True, index=True)
-    received_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    received_at = Column(DateTime, primary_key=True, default=datetime.utcnow, nullable=False)
     
     event_name = Column(String, index=True, nullable=True)
     account_id = Column(Integer, nullable=True)
     inbox_id = Column(Integer, nullable=True)
-    conversation_id = Column(Integer, nullable=True)
+    conversation_id = Column(Integer, nullable=True, index=True)
     message_id = Column(Integer, nullable=True)
     
     payload_json = Column(JSONB, nullable=False)
-    headers_json = Column(JSONB, nullable=True)
+    header_set_hash = Column(String(32), nullable=True) # raw_chatwoot_header_sets, headers repeated by every delivery
+    request_headers_json = Column(JSONB, nullable=True) # Per-request headers only (signature, length, ids)
     
     is_valid = Column(Boolean, default=False)
     validation_error = Column(Text, nullable=True)
@@ -45,18 +75,24 @@ class RawChatwootConversation(Base):
     created_at_ts = Column(DateTime, nullable=True)
     updated_at_ts = Column(DateTime, nullable=True)
     
-    payload_json = Column(JSONB, nullable=True) # Full raw object
+    # Extracted at ingest, read by stg_conversations
+    last_activity_at = Column(DateTime, nullable=True)
+    unread_count = Column(Integer, nullable=True)
+
+    content_hash = Column(String(32), nullable=True) # Full payload in raw_chatwoot_payloads; skips no-op updates
+    synced_at = Column(DateTime, server_default=func.now(), nullable=False, index=True) # Last insert or real change, drives incremental marts
 
 
 class RawChatwootMessage(Base):
     """
-    Mirror of Chatwoot Messages.
+    Mirror of Chatwoot Messages. Partitioned by month of created_at_ts.
     """
     __tablename__ = "raw_chatwoot_messages"
+    __table_args__ = partitioned_by_month("created_at_ts", "ix_raw_chatwoot_messages_created_at_brin")
 
     message_id = Column(Integer, primary_key=True)
     
-    conversation_id = Column(Integer, nullable=False)
+    conversation_id = Column(Integer, nullable=False, index=True)
     account_id = Column(Integer, nullable=False)
     inbox_id = Column(Integer, nullable=False)
     
@@ -67,22 +103,27 @@ class RawChatwootMessage(Base):
     sender_type = Column(String, nullable=True) # Contact, User, etc
     sender_id = Column(Integer, nullable=True)
     
-    created_at_ts = Column(DateTime, nullable=True)
+    has_attachment = Column(Boolean, nullable=True) # Extracted at ingest, read by stg_messages
+
+    created_at_ts = Column(DateTime, primary_key=True) # Chatwoot created_at, never changes
     updated_at_ts = Column(DateTime, nullable=True)
     
-    payload_json = Column(JSONB, nullable=True)
+    content_hash = Column(String(32), nullable=True) # Full payload in raw_chatwoot_payloads; skips no-op updates
+    synced_at = Column(DateTime, server_default=func.now(), nullable=False, index=True) # Last insert or real change, drives incremental marts
 
 
 class RawChatwootReportingEvent(Base):
     """
-    Mirror of Reporting Events from Chatwoot APIs.
+    Mirror of Reporting Events from Chatwoot APIs. Partitioned by month of
+    event_start_time (the event's created_at).
     """
     __tablename__ = "raw_chatwoot_reporting_events"
+    __table_args__ = partitioned_by_month("event_start_time", "ix_raw_chatwoot_reporting_events_start_brin")
 
     reporting_event_id = Column(BigInteger, primary_key=True) # Chatwoot reporting events IDs might be large
     
     account_id = Column(Integer, nullable=False)
-    conversation_id = Column(Integer, nullable=True)
+    conversation_id = Column(Integer, nullable=True, index=True)
     inbox_id = Column(Integer, nullable=True)
     user_id = Column(Integer, nullable=True)
     
@@ -90,10 +131,160 @@ class RawChatwootReportingEvent(Base):
     value_seconds = Column(Integer, nullable=True)
     value_business_hours_seconds = Column(Integer, nullable=True)
     
-    event_start_time = Column(DateTime, nullable=True)
+    event_start_time = Column(DateTime, primary_key=True)
     event_end_time = Column(DateTime, nullable=True)
     
     created_at_ts = Column(DateTime, nullable=True)
     updated_at_ts = Column(DateTime, nullable=True)
     
-    payload_json = Column(JSONB, nullable=True)
+    content_hash = Column(String(32), nullable=True) # Full payload in raw_chatwoot_payloads; skips no-op updates
+    synced_at = Column(DateTime, server_default=func.now(), nullable=False, index=True) # Last insert or real change, drives incremental marts
+
+
+for _model in (RawChatwootEvent, RawChatwootMessage, RawChatwootReportingEvent):
+    _create_default_partition(_model.__table__)
+
+
+def _compress_with_lz4(table, column):
+    # lz4 TOAST compression needs PostgreSQL 14+ built with lz4; pglz (the default) otherwise
+    event.listen(table, "after_create", DDL(
+        f"DO $$ BEGIN ALTER TABLE {table.name} ALTER COLUMN {column} SET COMPRESSION lz4; "
+        f"EXCEPTION WHEN others THEN NULL; END $$"
+    ))
+
+
+class RawChatwootPayload(Base):
+    """
+    Full Chatwoot payloads of the raw mirrors, content-addressed by
+    `content_hash`. Identical versions are stored once. Rows are only
+    written when a mirror row is inserted or changed, and never updated.
+    Older versions stay as history.
+    """
+    __tablename__ = "raw_chatwoot_payloads"
+
+    content_hash = Column(String(32), primary_key=True)
+    payload_json = Column(JSONB, nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+
+class RawChatwootHeaderSet(Base):
+    """
+    Distinct webhook header sets, without the per-request headers. A
+    Chatwoot instance sends the same few for every delivery.
+    """
+    __tablename__ = "raw_chatwoot_header_sets"
+
+    headers_hash = Column(String(32), primary_key=True)
+    headers_json = Column(JSONB, nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+
+_compress_with_lz4(RawChatwootPayload.__table__, "payload_json")
+
+
+class DataHubSyncState(Base):
+    """
+    Per-account sync watermarks of the data hub runner, one row per synced
+    resource (e.g. 'conversations'). The watermark is the newest source
+    timestamp fully synced; `position` is used by id-ordered sources.
+    """
+    __tablename__ = "data_hub_sync_state"
+
+    account_id = Column(Integer, primary_key=True)
+    resource = Column(String, primary_key=True)
+
+    watermark = Column(DateTime, nullable=True)
+    position = Column(BigInteger, nullable=True) # Id cursor, e.g. last raw_chatwoot_events.id applied
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DataHubBackfillJob(Base):
+    """
+    On-demand (or initial) backfill of conversations active in [since, until],
+    optionally for one inbox. Work is split in shards that checkpoint their
+    progress, so an interrupted job resumes where it stopped.
+    """
+    __tablename__ = "data_hub_backfill_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, nullable=False)
+    since = Column(DateTime, nullable=True) # None = from the beginning
+    until = Column(DateTime, nullable=True) # None = up to now
+    inbox_id = Column(Integer, nullable=True)
+    parallel = Column(Integer, nullable=False, default=1)
+    trigger = Column(String, nullable=False, default="cli") # cli, initial (first sync of the periodic worker)
+    status = Column(String, nullable=False, default="pending") # pending, running, done, failed
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True)
+
+    shards = relationship("DataHubBackfillShard", back_populates="job", cascade="all, delete-orphan", order_by="DataHubBackfillShard.id")
+
+
+class DataHubBackfillShard(Base):
+    """
+    One unit of a backfill job with its checkpoint. Conversation shards own
+    every `stride`-th page of the created_at ordered listing starting at
+    `first_page`; the reporting events shard walks the account endpoint.
+    `next_page` is only advanced after the rows of a page are committed.
+    """
+    __tablename__ = "data_hub_backfill_shards"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(ForeignKey("data_hub_backfill_jobs.id"), nullable=False, index=True)
+    kind = Column(String, nullable=False) # conversations, reporting_events
+    first_page = Column(Integer, nullable=False, default=1)
+    stride = Column(Integer, nullable=False, default=1)
+    next_page = Column(Integer, nullable=False, default=1)
+    status = Column(String, nullable=False, default="pending") # pending, running, done, failed
+    items_done = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True)
+
+    job = relationship("DataHubBackfillJob", back_populates="shards")
+
+
+class DataHubRun(Base):
+    """
+    History of data hub runs, one row per unit of work (e.g. the refresh of
+    one mart): duration, outcome and row deltas.
+    """
+    __tablename__ = "data_hub_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False) # mart_refresh, backlog_snapshot
+    name = Column(String, nullable=False, index=True) # e.g. the mart
+    status = Column(String, nullable=False) # done, skipped, failed
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    duration_seconds = Column(Float, nullable=True)
+    keys_recomputed = Column(Integer, nullable=True) # Days / conversations recomputed; NULL for a full rebuild
+    rows_deleted = Column(Integer, nullable=False, default=0)
+    rows_inserted = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+
+
+class DataHubReconcileBucket(Base):
+    """
+    Last reconciliation verdict of one (day, inbox) bucket of messages:
+    local counts and order-independent checksum next to Chatwoot's counts.
+    Status: match, resynced (differed, fixed by a re-sync), mismatch (still
+    differs after a re-sync that changed rows), persistent (a re-sync changed
+    nothing; skipped until either side changes).
+    """
+    __tablename__ = "data_hub_reconcile_buckets"
+
+    account_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    inbox_id = Column(Integer, primary_key=True)
+
+    status = Column(String, nullable=False)
+    local_incoming = Column(Integer, nullable=False, default=0)
+    local_outgoing = Column(Integer, nullable=False, default=0)
+    checksum = Column(BigInteger, nullable=True) # sum(hashtext(message_id:content_hash)) of the bucket
+    remote_incoming = Column(Integer, nullable=False, default=0)
+    remote_outgoing = Column(Integer, nullable=False, default=0)
+    checked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,4 +1,5 @@
 from datetime import datetime
+from uuid import UUID
 from typing import List, Optional, Any
 from pydantic import BaseModel
 from pydantic.types import Json
@@ -19,7 +20,7 @@ class TestRunBase(BaseModel):
     status: str = "running"
 
 class TestRunCreate(TestRunBase):
-    id: str
+    id: UUID # bot_runs.id is a native uuid
     crew_version_id: Optional[int] = None # Optional override
 
 class TestRun(TestRunBase):
@@ -1,3 +1,4 @@
 from .client import ChatwootClient
+from .resilience import CircuitBreaker, CircuitOpenError
 
-__all__ = ["ChatwootClient"]
+__all__ = ["ChatwootClient", "CircuitBreaker", "CircuitOpenError"]
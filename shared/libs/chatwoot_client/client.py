@@ -1,14 +1,136 @@
+import asyncio
+import os
 import httpx
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, AsyncIterator, Awaitable, Callable, Tuple
+from shared.utils.tracing import span
+from .resilience import CircuitBreaker, CircuitOpenError, backoff_delay, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
+RETRYABLE_STATUS = {500, 502, 503, 504}
+# Messages per page of GET .../messages; a shorter page is the beginning of the thread
+MESSAGES_PAGE_SIZE = 20
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)) or default)
+
+
 class ChatwootClient:
-    def __init__(self, base_url: str, api_access_token: str, account_id: int):
+    """
+    Chatwoot API client over one long-lived, pooled httpx.AsyncClient.
+
+    Keep one instance per process (or per job) and close it with `aclose()`
+    or `async with`. Requests are retried with jittered exponential backoff
+    on connection errors and 5xx (GETs only, a failed POST may have been
+    applied), 429 waits for Retry-After, and a circuit breaker fails fast
+    after repeated failures. Defaults come from CHATWOOT_HTTP_* env vars.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_access_token: str,
+        account_id: int,
+        timeout: float = None,
+        max_connections: int = None,
+        max_keepalive_connections: int = None,
+        http2: bool = None,
+        max_retries: int = None,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
         self.base_url = base_url.rstrip('/')
         self.api_access_token = api_access_token
         self.account_id = account_id
+        self.timeout = timeout if timeout is not None else float(os.getenv("CHATWOOT_HTTP_TIMEOUT", "30"))
+        self.limits = httpx.Limits(
+            max_connections=max_connections or _env_int("CHATWOOT_HTTP_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=max_keepalive_connections or _env_int("CHATWOOT_HTTP_MAX_KEEPALIVE", 10),
+        )
+        self.http2 = http2 if http2 is not None else os.getenv("CHATWOOT_HTTP2", "").lower() in ("1", "true", "yes")
+        self.max_retries = max_retries if max_retries is not None else _env_int("CHATWOOT_HTTP_MAX_RETRIES", 3)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=_env_int("CHATWOOT_BREAKER_THRESHOLD", 5),
+            reset_timeout=_env_int("CHATWOOT_BREAKER_RESET_SECONDS", 30),
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    # --- Connection management ---
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning("CHATWOOT_HTTP2 set but the 'h2' package is not installed, using HTTP/1.1")
+                    http2 = False
+            self._client = httpx.AsyncClient(
+                headers={"api_access_token": self.api_access_token},
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=http2,
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def _request(self, method: str, url: str, idempotent: bool = True, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                response = await self._http().request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                # Connect errors never reached Chatwoot, anything else only retried when idempotent
+                retryable = idempotent or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                self.breaker.record_failure()
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                logger.warning(f"Chatwoot {method} {url} failed ({e!r}), retry {attempt + 1} in {delay:.1f}s")
+            except BaseException:
+                # Anything else (decoding, redirects, cancellation) must not leave a half-open trial in flight
+                self.breaker.release()
+                raise
+            else:
+                if response.status_code == 429:
+                    # Throttled, not unhealthy: does not count towards the breaker
+                    self.breaker.release()
+                    if attempt >= self.max_retries:
+                        response.raise_for_status()
+                    delay = parse_retry_after(response.headers.get("Retry-After"))
+                    delay = min(delay if delay is not None else backoff_delay(attempt, self.backoff_base, self.backoff_max), self.backoff_max)
+                    logger.warning(f"Chatwoot rate limited {method} {url}, retry {attempt + 1} in {delay:.1f}s")
+                elif response.status_code in RETRYABLE_STATUS:
+                    self.breaker.record_failure()
+                    if not idempotent or attempt >= self.max_retries:
+                        response.raise_for_status()
+                    delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                    logger.warning(f"Chatwoot {method} {url} returned {response.status_code}, retry {attempt + 1} in {delay:.1f}s")
+                else:
+                    self.breaker.record_success()
+                    response.raise_for_status()
+                    return response
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    # --- Endpoints ---
 
     async def create_message(
         self, 
@@ -24,11 +146,6 @@ class ChatwootClient:
         """
         url = f"{self.base_url}/api/v1/accounts/{self.account_id}/conversations/{conversation_id}/messages"
         
-        headers = {
-            "api_access_token": self.api_access_token,
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "content": content,
             "message_type": message_type,
@@ -37,9 +154,8 @@ class ChatwootClient:
         }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, headers=headers)
-                response.raise_for_status()
+            with span("chatwoot.create_message", category="reply", attributes={"chatwoot.conversation_id": conversation_id}):
+                response = await self._request("POST", url, idempotent=False, json=payload)
                 return response.json()
         except httpx.HTTPStatusError as e:
             logger.error(f"Chatwoot API Error ({e.response.status_code}): {e.response.text}")
@@ -47,27 +163,30 @@ class ChatwootClient:
         except Exception as e:
             logger.error(f"Failed to send message to Chatwoot: {str(e)}")
             raise
+
     async def _get_request(self, url: str, params: Dict[str, Any] = None) -> Any:
-        headers = {"api_access_token": self.api_access_token}
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(url, headers=headers, params=params)
-            resp.raise_for_status()
-            return resp.json()
+        response = await self._request("GET", url, params=params)
+        return response.json()
 
-    async def list_conversations(self, page: int = 1, status: str = "all", inbox_id: int = None) -> Dict[str, Any]:
+    async def list_conversations(self, page: int = 1, status: str = "all", inbox_id: int = None, sort_by: str = None) -> Dict[str, Any]:
+        # sort_by='latest' orders by last_activity_at, newest first
         url = f"{self.base_url}/api/v1/accounts/{self.account_id}/conversations"
         params = {"page": page, "status": status}
         if inbox_id:
             params["inbox_id"] = inbox_id
+        if sort_by:
+            params["sort_by"] = sort_by
         return await self._get_request(url, params)
 
     async def get_conversation_details(self, conversation_id: int) -> Dict[str, Any]:
         url = f"{self.base_url}/api/v1/accounts/{self.account_id}/conversations/{conversation_id}"
         return await self._get_request(url)
 
-    async def get_messages(self, conversation_id: int) -> Dict[str, Any]:
+    async def get_messages(self, conversation_id: int, before: int = None) -> Dict[str, Any]:
+        """One page of messages: the latest ones, or the ones preceding message id `before` (ascending)."""
         url = f"{self.base_url}/api/v1/accounts/{self.account_id}/conversations/{conversation_id}/messages"
-        return await self._get_request(url)
+        params = {"before": before} if before else None
+        return await self._get_request(url, params)
     
     async def get_conversation_reporting_events(self, conversation_id: int) -> Any:
         # Note: Reporting events endpoint might differ based on version, assuming standard/documented path
@@ -88,3 +207,110 @@ class ChatwootClient:
         if until: params["until"] = until
         if type: params["type"] = type
         return await self._get_request(url, params)
+
+    async def list_inboxes(self) -> List[Dict[str, Any]]:
+        url = f"{self.base_url}/api/v1/accounts/{self.account_id}/inboxes"
+        data = await self._get_request(url)
+        return data.get('payload', []) if isinstance(data, dict) else data
+
+    async def get_report_timeseries(
+        self,
+        metric: str,
+        since: int,
+        until: int,
+        type: str = "account",
+        id: int = None,
+        group_by: str = "day",
+        timezone_offset: float = 0,
+    ) -> List[Dict[str, Any]]:
+        """v2 reports: [{'value': ..., 'timestamp': bucket start}] of e.g. incoming_messages_count."""
+        url = f"{self.base_url}/api/v2/accounts/{self.account_id}/reports"
+        params = {
+            "metric": metric, "type": type, "since": since, "until": until,
+            "group_by": group_by, "timezone_offset": timezone_offset,
+        }
+        if id is not None:
+            params["id"] = id
+        return await self._get_request(url, params)
+
+    # --- Streaming pagination ---
+
+    async def iter_messages(self, conversation_id: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yields all messages of a conversation one page at a time, newest page
+        first, walking the `before` cursor until the beginning of the thread
+        (a page shorter than MESSAGES_PAGE_SIZE, or an empty one).
+        Only one page is held in memory.
+        """
+        before = None
+        while True:
+            data = await self.get_messages(conversation_id, before=before)
+            messages = data.get('payload', [])
+            if not messages:
+                return
+            yield messages
+            if len(messages) < MESSAGES_PAGE_SIZE:
+                return
+            oldest = min(m['id'] for m in messages)
+            if before is not None and oldest >= before:
+                # Server ignored the cursor, stop instead of looping forever
+                return
+            before = oldest
+
+    def iter_conversation_pages(
+        self, status: str = "all", inbox_id: int = None, sort_by: str = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yields conversation pages; the next page is fetched while the caller processes the current one."""
+        async def fetch(page):
+            return await self.list_conversations(page=page, status=status, inbox_id=inbox_id, sort_by=sort_by)
+
+        def extract(data, page):
+            data = data.get('data', {})
+            meta = data.get('meta', {})
+            return data.get('payload', []), meta.get('current_page', page) < meta.get('total_pages', page)
+
+        return _iter_pages(fetch, extract)
+
+    def iter_account_reporting_event_pages(
+        self, since: int = None, until: int = None, type: str = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yields pages of account reporting events, prefetching the next page."""
+        async def fetch(page):
+            return await self.get_account_reporting_events(page=page, since=since, until=until, type=type)
+
+        def extract(data, page):
+            if isinstance(data, list):
+                return data, bool(data)
+            meta = data.get('meta', {})
+            events = data.get('payload', [])
+            if 'total_pages' in meta:
+                return events, meta.get('current_page', page) < meta['total_pages']
+            return events, bool(events)
+
+        return _iter_pages(fetch, extract)
+
+
+async def _iter_pages(
+    fetch: Callable[[int], Awaitable[Any]],
+    extract: Callable[[Any, int], Tuple[List[Dict[str, Any]], bool]],
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Page-numbered iteration with one page of prefetch: page N+1 is requested
+    before page N is handed to the caller. `extract` returns (items, has_more).
+    """
+    page = 1
+    pending = asyncio.ensure_future(fetch(page))
+    try:
+        while pending is not None:
+            data = await pending
+            pending = None
+            items, has_more = extract(data, page)
+            if not items:
+                return
+            if has_more:
+                pending = asyncio.ensure_future(fetch(page + 1))
+            yield items
+            page += 1
+    finally:
+        if pending is not None:
+            pending.cancel()
@@ -0,0 +1,83 @@
+import random
+import time
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling Chatwoot while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. After `failure_threshold` failures in a row
+    the circuit opens and calls fail fast for `reset_timeout` seconds; then a
+    single trial call is let through (half-open) and its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            raise CircuitOpenError("Chatwoot circuit breaker is open")
+        if state == "half_open":
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release(self):
+        """Ends a call that says nothing about Chatwoot's health (e.g. 429)."""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Chatwoot circuit opened after {self.failures} consecutive failures")
+            self.opened_at = self.clock()
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full jitter exponential backoff: uniform(0, min(cap, base * 2^attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as delta-seconds or HTTP date, in seconds from now."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
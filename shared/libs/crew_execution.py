@@ -2,10 +2,14 @@
 import logging
 import json
 import os
+import time
 import asyncio
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 from langchain.callbacks.base import BaseCallbackHandler
+from shared.libs.openai_client import get_openai_base_url
+from shared.utils.tracing import record_span
+from shared.utils.metrics import LLM_TOKENS
 
 # Setup Shared Logging for Executions
 LOG_DIR = Path("/app/data/logs") # Standardized path for container
@@ -212,6 +216,40 @@ class CrewCallbackHandler(BaseCallbackHandler):
             self.version_logger.info(f"   ... (truncado)")
         self.version_logger.info("")
 
+class LLMSpanHandler(BaseCallbackHandler):
+    """Records one span per LLM call in the current run trace and counts tokens."""
+
+    def __init__(self, agent_name: str = "Agente"):
+        super().__init__()
+        self.agent_name = agent_name
+        self._started: Dict[Any, int] = {}
+
+    def on_llm_start(self, serialized, prompts, run_id=None, **kwargs):
+        self._started[run_id] = time.time_ns()
+
+    def on_chat_model_start(self, serialized, messages, run_id=None, **kwargs):
+        self._started[run_id] = time.time_ns()
+
+    def _finish(self, run_id, attributes: Dict[str, Any]):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            record_span("llm.call", started, time.time_ns(), category="llm", attributes=attributes)
+
+    def on_llm_end(self, response, run_id=None, **kwargs):
+        attributes = {"agent.name": self.agent_name}
+        llm_output = getattr(response, "llm_output", None) or {}
+        usage = llm_output.get("token_usage") or {}
+        model = llm_output.get("model_name") or "unknown"
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            if usage.get(key) is not None:
+                attributes[f"llm.{key}"] = usage[key]
+        LLM_TOKENS.labels(model=model, kind="prompt").inc(usage.get("prompt_tokens") or 0)
+        LLM_TOKENS.labels(model=model, kind="completion").inc(usage.get("completion_tokens") or 0)
+        self._finish(run_id, attributes)
+
+    def on_llm_error(self, error, run_id=None, **kwargs):
+        self._finish(run_id, {"agent.name": self.agent_name, "error": str(error)[:200]})
+
 async def execute_crew_from_snapshot(snapshot: dict, inputs: dict, version_tag: Optional[str] = None) -> Dict[str, Any]:
     """
     Executes a crew based on the version snapshot using the installed crewai package.
@@ -281,10 +319,15 @@ async def execute_crew_from_snapshot(snapshot: dict, inputs: dict, version_tag:
             if not model_name: 
                  model_name = 'gpt-4o-mini'
 
+            agent_callbacks = [LLMSpanHandler(agent_name=agent_data['name'])]
+            if this_agent_handler:
+                agent_callbacks.append(this_agent_handler)
+
             agent_llm = ChatOpenAI(
                 model=model_name,
+                base_url=get_openai_base_url(),
                 temperature=0.7,
-                callbacks=[this_agent_handler] if this_agent_handler else [],
+                callbacks=agent_callbacks,
                 verbose=True
             )
             
@@ -406,10 +449,15 @@ async def execute_crew_from_snapshot(snapshot: dict, inputs: dict, version_tag:
                 manager_handler = CrewCallbackHandler(version_logger, agent_name="Gerente da Equipe")
 
             # Create ChatOpenAI instance with callback
+            manager_callbacks = [LLMSpanHandler(agent_name="Gerente da Equipe")]
+            if manager_handler:
+                manager_callbacks.append(manager_handler)
+
             manager_llm_instance = ChatOpenAI(
                 model=manager_llm_name, 
+                base_url=get_openai_base_url(),
                 temperature=0.7,
-                callbacks=[manager_handler] if manager_handler else [],
+                callbacks=manager_callbacks,
                 verbose=True
             )
             
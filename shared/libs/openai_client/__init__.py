@@ -1 +1 @@
-from .client import OpenAIClient
+from .client import OpenAIClient, get_openai_base_url
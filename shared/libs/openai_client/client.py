@@ -5,13 +5,19 @@ from typing import Optional, Dict, Any
 
 logger = logging.getLogger("OpenAIClient")
 
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+def get_openai_base_url() -> str:
+    """OPENAI_BASE_URL allows pointing every client at a proxy or the local fake server."""
+    return (os.getenv("OPENAI_BASE_URL") or DEFAULT_OPENAI_BASE_URL).rstrip('/')
+
 class OpenAIClient:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, base_url: str = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             logger.warning("OPENAI_API_KEY not set for OpenAIClient")
         
-        self.base_url = "https://api.openai.com/v1"
+        self.base_url = base_url.rstrip('/') if base_url else get_openai_base_url()
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "OpenAI-Beta": "assistants=v2" # Required for Vector Stores
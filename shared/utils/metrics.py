@@ -0,0 +1,162 @@
+import os
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# prometheus_client is optional: without it every metric is a no-op.
+try:
+    from prometheus_client import Counter, Gauge, Histogram, generate_latest, start_http_server, CONTENT_TYPE_LATEST
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, *args, **kwargs):
+        pass
+
+    def dec(self, *args, **kwargs):
+        pass
+
+    def set(self, *args, **kwargs):
+        pass
+
+    def observe(self, *args, **kwargs):
+        pass
+
+
+def _counter(name: str, documentation: str, labelnames=()):
+    return Counter(name, documentation, labelnames) if PROMETHEUS_AVAILABLE else _NoopMetric()
+
+
+def _gauge(name: str, documentation: str, labelnames=()):
+    return Gauge(name, documentation, labelnames) if PROMETHEUS_AVAILABLE else _NoopMetric()
+
+
+def _histogram(name: str, documentation: str, labelnames=(), buckets=None):
+    if not PROMETHEUS_AVAILABLE:
+        return _NoopMetric()
+    return Histogram(name, documentation, labelnames, buckets=buckets or Histogram.DEFAULT_BUCKETS)
+
+
+# LLM-bound work takes seconds to minutes, HTTP requests milliseconds
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RUN_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+# --- platform_api ---
+HTTP_REQUEST_DURATION = _histogram(
+    "ecocrm_http_request_duration_seconds",
+    "HTTP request latency per route", ("method", "route", "status"), buckets=HTTP_BUCKETS
+)
+
+# --- bot_runner ---
+STREAM_LENGTH = _gauge(
+    "ecocrm_stream_length",
+    "Entries in the Redis stream (XLEN)", ("stream",)
+)
+STREAM_CONSUMER_LAG = _gauge(
+    "ecocrm_stream_consumer_lag",
+    "Entries not yet delivered to the consumer group (XINFO GROUPS lag)", ("stream", "group")
+)
+STREAM_PENDING = _gauge(
+    "ecocrm_stream_pending_messages",
+    "Delivered but not acknowledged entries (XINFO GROUPS pending)", ("stream", "group")
+)
+CREW_RUN_DURATION = _histogram(
+    "ecocrm_crew_run_duration_seconds",
+    "Crew execution duration per crew version and outcome", ("version", "outcome"), buckets=RUN_BUCKETS
+)
+CREW_RUNS = _counter(
+    "ecocrm_crew_runs",
+    "Crew runs per crew version and outcome", ("version", "outcome")
+)
+LLM_TOKENS = _counter(
+    "ecocrm_llm_tokens",
+    "LLM tokens consumed", ("model", "kind")
+)
+ROUTER_DESIRED_REPLICAS = _gauge(
+    "ecocrm_bot_runner_desired_replicas",
+    "Runner replicas needed for the current stream backlog (router signal)"
+)
+ROUTER_CLAIMED = _counter(
+    "ecocrm_router_claimed_messages",
+    "Pending entries moved from stalled consumers by the router"
+)
+ROUTER_DEAD_LETTERED = _counter(
+    "ecocrm_router_dead_lettered_messages",
+    "Entries moved to the dead-letter stream after too many deliveries"
+)
+
+# --- data_hub_runner ---
+BACKFILL_ROWS = _counter(
+    "ecocrm_backfill_rows",
+    "Rows upserted by the data hub backfill", ("table",)
+)
+BACKFILL_ROWS_UNCHANGED = _counter(
+    "ecocrm_backfill_rows_unchanged",
+    "Upserted rows skipped because their content hash did not change", ("table",)
+)
+BACKFILL_ROWS_PER_SECOND = _gauge(
+    "ecocrm_backfill_rows_per_second",
+    "Throughput of the last backfill cycle"
+)
+BACKFILL_DURATION = _gauge(
+    "ecocrm_backfill_duration_seconds",
+    "Duration of the last backfill cycle"
+)
+REALTIME_EVENTS_APPLIED = _counter(
+    "ecocrm_realtime_raw_events_applied",
+    "Raw webhook events applied to the raw Chatwoot mirrors"
+)
+REALTIME_LAG_SECONDS = _gauge(
+    "ecocrm_realtime_raw_lag_seconds",
+    "Age of the last raw webhook event applied to the raw mirrors"
+)
+RECONCILE_BUCKETS = _gauge(
+    "ecocrm_reconcile_buckets",
+    "(day, inbox) message buckets of the last reconciliation by verdict", ("status",)
+)
+MART_REFRESH_DURATION = _histogram(
+    "ecocrm_mart_refresh_duration_seconds",
+    "Duration of each mart refresh", ("mart",), buckets=HTTP_BUCKETS + (30, 60, 120, 300)
+)
+
+
+def start_metrics_server(port: Optional[int] = None) -> bool:
+    """
+    Starts the /metrics HTTP listener for worker processes when METRICS_PORT
+    (or `port`) is set. Returns True if the listener was started.
+    """
+    port = port or int(os.getenv("METRICS_PORT", "0") or 0)
+    if not port:
+        return False
+    if not PROMETHEUS_AVAILABLE:
+        logger.warning("METRICS_PORT set but prometheus_client is not installed")
+        return False
+    start_http_server(port)
+    logger.info(f"Metrics available on :{port}/metrics")
+    return True
+
+
+def observe_crew_run(version: str, outcome: str, duration_seconds: float):
+    CREW_RUNS.labels(version=version, outcome=outcome).inc()
+    CREW_RUN_DURATION.labels(version=version, outcome=outcome).observe(duration_seconds)
+
+
+def observe_stream_group(stream: str, group: str, info: dict):
+    """`info` is RedisStreamUtils.get_stream_stats output."""
+    STREAM_LENGTH.labels(stream=stream).set(info.get("length") or 0)
+    STREAM_CONSUMER_LAG.labels(stream=stream, group=group).set(info.get("lag") or 0)
+    STREAM_PENDING.labels(stream=stream, group=group).set(info.get("pending") or 0)
+
+
+def render_latest() -> bytes:
+    """Exposition format for the API /metrics endpoint."""
+    if not PROMETHEUS_AVAILABLE:
+        return b""
+    return generate_latest()
@@ -1,4 +1,5 @@
 import os
+import json
 import logging
 import asyncio
 from typing import Dict, Any, Optional
@@ -55,17 +56,33 @@ class RedisStreamUtils:
             logger.error(f"Failed to publish event to {stream_name}: {e}")
             raise
 
-    async def consume_messages(self, stream_name: str, group_name: str, consumer_name: str, batch_size: int = 10, block_ms: int = 5000):
+    async def publish_message(self, stream_name: str, data: Dict[str, Any]):
+        """
+        Publishes a dict as a stream entry. Stream fields must be flat strings,
+        so nested values are JSON encoded and None becomes an empty string.
+        """
+        fields = {}
+        for key, value in data.items():
+            if isinstance(value, (dict, list)):
+                fields[key] = json.dumps(value)
+            elif value is None:
+                fields[key] = ""
+            else:
+                fields[key] = value
+        return await self.publish_event(stream_name, fields)
+
+    async def consume_messages(self, stream_name: str, group_name: str, consumer_name: str, batch_size: int = 10, block_ms: int = 5000, start_id: str = ">"):
         """
         Consumes messages from a stream using a consumer group.
         Yields (message_id, fields) tuples.
+        start_id '>' reads new messages; '0' re-reads this consumer's pending
+        entries (e.g. after a restart or entries claimed by the router).
         """
         if not self.client:
             await self.connect()
 
         try:
-            # XREADGROUP via '>' to get new messages
-            streams = {stream_name: ">"}
+            streams = {stream_name: start_id}
             messages = await self.client.xreadgroup(group_name, consumer_name, streams, count=batch_size, block=block_ms)
             
             if not messages:
@@ -80,6 +97,73 @@ class RedisStreamUtils:
             # Depending on resilience strategy, might want to re-raise or just log
             raise
 
+    async def get_stream_stats(self, stream_name: str, group_name: str) -> Dict[str, Any]:
+        """
+        Stream length plus the consumer group's lag (entries never delivered,
+        Redis >= 7) and pending count (delivered, not acked) from XINFO GROUPS.
+        """
+        if not self.client:
+            await self.connect()
+
+        stats = {"length": await self.client.xlen(stream_name), "lag": None, "pending": 0, "consumers": 0}
+        for group in await self.client.xinfo_groups(stream_name):
+            if group.get("name") == group_name:
+                stats.update({
+                    "lag": group.get("lag"),
+                    "pending": group.get("pending", 0),
+                    "consumers": group.get("consumers", 0),
+                    "last_delivered_id": group.get("last-delivered-id"),
+                })
+        return stats
+
+    async def get_consumers(self, stream_name: str, group_name: str):
+        """XINFO CONSUMERS: name, pending and idle (ms since last interaction) per consumer."""
+        if not self.client:
+            await self.connect()
+        return await self.client.xinfo_consumers(stream_name, group_name)
+
+    async def get_pending_entries(self, stream_name: str, group_name: str, min_idle_ms: int = 0, count: int = 100, consumer_name: str = None):
+        """
+        XPENDING extended form: entries idle for at least `min_idle_ms`
+        (of `consumer_name` only, if given).
+        Returns dicts with message_id, consumer, time_since_delivered, times_delivered.
+        """
+        if not self.client:
+            await self.connect()
+        return await self.client.xpending_range(
+            stream_name, group_name, min="-", max="+", count=count, idle=min_idle_ms or None, consumername=consumer_name
+        )
+
+    async def dead_letter(self, stream_name: str, group_name: str, dead_letter_stream: str, entry: Dict[str, Any]):
+        """
+        Copies a pending entry (as returned by get_pending_entries) to
+        `dead_letter_stream`, with its origin and delivery count, and acks it.
+        """
+        if not self.client:
+            await self.connect()
+        message_id = entry["message_id"]
+        rows = await self.client.xrange(stream_name, min=message_id, max=message_id)
+        fields = rows[0][1] if rows else {}
+        fields = {
+            **fields,
+            "dead_letter_source_id": message_id,
+            "dead_letter_consumer": entry.get("consumer", ""),
+            "dead_letter_deliveries": entry.get("times_delivered", 0),
+        }
+        await self.publish_event(dead_letter_stream, fields)
+        await self.ack_message(stream_name, group_name, message_id)
+
+    async def claim_messages(self, stream_name: str, group_name: str, consumer_name: str, min_idle_ms: int, message_ids):
+        """
+        XCLAIM: moves pending entries to `consumer_name`. Only entries still idle
+        for `min_idle_ms` are moved, so an entry its owner just acked or touched is left alone.
+        """
+        if not self.client:
+            await self.connect()
+        if not message_ids:
+            return []
+        return await self.client.xclaim(stream_name, group_name, consumer_name, min_idle_ms, list(message_ids), justid=True)
+
     async def ack_message(self, stream_name: str, group_name: str, message_id: str):
         """
         Acknowledges a processed message.
@@ -0,0 +1,81 @@
+"""
+Mergeable quantile sketches (DDSketch: logarithmic buckets, relative error).
+
+A value x > 0 is counted in bucket i = ceil(ln(x) / ln(GAMMA)). Every value
+of bucket i lies within RELATIVE_ACCURACY of its representative
+2 * GAMMA**i / (GAMMA + 1), so any quantile read from the buckets is within
+that relative error of a true sample value. Values <= 0 are counted apart
+(zero_count). Two sketches merge by adding their counts bucket by bucket:
+the percentiles of any set of days come from their stored sketches, without
+reading the underlying rows.
+
+mart_time_metric_sketches computes the same buckets in SQL (LN_GAMMA is
+inlined in data_hub_runner/analytics.py); changing RELATIVE_ACCURACY
+requires rebuilding that mart.
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+import numpy as np
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LN_GAMMA = math.log(GAMMA)
+
+
+def bucket_index(value: float) -> Optional[int]:
+    """Bucket of a value, None for the zero bucket."""
+    return math.ceil(math.log(value) / LN_GAMMA) if value > 0 else None
+
+
+@dataclass
+class Sketch:
+    count: int = 0
+    total: float = 0.0
+    zero_count: int = 0
+    # Sorted distinct bucket indexes and their counts
+    buckets: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    counts: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+    @classmethod
+    def from_values(cls, values: Iterable[float]) -> "Sketch":
+        values = np.asarray(list(values), dtype=np.float64)
+        positive = values[values > 0]
+        buckets, counts = np.unique(np.ceil(np.log(positive) / LN_GAMMA).astype(np.int64), return_counts=True)
+        return cls(len(values), float(values.sum()), len(values) - len(positive), buckets, counts)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value of rank q * (count - 1), None for an empty sketch."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        cumulative = np.cumsum(self.counts) + self.zero_count
+        i = min(int(np.searchsorted(cumulative, rank, side="right")), len(self.buckets) - 1)
+        return float(2 * GAMMA ** int(self.buckets[i]) / (GAMMA + 1))
+
+
+def merge_sketches(sketches: Iterable) -> Sketch:
+    """
+    Sum of sketches, given as objects with count, total, zero_count, buckets
+    and counts attributes (Sketch or mart rows; bucket lists need not be sorted).
+    """
+    count, total, zero_count = 0, 0.0, 0
+    buckets, counts = [], []
+    for s in sketches:
+        count += int(s.count)
+        total += float(s.total)
+        zero_count += int(s.zero_count)
+        buckets.append(np.asarray(s.buckets, dtype=np.int64))
+        counts.append(np.asarray(s.counts, dtype=np.int64))
+    if not buckets:
+        return Sketch()
+    merged, inverse = np.unique(np.concatenate(buckets), return_inverse=True)
+    merged_counts = np.bincount(inverse, weights=np.concatenate(counts), minlength=len(merged)).astype(np.int64)
+    return Sketch(count, total, zero_count, merged, merged_counts)
@@ -0,0 +1,150 @@
+import os
+import time
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# OpenTelemetry is optional: without it we still propagate a W3C traceparent
+# and keep per-run timings, we just don't export spans.
+try:
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+_tracer = None
+_propagator = TraceContextTextMapPropagator() if OTEL_AVAILABLE else None
+
+# Span categories summarized per run (see RunTrace.summary)
+CATEGORIES = ("queue_wait", "db", "crew", "llm", "reply")
+
+
+def init_tracing(service_name: str):
+    """
+    Configures OTLP export when OTEL_EXPORTER_OTLP_ENDPOINT is set
+    (e.g. http://otel-collector:4318). Safe to call more than once.
+    """
+    global _tracer
+    if not OTEL_AVAILABLE:
+        logger.info("opentelemetry not installed, tracing limited to run summaries")
+        return
+
+    endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    if endpoint and not getattr(init_tracing, "_configured", False):
+        try:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+            provider = TracerProvider(
+                resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", service_name)})
+            )
+            # The exporter reads OTEL_EXPORTER_OTLP_* itself (endpoint, headers, timeout)
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+            otel_trace.set_tracer_provider(provider)
+            init_tracing._configured = True
+            logger.info(f"Tracing enabled for {service_name}, exporting OTLP to {endpoint}")
+        except ImportError as e:
+            logger.warning(f"OTLP exporter not available, spans will not be exported: {e}")
+
+    _tracer = otel_trace.get_tracer("ecocrm")
+
+
+class RunTrace:
+    """Accumulates span durations (ms) per category for one bot run."""
+
+    def __init__(self, traceparent: Optional[str] = None):
+        self.traceparent = traceparent or new_traceparent()
+        self.trace_id = parse_trace_id(self.traceparent)
+        self.context = _propagator.extract({"traceparent": self.traceparent}) if OTEL_AVAILABLE else None
+        self.timings: Dict[str, float] = defaultdict(float)
+        self.counts: Dict[str, int] = defaultdict(int)
+
+    def record(self, category: str, duration_ms: float):
+        self.timings[category] += duration_ms
+        self.counts[category] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        data = {"trace_id": self.trace_id}
+        for category in CATEGORIES:
+            data[f"{category}_ms"] = round(self.timings.get(category, 0.0), 1)
+        data["llm_calls"] = self.counts.get("llm", 0)
+        return data
+
+
+_current_trace: ContextVar[Optional[RunTrace]] = ContextVar("current_run_trace", default=None)
+
+
+def start_run_trace(traceparent: Optional[str] = None) -> RunTrace:
+    """Makes a RunTrace current for this task (and threads started with asyncio.to_thread)."""
+    run_trace = RunTrace(traceparent)
+    _current_trace.set(run_trace)
+    return run_trace
+
+
+def current_run_trace() -> Optional[RunTrace]:
+    return _current_trace.get()
+
+
+def new_traceparent() -> str:
+    return f"00-{os.urandom(16).hex()}-{os.urandom(8).hex()}-01"
+
+
+def parse_trace_id(traceparent: str) -> Optional[str]:
+    parts = (traceparent or "").split("-")
+    return parts[1] if len(parts) == 4 and len(parts[1]) == 32 else None
+
+
+def current_traceparent() -> str:
+    """W3C traceparent of the active span, to be carried in the stream envelope."""
+    if OTEL_AVAILABLE:
+        carrier: Dict[str, str] = {}
+        _propagator.inject(carrier)
+        if carrier.get("traceparent"):
+            return carrier["traceparent"]
+    run_trace = current_run_trace()
+    return run_trace.traceparent if run_trace else new_traceparent()
+
+
+def _parent_context():
+    # Explicit parent only when there is no active span yet (first span of a run)
+    if OTEL_AVAILABLE and not otel_trace.get_current_span().get_span_context().is_valid:
+        run_trace = current_run_trace()
+        return run_trace.context if run_trace else None
+    return None
+
+
+@contextmanager
+def span(name: str, category: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None):
+    """
+    Times a block as a span. With OpenTelemetry configured it is exported
+    as a child of the current span; `category` also adds the duration to
+    the current RunTrace summary.
+    """
+    started = time.perf_counter()
+    try:
+        if _tracer is None:
+            yield None
+        else:
+            with _tracer.start_as_current_span(name, context=_parent_context(), attributes=attributes or {}) as s:
+                yield s
+    finally:
+        run_trace = current_run_trace()
+        if run_trace and category:
+            run_trace.record(category, (time.perf_counter() - started) * 1000)
+
+
+def record_span(name: str, start_ns: int, end_ns: int, category: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None):
+    """Records an already finished interval (epoch ns), e.g. queue wait or an LLM call seen via callbacks."""
+    if _tracer is not None:
+        s = _tracer.start_span(name, context=_parent_context(), attributes=attributes or {}, start_time=start_ns)
+        s.end(end_time=end_ns)
+    run_trace = current_run_trace()
+    if run_trace and category:
+        run_trace.record(category, max(end_ns - start_ns, 0) / 1e6)
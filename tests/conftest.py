@@ -0,0 +1,67 @@
+"""Shared fakes of the async SQLAlchemy session and its results."""
+
+
+class FakeResult:
+    """Rows of a statement, as tuples."""
+
+    def __init__(self, rows=(), rowcount=0):
+        self.rows = list(rows)
+        self.rowcount = rowcount
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+    def scalar_one_or_none(self):
+        return self.scalar()
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchone(self):
+        return self.first()
+
+    def all(self):
+        return self.rows
+
+    def scalars(self):
+        return FakeResult([row[0] for row in self.rows])
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class RecordingSession:
+    """
+    Records every executed (statement, params). `respond(stmt, params)` may
+    return a FakeResult (None answers an empty one) or raise.
+    """
+
+    def __init__(self, respond=None):
+        self.respond = respond
+        self.statements = []
+        self.added = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, params=None):
+        self.statements.append((stmt, params))
+        result = self.respond(stmt, params) if self.respond else None
+        return result if result is not None else FakeResult()
+
+    def sql(self):
+        return [str(stmt) for stmt, _ in self.statements]
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
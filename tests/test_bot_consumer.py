@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "platform_api"))
+
+from bot_runner import consumer  # noqa: E402
+from shared.utils.redis_utils import RedisStreamUtils  # noqa: E402
+from conftest import FakeResult, RecordingSession  # noqa: E402
+
+
+class FakeStreamClient:
+    """
+    Stands in for the redis client: one stream per name, one consumer group,
+    entries as Redis returns them (decode_responses=True).
+    """
+
+    def __init__(self):
+        self.streams = {}
+        self.delivered = set()
+        self.pending = {}  # message_id -> [consumer, times_delivered]
+
+    @property
+    def entries(self):
+        return self.streams.get("events:chatwoot", [])
+
+    async def xadd(self, stream, fields):
+        entries = self.streams.setdefault(stream, [])
+        message_id = f"{1_700_000_000_000 + len(entries)}-0"
+        entries.append((message_id, {key: str(value) for key, value in fields.items()}))
+        return message_id
+
+    async def xreadgroup(self, group, consumer, streams, count, block):
+        (stream, start_id), = streams.items()
+        if start_id == ">":
+            found = [e for e in self.streams.get(stream, []) if e[0] not in self.delivered][:count]
+            for message_id, _ in found:
+                self.delivered.add(message_id)
+                self.pending[message_id] = [consumer, 1]
+        else:
+            found = [e for e in self.streams.get(stream, []) if self.pending.get(e[0], [None])[0] == consumer][:count]
+            for message_id, _ in found:
+                self.pending[message_id][1] += 1
+        return [[stream, found]] if found else []
+
+    async def xpending_range(self, stream, group, min, max, count, idle=None, consumername=None):
+        return [
+            {"message_id": message_id, "consumer": owner, "time_since_delivered": 0, "times_delivered": times}
+            for message_id, (owner, times) in self.pending.items()
+            if consumername in (None, owner)
+        ][:count]
+
+    async def xrange(self, stream, min, max):
+        return [e for e in self.streams.get(stream, []) if e[0] == min]
+
+    async def xack(self, stream, group, message_id):
+        self.pending.pop(message_id, None)
+
+
+def test_published_envelope_runs_the_crew(monkeypatch):
+    version = SimpleNamespace(id=1, version_tag="v1", snapshot_json={"agents": [], "tasks": []})
+    session = RecordingSession(lambda stmt, params: FakeResult([(version,)]))
+    crew_inputs = []
+
+    async def execute_crew_from_snapshot(snapshot, inputs, version_tag=None):
+        crew_inputs.append(inputs)
+        return {"response": "Olá!", "agent_name": "Atendente"}
+
+    monkeypatch.setattr(consumer, "AsyncSessionLocal", lambda: session)
+    monkeypatch.setattr(consumer.settings, "CHATWOOT_API_TOKEN", "")
+    monkeypatch.setitem(sys.modules, "shared.libs.crew_execution", SimpleNamespace(execute_crew_from_snapshot=execute_crew_from_snapshot))
+
+    redis = RedisStreamUtils("redis://unused")
+    redis.client = FakeStreamClient()
+    envelope = {
+        "raw_event_id": 7,
+        "conversation_id": 42,
+        "sender": {"id": 3, "name": "Ana", "phone_number": None},
+        "content": "Oi",
+        "traceparent": None,
+    }
+
+    async def roundtrip():
+        await redis.publish_message("events:chatwoot", envelope)
+        message_id, fields = redis.client.entries[0]
+        return await consumer.process_message(message_id, fields, redis)
+
+    assert asyncio.run(roundtrip()) is True
+    assert crew_inputs == [{"content": "Oi"}]
+    assert session.commits == 2
+
+
+def test_entry_that_always_fails_is_dead_lettered(monkeypatch):
+    attempts = []
+
+    async def failing_process_message(message_id, payload, redis_utils):
+        attempts.append(message_id)
+        return False
+
+    monkeypatch.setattr(consumer, "process_message", failing_process_message)
+    redis = RedisStreamUtils("redis://unused")
+    redis.client = FakeStreamClient()
+
+    async def scenario():
+        await redis.publish_message(consumer.settings.REDIS_STREAM_NAME, {"raw_event_id": 7, "content": "Oi"})
+        await consumer.consume_batch(redis, ">")
+        for _ in range(consumer.settings.ROUTER_MAX_DELIVERIES + 2):
+            await consumer.consume_batch(redis, "0")
+
+    asyncio.run(scenario())
+
+    assert len(attempts) == consumer.settings.ROUTER_MAX_DELIVERIES
+    assert redis.client.pending == {}
+    (_, dead), = redis.client.streams[consumer.settings.ROUTER_DEAD_LETTER_STREAM]
+    assert dead["content"] == "Oi"
+    assert dead["dead_letter_deliveries"] == str(consumer.settings.ROUTER_MAX_DELIVERIES)
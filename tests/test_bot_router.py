@@ -0,0 +1,74 @@
+import asyncio
+
+from bot_runner import router
+from bot_runner.router import ReplicaSignal, compute_desired_replicas, pick_claim_target
+from shared.utils.redis_utils import RedisStreamUtils
+
+
+def test_desired_replicas_follow_backlog_within_bounds():
+    assert compute_desired_replicas(0, 5, 1, 10) == 1
+    assert compute_desired_replicas(11, 5, 1, 10) == 3
+    assert compute_desired_replicas(1000, 5, 1, 10) == 10
+
+
+def test_replica_signal_scales_down_after_window():
+    signal = ReplicaSignal(scale_down_window_seconds=60)
+    assert signal.update(8, now=0) == 8
+    assert signal.update(2, now=30) == 8   # still inside the window
+    assert signal.update(2, now=90) == 2
+    assert signal.update(12, now=91) == 12  # scale up is immediate
+
+
+def test_pick_claim_target_prefers_active_least_loaded():
+    consumers = [
+        {"name": "stuck", "pending": 4, "idle": 900_000},
+        {"name": "busy", "pending": 3, "idle": 1_000},
+        {"name": "free", "pending": 0, "idle": 2_000},
+    ]
+    assert pick_claim_target(consumers, owner="stuck", active_idle_ms=30_000) == "free"
+    assert pick_claim_target(consumers[:1], owner="stuck", active_idle_ms=30_000) is None
+
+
+class FakeRedis:
+    """Records calls made by the router through RedisStreamUtils."""
+
+    def __init__(self, pending):
+        self.pending = pending
+        self.claims = []
+        self.acked = []
+        self.published = []
+        self.client = self
+
+    async def get_pending_entries(self, *args, **kwargs):
+        return self.pending
+
+    async def claim_messages(self, stream, group, consumer, min_idle_ms, message_ids):
+        self.claims.append((consumer, list(message_ids)))
+        return list(message_ids)
+
+    async def xrange(self, stream, min, max):
+        return [(min, {"content": "oi"})]
+
+    async def publish_event(self, stream, fields):
+        self.published.append((stream, fields))
+
+    async def ack_message(self, stream, group, message_id):
+        self.acked.append(message_id)
+
+    dead_letter = RedisStreamUtils.dead_letter
+
+
+def test_rebalance_claims_stalled_and_dead_letters_poison():
+    fake = FakeRedis([
+        {"message_id": "1-0", "consumer": "stuck", "times_delivered": 1},
+        {"message_id": "2-0", "consumer": "stuck", "times_delivered": router.settings.ROUTER_MAX_DELIVERIES},
+    ])
+    consumers = [{"name": "stuck", "pending": 2, "idle": 900_000}, {"name": "free", "pending": 0, "idle": 10}]
+
+    claimed = asyncio.run(router.rebalance(fake, consumers))
+
+    assert claimed == 1
+    assert fake.claims == [("free", ["1-0"])]
+    assert fake.acked == ["2-0"]
+    assert fake.published[0][0] == router.settings.ROUTER_DEAD_LETTER_STREAM
+    assert fake.published[0][1]["dead_letter_source_id"] == "2-0"
@@ -0,0 +1,47 @@
+import os
+import sys
+from datetime import date, datetime
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "platform_api"))
+
+from app.db import archive  # noqa: E402
+from app.db.archive import batch_name, days_between, load_manifest, partition_dir, record_file  # noqa: E402
+
+
+def test_batch_name_is_deterministic():
+    assert batch_name(["b", "a"]) == batch_name(["a", "b"])
+    assert batch_name(["a"]) != batch_name(["a", "b"])
+
+
+def test_days_between_is_inclusive():
+    assert days_between(date(2024, 2, 28), date(2024, 3, 1)) == [date(2024, 2, 28), date(2024, 2, 29), date(2024, 3, 1)]
+
+
+def test_retried_batch_replaces_its_manifest_entry(tmp_path):
+    directory = partition_dir(tmp_path, archive.RUNS, date(2024, 5, 1))
+    record_file(directory, {"file": "part-a.parquet", "rows": 1})
+    record_file(directory, {"file": "part-b.parquet", "rows": 2})
+    record_file(directory, {"file": "part-a.parquet", "rows": 3})
+    assert load_manifest(directory)["files"] == [{"file": "part-b.parquet", "rows": 2}, {"file": "part-a.parquet", "rows": 3}]
+    assert directory.name == "date=2024-05-01"
+
+
+def test_written_day_reads_back_with_filters(tmp_path):
+    pytest.importorskip("pyarrow")
+    day = date(2024, 5, 1)
+    created = datetime(2024, 5, 1, 10, 0)
+    runs = [
+        {"id": run_id, "crew_version_id": 1, "source": "chatwoot", "conversation_id": "7", "status": "success",
+         "result_output": "ok", "created_at": created, "finished_at": created}
+        for run_id in ("r1", "r2")
+    ]
+    events = [{"id": "e1", "run_id": "r2", "timestamp": created, "event_type": "final_answer", "payload_json": '{"a": 1}'}]
+    archive.write_day(tmp_path, day, batch_name(["r1", "r2"]), runs, events)
+
+    found = archive.read_archive(tmp_path, archive.RUNS, day, day, {"id": "r2"})
+    assert [r["id"] for r in found] == ["r2"]
+    found = archive.read_archive(tmp_path, archive.EVENTS, date(2024, 4, 30), day, {"run_id": "r2"})
+    assert found[0]["payload_json"] == {"a": 1}
+    assert load_manifest(partition_dir(tmp_path, archive.RUNS, day))["files"][0]["rows"] == 2
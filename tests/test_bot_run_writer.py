@@ -0,0 +1,71 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "platform_api"))
+
+from bot_runner.run_writer import RunBatchWriter, RunRecorder  # noqa: E402
+from conftest import RecordingSession  # noqa: E402
+
+
+def _kind(stmt):
+    return str(stmt).split()[0]
+
+
+def test_run_lifecycle_is_two_transactions():
+    session = RecordingSession()
+    recorder = RunRecorder("run-1")
+
+    async def lifecycle():
+        recorder.event("run_start", {"input": "hi"})
+        await recorder.start(session, source="chatwoot")
+        recorder.event("run_success", {"output": "ok"})
+        recorder.event("latency_breakdown", {"total_ms": 5})
+        await recorder.finish(session, "success", "ok")
+
+    asyncio.run(lifecycle())
+
+    assert session.commits == 2
+    events = [p for stmt, p in session.statements if _kind(stmt) == "INSERT" and isinstance(p, list)]
+    assert [[e["event_type"] for e in batch] for batch in events] == [["run_start"], ["run_success", "latency_breakdown"]]
+    assert events[1][0]["timestamp"] <= events[1][1]["timestamp"]
+
+
+def test_batch_writer_commits_many_runs_per_transaction():
+    sessions = []
+
+    def session_factory():
+        sessions.append(RecordingSession())
+        return sessions[-1]
+
+    async def scenario():
+        writer = RunBatchWriter(session_factory, batch_size=2, flush_interval=60).start()
+        for i in range(3):
+            recorder = RunRecorder(f"run-{i}")
+            recorder.event("run_success", {})
+            await recorder.finish(None, "success", "ok", writer=writer)
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(scenario())
+
+    updates = [p for s in sessions for stmt, p in s.statements if _kind(stmt) == "UPDATE"]
+    assert [[u["b_id"] for u in batch] for batch in updates] == [["run-0", "run-1"], ["run-2"]]
+    assert sum(s.commits for s in sessions) == 2
+    assert writer.runs_written == 3
+
+
+def test_batch_writer_isolates_a_failing_run():
+    def bad_run(stmt, params):
+        if isinstance(params, list) and any(p.get("b_id") == "run-1" for p in params):
+            raise RuntimeError("bad row")
+
+    async def scenario():
+        writer = RunBatchWriter(lambda: RecordingSession(bad_run), batch_size=3, flush_interval=60).start()
+        for i in range(3):
+            await RunRecorder(f"run-{i}").finish(None, "success", "ok", writer=writer)
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert (writer.runs_written, writer.failed_runs) == (2, 1)
@@ -1,7 +1,8 @@
+import httpx
 import pytest
 import respx
 from httpx import Response
-from shared.libs.chatwoot_client import ChatwootClient
+from shared.libs.chatwoot_client import ChatwootClient, CircuitBreaker, CircuitOpenError
 
 @pytest.mark.asyncio
 async def test_create_message_success():
@@ -27,3 +28,125 @@ async def test_create_message_success():
         # Verify Payload
         payload = pd = route.calls.last.request.read()
         assert b"hello" in payload
+
+
+@pytest.mark.asyncio
+async def test_iter_messages_walks_before_cursor():
+    base_url = "https://test.chatwoot.com"
+    client = ChatwootClient(base_url, "test_token", 1)
+    messages = [{"id": i} for i in range(1, 46)]
+
+    def page(request):
+        before = request.url.params.get("before")
+        older = [m for m in messages if before is None or m["id"] < int(before)]
+        return Response(200, json={"meta": {}, "payload": older[-20:]})
+
+    async with respx.mock(base_url=base_url) as respx_mock:
+        route = respx_mock.get("/api/v1/accounts/1/conversations/7/messages").mock(side_effect=page)
+        batches = [batch async for batch in client.iter_messages(7)]
+
+    assert [len(b) for b in batches] == [20, 20, 5]
+    assert sorted(m["id"] for b in batches for m in b) == list(range(1, 46))
+    assert route.call_count == 3  # the short last page ends the walk
+
+
+@pytest.mark.asyncio
+async def test_iter_messages_single_page_is_one_call():
+    base_url = "https://test.chatwoot.com"
+    client = ChatwootClient(base_url, "test_token", 1)
+    async with respx.mock(base_url=base_url) as respx_mock:
+        route = respx_mock.get("/api/v1/accounts/1/conversations/7/messages").mock(
+            return_value=Response(200, json={"meta": {}, "payload": [{"id": 1}, {"id": 2}]})
+        )
+        batches = [batch async for batch in client.iter_messages(7)]
+    assert [len(b) for b in batches] == [2]
+    assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_iter_conversation_pages_stops_at_total_pages():
+    base_url = "https://test.chatwoot.com"
+    client = ChatwootClient(base_url, "test_token", 1)
+
+    def page(request):
+        n = int(request.url.params["page"])
+        assert request.url.params["sort_by"] == "latest"
+        return Response(200, json={"data": {"meta": {"current_page": n, "total_pages": 3}, "payload": [{"id": n}]}})
+
+    async with respx.mock(base_url=base_url) as respx_mock:
+        route = respx_mock.get("/api/v1/accounts/1/conversations").mock(side_effect=page)
+        pages = [p async for p in client.iter_conversation_pages(sort_by="latest")]
+
+    assert pages == [[{"id": 1}], [{"id": 2}], [{"id": 3}]]
+    assert route.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_get_retries_5xx_and_honours_retry_after():
+    base_url = "https://test.chatwoot.com"
+    async with ChatwootClient(base_url, "test_token", 1, backoff_base=0) as client:
+        async with respx.mock(base_url=base_url) as respx_mock:
+            route = respx_mock.get("/api/v1/accounts/1/conversations/7").mock(side_effect=[
+                Response(503),
+                Response(429, headers={"Retry-After": "0"}),
+                Response(200, json={"id": 7}),
+            ])
+            assert await client.get_conversation_details(7) == {"id": 7}
+            assert route.call_count == 3
+    assert client.breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_post_is_not_retried_on_5xx():
+    base_url = "https://test.chatwoot.com"
+    async with ChatwootClient(base_url, "test_token", 1, backoff_base=0) as client:
+        async with respx.mock(base_url=base_url) as respx_mock:
+            route = respx_mock.post("/api/v1/accounts/1/conversations/7/messages").mock(return_value=Response(502))
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.create_message(7, "hello")
+            assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_consecutive_failures():
+    base_url = "https://test.chatwoot.com"
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    async with ChatwootClient(base_url, "test_token", 1, max_retries=0, breaker=breaker) as client:
+        async with respx.mock(base_url=base_url) as respx_mock:
+            route = respx_mock.get("/api/v1/accounts/1/conversations/7").mock(return_value=Response(500))
+            for _ in range(2):
+                with pytest.raises(httpx.HTTPStatusError):
+                    await client.get_conversation_details(7)
+            with pytest.raises(CircuitOpenError):
+                await client.get_conversation_details(7)
+            assert route.call_count == 2
+
+            # Half-open after the reset timeout: one trial call closes it again
+            now[0] = 11
+            route.mock(return_value=Response(200, json={"id": 7}))
+            assert await client.get_conversation_details(7) == {"id": 7}
+            assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_half_open_trial_that_raises_other_errors_releases_the_breaker():
+    base_url = "https://test.chatwoot.com"
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    async with ChatwootClient(base_url, "test_token", 1, max_retries=0, breaker=breaker) as client:
+        async with respx.mock(base_url=base_url) as respx_mock:
+            route = respx_mock.get("/api/v1/accounts/1/conversations/7").mock(return_value=Response(500))
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.get_conversation_details(7)
+
+            # The trial fails outside the transport: it must not stay in flight
+            now[0] = 11
+            route.mock(side_effect=httpx.DecodingError("bad gzip"))
+            with pytest.raises(httpx.DecodingError):
+                await client.get_conversation_details(7)
+            assert breaker.state == "half_open" and not breaker._trial_in_flight
+
+            route.mock(return_value=Response(200, json={"id": 7}))
+            assert await client.get_conversation_details(7) == {"id": 7}
+            assert breaker.state == "closed"
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import sys
+from datetime import date, datetime
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "platform_api"))
+
+from data_hub_runner import analytics  # noqa: E402
+from data_hub_runner.analytics import MARTS, refresh_mart, refresh_marts  # noqa: E402
+from conftest import FakeResult, RecordingSession  # noqa: E402
+
+NOW = datetime(2024, 5, 2, 12, 0)
+
+
+def mart_session(watermark=None, changed=(), source_changes=10, stored_changes=None):
+    state = SimpleNamespace(watermark=watermark, source_changes=stored_changes) if watermark else None
+
+    def respond(stmt, params):
+        sql = str(stmt)
+        if "localtimestamp" in sql:
+            return FakeResult([(NOW,)])
+        if "pg_stat_user_tables" in sql:
+            return FakeResult([(source_changes,)])
+        if "FROM mart_refresh_state" in sql:
+            return FakeResult([state] if state else [])
+        if sql.lstrip().startswith("SELECT DISTINCT"):
+            return FakeResult([(k,) for k in changed])
+        return FakeResult(rowcount=2)
+
+    return RecordingSession(respond)
+
+
+def writes(session):
+    return [sql for sql in session.sql() if sql.lstrip().startswith(("DELETE", "INSERT"))]
+
+
+def test_first_refresh_rebuilds_the_mart():
+    session = mart_session()
+    result = asyncio.run(refresh_mart(session, MARTS[0]))
+    assert result.status == "done" and result.keys_recomputed is None
+    assert "DELETE FROM mart_inbox_daily_volume" in writes(session)
+    assert not any("unnest" in sql for sql in session.sql())
+    assert session.statements[-1][1] == {"mart": "mart_inbox_daily_volume", "watermark": NOW, "source_changes": 10}
+
+
+def test_incremental_refresh_only_recomputes_changed_days(monkeypatch):
+    monkeypatch.setattr(analytics, "MART_KEYS_PER_STATEMENT", 2)
+    days = [date(2024, 5, 1), date(2024, 5, 2), date(2024, 4, 3)]
+    session = mart_session(watermark=datetime(2024, 5, 2, 11, 0), changed=days, stored_changes=7)
+
+    result = asyncio.run(refresh_mart(session, MARTS[0]))
+
+    assert result.keys_recomputed == 3
+    assert (result.rows_deleted, result.rows_inserted) == (4, 4)
+    changed_params = next(p for stmt, p in session.statements if str(stmt).lstrip().startswith("SELECT DISTINCT"))
+    assert changed_params == {"since": datetime(2024, 5, 2, 10, 55)}
+    recomputes = [p for stmt, p in session.statements if "unnest" in str(stmt)]
+    assert [p["keys"] for p in recomputes] == [days[:2], days[2:]]
+
+
+def test_unchanged_sources_skip_without_writing():
+    session = mart_session(watermark=datetime(2024, 5, 2, 11, 0), source_changes=7, stored_changes=7)
+    result = asyncio.run(refresh_mart(session, MARTS[2]))
+    assert result.status == "skipped"
+    assert writes(session) == [] and session.commits == 0
+
+
+def test_time_metrics_refresh_recomputes_conversations_with_their_creation_day():
+    mart = next(m for m in MARTS if m.name == "mart_conversation_time_metrics")
+    session = mart_session(watermark=datetime(2024, 5, 2, 11, 0), changed=[11, 12], stored_changes=7)
+
+    result = asyncio.run(refresh_mart(session, mart))
+
+    assert result.keys_recomputed == 2
+    insert = next(sql for sql in session.sql() if sql.lstrip().startswith("INSERT"))
+    assert "created_day" in insert and "stg_conversations" in insert
+    assert "raw_chatwoot_conversations" in mart.sources
+
+
+def test_refresh_marts_uses_one_session_per_unit_and_records_runs():
+    sessions = []
+
+    def factory():
+        sessions.append(mart_session(watermark=datetime(2024, 5, 2, 11, 0), stored_changes=10))
+        return sessions[-1]
+
+    results = asyncio.run(refresh_marts(factory))
+
+    assert len(sessions) == len(MARTS) + 1
+    assert [r.status for r in results] == ["skipped"] * len(results)
+    runs = [run for s in sessions for run in s.added]
+    assert sorted(run.name for run in runs) == sorted([m.name for m in MARTS] + ["mart_backlog_snapshot"])
+
+
+def test_list_migrations_orders_by_version(tmp_path):
+    for name in ("0010_later.sql", "0002_second.sql", "0001_baseline.sql", "README.md"):
+        (tmp_path / name).write_text("SELECT 1;")
+    migrations = analytics.list_migrations(str(tmp_path))
+    assert [(m.version, m.name) for m in migrations] == [(1, "baseline"), (2, "second"), (10, "later")]
+
+
+def test_repo_migrations_start_at_baseline():
+    root = os.path.dirname(os.path.dirname(__file__))
+    migrations = analytics.list_migrations(os.path.join(root, analytics.MIGRATIONS_DIR))
+    assert migrations[0].version == 1
+    assert [m.version for m in migrations] == sorted({m.version for m in migrations})
+
+
+def test_current_schema_runs_no_ddl():
+    session = RecordingSession(
+        lambda stmt, params: FakeResult([("analytics_schema_version",)] if "to_regclass" in str(stmt) else [(10_000,)])
+    )
+    root = os.path.dirname(os.path.dirname(__file__))
+    assert asyncio.run(analytics.init_analytics_schema(session, os.path.join(root, analytics.MIGRATIONS_DIR))) == 0
+    assert all(sql.startswith("SELECT") for sql in session.sql())
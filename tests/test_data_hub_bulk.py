@@ -0,0 +1,87 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "platform_api"))
+
+from sqlalchemy.dialects import postgresql  # noqa: E402
+
+from data_hub_runner import bulk  # noqa: E402
+from data_hub_runner.bulk import MESSAGES, content_hash, dedupe, message_row, upsert_rows  # noqa: E402
+from conftest import FakeResult, RecordingSession  # noqa: E402
+
+
+def _first_row_changed(stmt, params):
+    """Reports the first row of every upsert chunk as changed."""
+    rows = stmt.compile().params
+    return FakeResult([(rows["content_hash_m0"],)] if "content_hash_m0" in rows else [])
+
+
+def _message(message_id, content="hi"):
+    return {
+        "id": message_id, "conversation_id": 1, "account_id": 1, "inbox_id": 1,
+        "message_type": 0, "content": content, "created_at": 1_700_000_000,
+    }
+
+
+def test_dedupe_keeps_last_row_per_key():
+    rows = [message_row(_message(1, "old")), message_row(_message(2)), message_row(_message(1, "new"))]
+    deduped = dedupe(MESSAGES, rows)
+    assert [(r["message_id"], r["content"]) for r in deduped] == [(1, "new"), (2, "hi")]
+
+
+def test_values_path_is_one_statement_per_chunk(monkeypatch):
+    monkeypatch.setattr(bulk, "MAX_BIND_PARAMS", len(MESSAGES.columns) * 2)
+    session = RecordingSession(_first_row_changed)
+    rows = [message_row(_message(i)) for i in range(5)]
+
+    changed = asyncio.run(upsert_rows(session, MESSAGES, rows, copy_threshold=0))
+
+    assert len(session.statements) == 4
+    assert changed == 3
+    sql = str(session.statements[0][0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (message_id, created_at_ts) DO UPDATE SET content = excluded.content" in sql
+    assert "WHERE raw_chatwoot_messages.content_hash IS DISTINCT FROM excluded.content_hash" in sql
+    assert "synced_at = now()" in sql
+    assert "synced_at" not in MESSAGES.columns
+
+
+def test_only_payloads_of_changed_rows_are_stored():
+    session = RecordingSession(_first_row_changed)
+    rows = [message_row(_message(i)) for i in range(3)]
+
+    asyncio.run(upsert_rows(session, MESSAGES, rows, copy_threshold=0))
+
+    (upsert, _), (payloads, _) = session.statements
+    assert "payload_json" not in str(upsert.compile(dialect=postgresql.dialect()))
+    sql = str(payloads.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("INSERT INTO raw_chatwoot_payloads") and "ON CONFLICT (content_hash) DO NOTHING" in sql
+    assert payloads.compile().params["content_hash_m0"] == rows[0]["content_hash"]
+    assert "content_hash_m1" not in payloads.compile().params
+
+
+def test_hot_columns_are_extracted_at_ingest():
+    row = message_row({**_message(1), "attachments": [{"id": 1}]})
+    assert row["has_attachment"] is True
+    assert message_row(_message(2))["has_attachment"] is False
+
+
+def test_content_hash_ignores_key_order_and_tracks_changes():
+    assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+    assert content_hash({"a": 1}) != content_hash({"a": 2})
+    assert message_row(_message(1))["content_hash"] == message_row(_message(1))["content_hash"]
+
+
+def test_header_sets_keyed_by_the_sql_migration_move_to_the_live_key():
+    headers = {"content-type": "application/json", "user-agent": "Chatwoot"}
+    live = content_hash(headers)
+    # An md5-keyed set from the migration, and one already under its live key
+    sets = {"0" * 32: headers, content_hash({"user-agent": "x"}): {"user-agent": "x"}}
+    session = RecordingSession(lambda stmt, params: FakeResult(sets.items()))
+
+    assert asyncio.run(bulk.rekey_header_sets(session)) == 1
+
+    inserted = session.statements[1][0].compile().params
+    assert (inserted["headers_hash"], inserted["headers_json"]) == (live, headers)
+    assert session.statements[2][1] == {"new": live, "old": "0" * 32}
+    assert str(session.statements[3][0]).startswith("DELETE FROM raw_chatwoot_header_sets")
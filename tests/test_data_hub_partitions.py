@@ -0,0 +1,46 @@
+import os
+import sys
+from datetime import date, datetime
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "platform_api"))
+
+from data_hub_runner.partitions import (  # noqa: E402
+    MESSAGES, add_months, months_to_archive, months_to_create, parse_partition_month,
+)
+
+
+def test_add_months_crosses_years():
+    assert add_months(date(2024, 11, 1), 2) == date(2025, 1, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+def test_months_to_create_covers_ahead_and_default_rows():
+    existing = [date(2024, 5, 1)]
+    pending = [datetime(2023, 2, 14)]
+    assert months_to_create(date(2024, 5, 20), 2, pending, existing) == [
+        date(2023, 2, 1), date(2024, 6, 1), date(2024, 7, 1),
+    ]
+
+
+def test_months_to_archive_keeps_retention_window():
+    existing = [date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1), date(2024, 4, 1)]
+    assert months_to_archive(date(2024, 5, 20), 3, existing) == [date(2024, 1, 1)]
+    assert months_to_archive(date(2024, 5, 20), 0, existing) == []
+
+
+def test_partition_names_round_trip():
+    name = MESSAGES.partition_name(date(2024, 5, 1))
+    assert name == "raw_chatwoot_messages_p202405"
+    assert parse_partition_month(MESSAGES.table, name) == date(2024, 5, 1)
+    assert parse_partition_month(MESSAGES.table, MESSAGES.default_partition) is None
+
+
+def test_raw_messages_ddl_is_partitioned_with_brin():
+    ddl = str(CreateTable(MESSAGES.model.__table__).compile(dialect=postgresql.dialect()))
+    assert "PARTITION BY RANGE (created_at_ts)" in ddl
+    assert "PRIMARY KEY (message_id, created_at_ts)" in ddl
+    index = next(i for i in MESSAGES.model.__table__.indexes if "created_at_ts" in i.columns)
+    assert index.dialect_options["postgresql"]["using"] == "brin"
@@ -0,0 +1,90 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "platform_api"))
+
+from data_hub_runner.bulk import conversation_row, message_row  # noqa: E402
+from data_hub_runner.realtime import normalize_conversation, normalize_message, rows_from_events  # noqa: E402
+from loadtest.webhook_generator import build_message_created  # noqa: E402
+
+
+def test_normalize_message_from_top_level_chatwoot_payload():
+    payload = {
+        "event": "message_created",
+        "id": 55,
+        "content": "oi",
+        "message_type": "outgoing",
+        "created_at": "2024-05-01T12:00:00.000Z",
+        "private": False,
+        "account": {"id": 1},
+        "inbox": {"id": 3},
+        "conversation": {"id": 9, "inbox_id": 3},
+        "sender": {"id": 4, "type": "user"},
+    }
+    msg = normalize_message(payload)
+    assert msg["conversation_id"] == 9
+    assert msg["account_id"] == 1 and msg["inbox_id"] == 3
+    assert msg["message_type"] == 1
+    assert msg["sender_type"] == "User" and msg["sender_id"] == 4
+    assert msg["created_at"] == 1714564800
+
+
+def test_normalize_message_from_wrapped_payload():
+    msg = normalize_message(build_message_created(1_500_000_001, conversation_id=7))
+    assert msg["id"] == 1_500_000_001
+    assert msg["conversation_id"] == 7
+    assert msg["message_type"] == 0
+
+
+def test_normalize_conversation_requires_ids():
+    assert normalize_conversation({"event": "conversation_updated", "id": 1}) is None
+    conv = normalize_conversation({
+        "event": "conversation_status_changed", "id": 1, "inbox_id": 2, "account_id": 1,
+        "status": "resolved", "created_at": 1_700_000_000, "timestamp": 1_700_000_500,
+    })
+    assert conv["timestamp"] == 1_700_000_500
+    assert conv["created_at"] == 1_700_000_000
+
+
+def test_rows_from_events_skips_unknown_and_malformed():
+    events = [
+        SimpleNamespace(id=1, event_name="message_created", payload_json=build_message_created(10, conversation_id=1)),
+        SimpleNamespace(id=2, event_name="contact_created", payload_json={"id": 5}),
+        SimpleNamespace(id=3, event_name="message_created", payload_json={"id": 11}),
+        SimpleNamespace(id=4, event_name="conversation_created", payload_json={
+            "id": 1, "inbox_id": 1, "account_id": 1, "status": "open", "timestamp": 1_700_000_000,
+        }),
+    ]
+    conversations, messages = rows_from_events(events)
+    assert [m["message_id"] for m in messages] == [10]
+    assert [c["conversation_id"] for c in conversations] == [1]
+
+
+def test_webhook_and_api_rows_of_the_same_data_hash_alike():
+    webhook_message = {
+        "event": "message_created", "id": 55, "content": "oi", "message_type": "outgoing",
+        "created_at": "2024-05-01T12:00:00.000Z", "private": False, "attachments": [],
+        "account": {"id": 1, "name": "Eco"}, "inbox": {"id": 3, "name": "WhatsApp"},
+        "conversation": {"id": 9, "inbox_id": 3, "status": "open"},
+        "sender": {"id": 4, "type": "user", "name": "Ana"},
+    }
+    api_message = {
+        "id": 55, "content": "oi", "message_type": 1, "created_at": 1714564800, "private": False,
+        "account_id": 1, "inbox_id": 3, "conversation_id": 9, "sender_type": "User", "sender_id": 4,
+        "sender": {"id": 4, "name": "Ana", "type": "user"}, "content_attributes": {},
+    }
+    assert message_row(normalize_message(webhook_message))["content_hash"] == message_row(api_message)["content_hash"]
+
+    webhook_conversation = {
+        "event": "conversation_status_changed", "id": 9, "inbox_id": 3, "status": "resolved",
+        "account": {"id": 1}, "created_at": 1_700_000_000, "timestamp": 1_700_000_000,
+        "meta": {"sender": {"id": 7}, "assignee": {"id": 4}}, "changed_attributes": [{"status": {}}],
+    }
+    api_conversation = {
+        "id": 9, "account_id": 1, "inbox_id": 3, "status": "resolved", "timestamp": 1_700_000_000,
+        "meta": {"sender": {"id": 7, "name": "Bia"}, "assignee": {"id": 4}}, "messages": [],
+    }
+    webhook_row = conversation_row(normalize_conversation(webhook_conversation))
+    assert webhook_row["content_hash"] == conversation_row(api_conversation)["content_hash"]
+    assert webhook_row["content_hash"] != conversation_row({**api_conversation, "status": "open"})["content_hash"]
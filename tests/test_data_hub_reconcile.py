@@ -0,0 +1,45 @@
+import asyncio
+import os
+import sys
+from datetime import date, datetime
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "platform_api"))
+
+from data_hub_runner.reconcile import Bucket, diff_buckets, is_known_persistent, merge_ranges, remote_buckets  # noqa: E402
+
+D1, D2, D3, D5 = date(2024, 5, 1), date(2024, 5, 2), date(2024, 5, 3), date(2024, 5, 5)
+
+
+def test_diff_buckets_compares_counts_not_checksums():
+    local = {(D1, 1): Bucket(3, 2, 111), (D2, 1): Bucket(1, 1, 222), (D3, 2): Bucket(1, 0, 333)}
+    remote = {(D1, 1): Bucket(3, 2), (D2, 1): Bucket(1, 2), (D5, 2): Bucket(0, 1)}
+    assert diff_buckets(local, remote) == [(D2, 1), (D3, 2), (D5, 2)]
+
+
+def test_merge_ranges_groups_consecutive_days_per_inbox():
+    keys = [(D1, 1), (D2, 1), (D3, 1), (D5, 1), (D2, 2)]
+    assert merge_ranges(keys) == [(1, D1, D3), (1, D5, D5), (2, D2, D2)]
+
+
+def test_known_persistent_until_either_side_changes():
+    state = SimpleNamespace(
+        status="persistent", local_incoming=2, local_outgoing=1, checksum=42, remote_incoming=2, remote_outgoing=2,
+    )
+    assert is_known_persistent(state, Bucket(2, 1, 42), Bucket(2, 2))
+    assert not is_known_persistent(state, Bucket(2, 1, 43), Bucket(2, 2))
+    assert not is_known_persistent(state, Bucket(2, 1, 42), Bucket(2, 3))
+    assert not is_known_persistent(None, Bucket(2, 1, 42), Bucket(2, 2))
+
+
+def test_remote_buckets_from_report_series():
+    day_ts = lambda d: int(datetime.combine(d, datetime.min.time()).timestamp())  # noqa: E731
+
+    class Client:
+        async def get_report_timeseries(self, metric, since, until, type, id, timezone_offset):
+            if metric == "incoming_messages_count":
+                return [{"value": "4", "timestamp": day_ts(D1)}, {"value": 0, "timestamp": day_ts(D2)}]
+            return [{"value": 3.0, "timestamp": day_ts(D1)}]
+
+    buckets = asyncio.run(remote_buckets(Client(), [7], D1, D3))
+    assert buckets == {(D1, 7): Bucket(4, 3)}
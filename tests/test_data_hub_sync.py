@@ -0,0 +1,30 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), "platform_api"))
+
+from data_hub_runner.sync_state import select_changed, sync_since_ts  # noqa: E402
+
+
+def test_since_uses_watermark_minus_overlap():
+    watermark = datetime.fromtimestamp(1_700_000_000)
+    assert sync_since_ts(watermark, 1_800_000_000, days_window=7, overlap_seconds=300) == 1_700_000_000 - 300
+
+
+def test_since_falls_back_to_days_window_or_full_history():
+    assert sync_since_ts(None, 1_000_000, days_window=7, overlap_seconds=300) == 1_000_000 - 7 * 86400
+    assert sync_since_ts(None, 1_000_000, days_window=0, overlap_seconds=300) is None
+
+
+def test_select_changed_stops_at_first_older_conversation():
+    page = [{"id": 3, "last_activity_at": 300}, {"id": 2, "last_activity_at": 200}, {"id": 1, "last_activity_at": 100}]
+    changed, stop = select_changed(page, since_ts=200)
+    assert [c["id"] for c in changed] == [3, 2]
+    assert stop is True
+
+    changed, stop = select_changed(page, since_ts=50)
+    assert len(changed) == 3
+    assert stop is False
+
+    assert select_changed(page, since_ts=None) == (page, False)
@@ -0,0 +1,70 @@
+import asyncio
+
+from conftest import RecordingSession
+from data_hub_runner.writer import BatchWriter
+
+
+def test_batch_writer_flushes_full_batches_and_remainder():
+    sessions = []
+    written = []
+
+    def session_factory():
+        sessions.append(RecordingSession())
+        return sessions[-1]
+
+    async def write_rows(session, rows):
+        written.append([row["id"] for row in rows])
+
+    async def scenario():
+        writer = BatchWriter(session_factory, {"t": write_rows}, batch_size=3).start()
+        for i in range(7):
+            await writer.put("t", [{"id": i}])
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert written == [[0, 1, 2], [3, 4, 5], [6]]
+    assert sum(s.commits for s in sessions) == 3
+    assert writer.rows_written == 7
+
+
+def test_batch_writer_drops_failed_batch_and_continues():
+    flushed = []
+
+    async def write_rows(session, rows):
+        if rows[0]["id"] == 0:
+            raise RuntimeError("boom")
+        return 1
+
+    async def scenario():
+        writer = BatchWriter(
+            RecordingSession, {"t": write_rows}, batch_size=2,
+            on_flush=lambda table, n, changed: flushed.append((table, n, changed)),
+        ).start()
+        await writer.put("t", [{"id": 0}, {"id": 1}])
+        await writer.put("t", [{"id": 2}, {"id": 3}])
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert writer.failed_batches == 1
+    assert writer.rows_written == 2
+    assert flushed == [("t", 2, 1)]
+    assert writer.rows_changed == 1
+
+
+def test_drain_flushes_partial_batches_before_returning():
+    written = []
+
+    async def write_rows(session, rows):
+        written.extend(row["id"] for row in rows)
+
+    async def scenario():
+        writer = BatchWriter(RecordingSession, {"t": write_rows}, batch_size=100, flush_interval=60).start()
+        await writer.put("t", [{"id": 1}, {"id": 2}])
+        await writer.drain()
+        flushed_at_drain = list(written)
+        await writer.close()
+        return flushed_at_drain
+
+    assert asyncio.run(scenario()) == [1, 2]
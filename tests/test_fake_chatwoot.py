@@ -0,0 +1,86 @@
+from fastapi.testclient import TestClient
+
+from loadtest.fake_chatwoot import Settings, SyntheticDataset, create_app
+from loadtest.webhook_generator import build_message_created
+
+BASE = "/api/v1/accounts/1"
+
+
+def _settings(**kwargs):
+    return Settings(CONVERSATIONS=60, MESSAGES_PER_CONVERSATION=30, DAYS=1, START_TS=1_700_000_000, **kwargs)
+
+
+def test_conversations_pagination_covers_dataset():
+    client = TestClient(create_app(_settings()))
+    seen, page = [], 1
+    while True:
+        data = client.get(f"{BASE}/conversations", params={"page": page, "status": "all"}).json()["data"]
+        seen += [c["id"] for c in data["payload"]]
+        if data["meta"]["current_page"] >= data["meta"]["total_pages"]:
+            break
+        page += 1
+    assert sorted(seen) == list(range(1, 61))
+
+
+def test_messages_before_cursor_walks_whole_thread():
+    app = create_app(_settings())
+    client = TestClient(app)
+    expected = app.state.dataset.message_counts[0]
+    ids, before = [], None
+    while True:
+        params = {"before": before} if before else {}
+        payload = client.get(f"{BASE}/conversations/1/messages", params=params).json()["payload"]
+        if not payload:
+            break
+        ids += [m["id"] for m in payload]
+        before = payload[0]["id"]
+    assert len(ids) == len(set(ids)) == expected
+
+
+def test_create_message_moves_conversation_to_top():
+    client = TestClient(create_app(_settings()))
+    msg = client.post(f"{BASE}/conversations/5/messages", json={"content": "oi"}).json()
+    assert msg["content"] == "oi"
+    first = client.get(f"{BASE}/conversations", params={"status": "all"}).json()["data"]["payload"][0]
+    assert first["id"] == 5
+    assert client.get("/_fake/stats").json()["created_messages"] == 1
+
+
+def test_account_reporting_events_window_is_exact():
+    config = _settings()
+    dataset = SyntheticDataset(config)
+    client = TestClient(create_app(config))
+    since, until = config.START_TS + 20000, config.START_TS + 50000
+    brute = sorted(
+        e["id"] for c in range(1, 61) for e in dataset.reporting_events(c)
+        if since <= e["created_at"] <= until
+    )
+    got, page = [], 1
+    while True:
+        body = client.get(f"{BASE}/reporting_events", params={"page": page, "since": since, "until": until}).json()
+        got += [e["id"] for e in body["payload"]]
+        if page >= body["meta"]["total_pages"]:
+            break
+        page += 1
+    assert sorted(got) == brute
+
+
+def test_webhook_payload_shape():
+    payload = build_message_created(10, 4, inboxes=3)
+    assert payload["event"] == "message_created"
+    assert payload["data"]["conversation"]["id"] == 4
+    assert payload["data"]["inbox"]["id"] == 1
+
+
+def test_message_count_reports_match_messages():
+    app = create_app(_settings(INBOXES=2))
+    client = TestClient(app)
+    dataset = app.state.dataset
+    params = {"since": 1_700_000_000, "until": 1_700_000_000 + 3 * 86400, "type": "inbox", "id": 2, "group_by": "day"}
+    incoming = client.get("/api/v2/accounts/1/reports", params={**params, "metric": "incoming_messages_count"}).json()
+    outgoing = client.get("/api/v2/accounts/1/reports", params={**params, "metric": "outgoing_messages_count"}).json()
+
+    messages = [m for c in range(2, 61, 2) for m in dataset.messages(c)]
+    assert sum(p["value"] for p in incoming) == sum(1 for m in messages if m["message_type"] == 0)
+    assert sum(p["value"] for p in outgoing) == sum(1 for m in messages if m["message_type"] == 1)
+    assert all(p["timestamp"] % 86400 == 0 for p in incoming)
@@ -0,0 +1,66 @@
+import json
+import random
+from fastapi.testclient import TestClient
+
+from loadtest.faults import FaultConfig, pick_fault
+from loadtest.fake_openai import Settings, create_app
+
+
+def test_chat_completion_returns_final_answer_and_usage():
+    client = TestClient(create_app(Settings()))
+    resp = client.post("/v1/chat/completions", json={
+        "model": "gpt-4o-mini",
+        "messages": [{"role": "user", "content": "Olá"}]
+    })
+    assert resp.status_code == 200
+    body = resp.json()
+    assert "Final Answer:" in body["choices"][0]["message"]["content"]
+    assert body["usage"]["total_tokens"] > 0
+
+
+def test_chat_completion_stream():
+    client = TestClient(create_app(Settings()))
+    resp = client.post("/v1/chat/completions", json={
+        "messages": [{"role": "user", "content": "Olá"}],
+        "stream": True
+    })
+    lines = [l for l in resp.text.split("\n") if l.startswith("data: ")]
+    assert lines[-1] == "data: [DONE]"
+    text = "".join(
+        json.loads(l[6:])["choices"][0]["delta"].get("content", "") for l in lines[:-1]
+    )
+    assert "Final Answer:" in text
+
+
+def test_vector_store_file_flow():
+    client = TestClient(create_app(Settings()))
+    vs = client.post("/v1/vector_stores", json={"name": "kb"}).json()
+    f = client.post("/v1/files", files={"file": ("a.txt", b"hello")}, data={"purpose": "assistants"}).json()
+    client.post(f"/v1/vector_stores/{vs['id']}/files", json={"file_id": f["id"]})
+
+    status = client.get(f"/v1/vector_stores/{vs['id']}/files/{f['id']}").json()
+    assert status["status"] == "completed"
+    assert status["usage_bytes"] == 5
+
+    assert client.delete(f"/v1/vector_stores/{vs['id']}/files/{f['id']}").status_code == 200
+    assert client.get(f"/v1/vector_stores/{vs['id']}/files/{f['id']}").status_code == 404
+
+
+def test_rate_limit_injection():
+    client = TestClient(create_app(Settings(RATE_LIMIT_RATE=1.0, RETRY_AFTER_SECONDS=3)))
+    resp = client.post("/v1/chat/completions", json={"messages": [{"role": "user", "content": "x"}]})
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "3"
+
+    # Control plane is never faulted and can turn injection off
+    assert client.put("/_fake/faults", json={}).status_code == 200
+    resp = client.post("/v1/chat/completions", json={"messages": [{"role": "user", "content": "x"}]})
+    assert resp.status_code == 200
+
+
+def test_pick_fault_distribution():
+    rnd = random.Random(42)
+    config = FaultConfig(error_rate=0.1, rate_limit_rate=0.2)
+    picks = [pick_fault(config, rnd) for _ in range(10000)]
+    assert 1500 < picks.count(429) < 2500
+    assert 700 < picks.count(500) < 1300
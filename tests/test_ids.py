@@ -0,0 +1,18 @@
+import time
+import uuid
+
+from shared.utils.ids import uuid7, uuid7_timestamp
+
+
+def test_uuid7_layout():
+    value = uuid7()
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert abs(uuid7_timestamp(value) - time.time()) < 5
+
+
+def test_uuid7_is_monotonic_within_a_millisecond():
+    ids = [uuid7() for _ in range(10_000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert sorted(str(i) for i in ids) == [str(i) for i in ids]
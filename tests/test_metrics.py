@@ -0,0 +1,17 @@
+from shared.utils import metrics
+
+
+def test_metrics_server_disabled_without_port(monkeypatch):
+    monkeypatch.delenv("METRICS_PORT", raising=False)
+    assert metrics.start_metrics_server() is False
+
+
+def test_observe_helpers_are_exported():
+    metrics.observe_crew_run("v1.0", "success", 1.5)
+    metrics.observe_stream_group("events:chatwoot", "cg:bot_runner", {"length": 10, "lag": 3, "pending": 2})
+    if not metrics.PROMETHEUS_AVAILABLE:
+        return
+    output = metrics.render_latest().decode()
+    assert 'ecocrm_crew_runs_total{outcome="success",version="v1.0"} 1.0' in output
+    assert 'ecocrm_stream_consumer_lag{group="cg:bot_runner",stream="events:chatwoot"} 3.0' in output
+    assert 'ecocrm_stream_pending_messages{group="cg:bot_runner",stream="events:chatwoot"} 2.0' in output
@@ -0,0 +1,45 @@
+import random
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from shared.utils.sketch import RELATIVE_ACCURACY, Sketch, bucket_index, merge_sketches
+
+
+def test_quantiles_are_within_the_relative_accuracy():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(6, 1.5) for _ in range(20_000)]
+    sketch = Sketch.from_values(values)
+    for q in (0.01, 0.5, 0.9, 0.99):
+        exact = float(np.quantile(values, q, method="lower"))
+        assert abs(sketch.quantile(q) - exact) <= RELATIVE_ACCURACY * exact
+    assert sketch.mean == pytest.approx(sum(values) / len(values))
+
+
+def test_merge_equals_sketch_of_the_union():
+    rng = random.Random(3)
+    days = [[rng.randint(0, 5000) for _ in range(500)] for _ in range(10)]
+    merged = merge_sketches(Sketch.from_values(day) for day in days)
+    whole = Sketch.from_values(v for day in days for v in day)
+    assert (merged.count, merged.total, merged.zero_count) == (whole.count, whole.total, whole.zero_count)
+    assert merged.buckets.tolist() == whole.buckets.tolist()
+    assert merged.counts.tolist() == whole.counts.tolist()
+
+
+def test_merges_mart_rows_with_lists():
+    rows = [
+        SimpleNamespace(count=3, total=130.0, zero_count=1, buckets=[bucket_index(10), bucket_index(120)], counts=[1, 1]),
+        SimpleNamespace(count=2, total=20.0, zero_count=0, buckets=[bucket_index(10)], counts=[2]),
+    ]
+    sketch = merge_sketches(rows)
+    assert (sketch.count, sketch.zero_count) == (5, 1)
+    assert sketch.quantile(0) == 0.0
+    assert abs(sketch.quantile(0.5) - 10) <= RELATIVE_ACCURACY * 10
+    assert abs(sketch.quantile(1) - 120) <= RELATIVE_ACCURACY * 120
+    assert sketch.mean == 30.0
+
+
+def test_empty_sketch_has_no_metrics():
+    sketch = merge_sketches([])
+    assert sketch.mean is None and sketch.quantile(0.5) is None
@@ -0,0 +1,53 @@
+import time
+
+from shared.utils import tracing
+from shared.utils.tracing import RunTrace, parse_trace_id, record_span, span, start_run_trace
+
+TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+def test_run_trace_keeps_incoming_trace_id():
+    run_trace = RunTrace(TRACEPARENT)
+    assert run_trace.trace_id == "0af7651916cd43dd8448eb211c80319c"
+    assert parse_trace_id("garbage") is None
+
+
+def test_spans_are_summarized_per_category():
+    run_trace = start_run_trace(TRACEPARENT)
+    with span("db.query", category="db"):
+        time.sleep(0.01)
+    now = time.time_ns()
+    record_span("llm.call", now - 5_000_000, now, category="llm")
+    record_span("llm.call", now - 5_000_000, now, category="llm")
+
+    summary = run_trace.summary()
+    assert summary["trace_id"] == "0af7651916cd43dd8448eb211c80319c"
+    assert summary["db_ms"] >= 10
+    assert summary["llm_ms"] == 10.0
+    assert summary["llm_calls"] == 2
+    assert summary["reply_ms"] == 0.0
+
+
+def test_child_spans_continue_incoming_trace():
+    if not tracing.OTEL_AVAILABLE:
+        return
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    previous = tracing._tracer
+    tracing._tracer = provider.get_tracer("test")
+    try:
+        start_run_trace(TRACEPARENT)
+        with span("bot_runner.process_message"):
+            with span("chatwoot.create_message", category="reply"):
+                assert tracing.parse_trace_id(tracing.current_traceparent()) == "0af7651916cd43dd8448eb211c80319c"
+    finally:
+        tracing._tracer = previous
+
+    spans = exporter.get_finished_spans()
+    assert {s.name for s in spans} == {"bot_runner.process_message", "chatwoot.create_message"}
+    assert all(format(s.context.trace_id, "032x") == "0af7651916cd43dd8448eb211c80319c" for s in spans)